@@ -0,0 +1,104 @@
+"""Replay a bursty synthetic channel log, with and without the turn queue.
+
+python benchmarks/bench_burst.py --channels 8 --bursts 5 --burst-size 5
+
+Each channel sends ``--bursts`` bursts of ``--burst-size`` messages spaced
+``--gap`` seconds apart, with ``--pause`` seconds between bursts. "naive" starts
+one turn per message (the old on_message behaviour); "queued" goes through
+``TurnQueue``. Reports LLM calls, replies and the delay from a channel's last
+message to the reply that answers it.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from common import FakeChatModel, percentile
+
+from myaa.adapter.discord import run
+from myaa.src.graph_setup import GraphRuntime, set_runtime
+from myaa.src.turn_queue import TurnQueue
+
+
+def synthetic_log(
+    channels: int, bursts: int, size: int, gap: float, pause: float, seed: int
+) -> list[tuple[float, int, str, str]]:
+    """(offset_s, channel, speaker, text) rows sorted by offset."""
+    rng = random.Random(seed)
+    rows = []
+    for cid in range(channels):
+        t = rng.uniform(0, pause)
+        for b in range(bursts):
+            for i in range(size):
+                rows.append((t, cid, f"user{rng.randrange(3)}", f"burst {b} msg {i}"))
+                t += rng.uniform(0, 2 * gap)
+            t += pause
+    return sorted(rows)
+
+
+async def replay(log, mode: str, args) -> dict:
+    llm = FakeChatModel(latency=args.latency)
+    set_runtime(GraphRuntime(llm=llm, tools=[]))
+    service = run.ChatService(run.SessionManager(), default_persona="example")
+    replies: list[tuple[int, float]] = []  # (channel, time answered)
+    start = time.perf_counter()
+
+    async def answer(key: str, batch: list[tuple[int, str, str]]):
+        await service.chat_batch(key, [(s, t) for _, s, t in batch])
+        replies.append((batch[-1][0], time.perf_counter() - start))
+
+    queue = TurnQueue(
+        answer, debounce=args.debounce, max_wait=args.max_wait, max_depth=args.depth
+    )
+    naive: list[asyncio.Task] = []
+    dropped = 0
+    for offset, cid, speaker, text in log:
+        await asyncio.sleep(max(0.0, offset - (time.perf_counter() - start)))
+        key = f"{cid}:{cid}"
+        if mode == "naive":
+            naive.append(asyncio.create_task(answer(key, [(cid, speaker, text)])))
+        elif not queue.submit(key, (cid, speaker, text)):
+            dropped += 1
+    await asyncio.gather(*naive)
+    await queue.drain()
+
+    # delay from the end of each burst to the first reply after it
+    last_msg: dict[tuple[int, int], float] = {}
+    for offset, cid, _, text in log:
+        last_msg[(cid, int(text.split()[1]))] = offset
+    delays = []
+    for (cid, _), sent in last_msg.items():
+        after = [t for c, t in replies if c == cid and t >= sent]
+        if after:
+            delays.append(min(after) - sent)
+    return {
+        "mode": mode,
+        "messages": len(log),
+        "llm_calls": llm.calls,
+        "replies": len(replies),
+        "dropped": dropped,
+        "burst_reply_p50_s": round(percentile(delays, 50), 3),
+        "burst_reply_p99_s": round(percentile(delays, 99), 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channels", type=int, default=8)
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--burst-size", type=int, default=5)
+    parser.add_argument("--gap", type=float, default=0.3)
+    parser.add_argument("--pause", type=float, default=4.0)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--debounce", type=float, default=run.TURN_DEBOUNCE)
+    parser.add_argument("--max-wait", type=float, default=run.TURN_MAX_WAIT)
+    parser.add_argument("--depth", type=int, default=run.TURN_QUEUE_DEPTH)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    log = synthetic_log(
+        args.channels, args.bursts, args.burst_size, args.gap, args.pause, args.seed
+    )
+    for mode in ("naive", "queued"):
+        print(json.dumps(asyncio.run(replay(log, mode, args))))
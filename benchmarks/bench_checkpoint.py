@@ -0,0 +1,98 @@
+"""Memory and throughput of the checkpointer backends at many threads.
+
+    python benchmarks/bench_checkpoint.py --threads 10000 --turns 2
+
+Each backend runs in its own subprocess so peak RSS is comparable.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import FakeChatModel
+
+from myaa.src.checkpoint import MemorySaver, SqliteSaver
+from myaa.src.graph_setup import GraphRuntime
+
+
+async def _drive(
+    runtime: GraphRuntime, threads: int, turns: int, concurrency: int
+) -> None:
+    graph = runtime.compiled_graph
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(tid: int, turn: int) -> None:
+        async with sem:
+            async for _ in graph.astream(
+                {
+                    "messages": [("user", f"bench: message {turn} " * 8)],
+                    "persona_id": runtime.default_persona_id,
+                },
+                {"configurable": {"thread_id": str(tid)}},
+            ):
+                pass
+
+    for turn in range(turns):
+        await asyncio.gather(*(one(tid, turn) for tid in range(threads)))
+
+
+def run_backend(backend: str, threads: int, turns: int, keep: int) -> dict:
+    tmp = tempfile.mkdtemp()
+    saver = (
+        MemorySaver()
+        if backend == "memory"
+        else SqliteSaver(os.path.join(tmp, "bench.sqlite"), keep=keep)
+    )
+    runtime = GraphRuntime(
+        llm=FakeChatModel(latency=0.0, reply="ok " * 20), tools=[], checkpointer=saver
+    )
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    asyncio.run(_drive(runtime, threads, turns, concurrency=64))
+    elapsed = time.perf_counter() - start
+    report = {
+        "backend": backend,
+        "threads": threads,
+        "turns": turns,
+        "turns_per_s": round(threads * turns / elapsed, 1),
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        "rss_growth_mb": round(
+            (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, 1
+        ),
+    }
+    if isinstance(saver, SqliteSaver):
+        saver.close()
+        report["db_mb"] = round(os.path.getsize(saver.path) / 2**20, 1)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=2)
+    parser.add_argument("--keep", type=int, default=4)
+    parser.add_argument("--backend", choices=["memory", "sqlite"])
+    args = parser.parse_args()
+    if args.backend:
+        print(
+            json.dumps(run_backend(args.backend, args.threads, args.turns, args.keep))
+        )
+        sys.exit(0)
+    for backend in ("memory", "sqlite"):
+        subprocess.run(
+            [sys.executable, __file__, "--backend", backend]
+            + [
+                f"--threads={args.threads}",
+                f"--turns={args.turns}",
+                f"--keep={args.keep}",
+            ],
+            check=True,
+        )
@@ -0,0 +1,122 @@
+"""Checkpoint bytes per thread and (de)serialization time, inline vs compact.
+
+python benchmarks/bench_checkpoint_format.py --threads 50 --turns 20 --keep 20
+
+Each turn runs a tool loop (a search returning ``--result-kb`` of text, as
+Tavily does), so a thread accumulates 4 messages per turn. "inline" is the
+previous format (every checkpoint holds the full message list); "compact"
+stores each message once and keeps digests per checkpoint. Reports stored
+bytes per thread (SUM of blob lengths, after pruning to ``--keep``) and the
+time spent in ``put`` (serialization) and ``get_tuple`` (loading the
+latest checkpoint, cache bypassed).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from common import ScriptedChatModel
+from langchain_core.tools import tool
+
+from myaa.src.checkpoint import SqliteSaver
+from myaa.src.graph_setup import GraphRuntime
+
+
+class TimedSaver(SqliteSaver):
+    put_s = 0.0
+
+    def put(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().put(*args, **kwargs)
+        finally:
+            self.put_s += time.perf_counter() - start
+
+
+def make_search(kb: int):
+    text = " ".join(f"result{i} tokyo weather sunny 23C" for i in range(kb * 30))
+
+    @tool
+    async def web_search(query: str) -> str:
+        """検索"""
+        return text[: kb * 1024]
+
+    return web_search
+
+
+def stored_bytes(saver: SqliteSaver) -> int:
+    saver.flush()
+    total = 0
+    for table, cols in (
+        ("checkpoints", "length(checkpoint) + length(metadata)"),
+        ("writes", "length(value)"),
+        ("messages", "length(value)"),
+    ):
+        total += saver._conn.execute(
+            f"SELECT COALESCE(SUM({cols}), 0) FROM {table}"
+        ).fetchone()[0]
+    return total
+
+
+async def drive(runtime: GraphRuntime, threads: int, turns: int) -> None:
+    graph = runtime.compiled_graph
+
+    async def one(tid: int) -> None:
+        for turn in range(turns):
+            async for _ in graph.astream(
+                {
+                    "messages": [("user", f"bench: 検索して {turn}")],
+                    "persona_id": runtime.default_persona_id,
+                },
+                {"configurable": {"thread_id": f"t{tid}"}},
+            ):
+                pass
+
+    await asyncio.gather(*(one(tid) for tid in range(threads)))
+
+
+def run(fmt: str, args) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.sqlite")
+    saver = TimedSaver(path, keep=args.keep, compact=fmt == "compact")
+    llm = ScriptedChatModel(
+        latency=0.0, reply="ok " * 40, script={"検索": ("web_search", {"query": "q"})}
+    )
+    runtime = GraphRuntime(
+        llm=llm, tools=[make_search(args.result_kb)], checkpointer=saver
+    )
+    start = time.perf_counter()
+    asyncio.run(drive(runtime, args.threads, args.turns))
+    elapsed = time.perf_counter() - start
+    size = stored_bytes(saver)
+
+    saver._cache.clear()
+    load = time.perf_counter()
+    for tid in range(args.threads):
+        cp = saver.get_tuple({"configurable": {"thread_id": f"t{tid}"}})
+        assert cp and len(cp.checkpoint["channel_values"]["messages"]) == 4 * args.turns
+    load_s = time.perf_counter() - load
+    saver.close()
+    return {
+        "format": fmt,
+        "threads": args.threads,
+        "turns": args.turns,
+        "kb_per_thread": round(size / args.threads / 1024, 1),
+        "db_mb": round(os.path.getsize(path) / 2**20, 1),
+        "put_ms_per_turn": round(saver.put_s / (args.threads * args.turns) * 1000, 3),
+        "load_ms_per_thread": round(load_s / args.threads * 1000, 3),
+        "wall_s": round(elapsed, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--keep", type=int, default=20)
+    parser.add_argument("--result-kb", type=int, default=4)
+    args = parser.parse_args()
+    for fmt in ("inline", "compact"):
+        print(json.dumps(run(fmt, args)))
@@ -0,0 +1,59 @@
+"""Reply latency when N channels talk at once against a stub LLM.
+
+python benchmarks/bench_concurrency.py --channels 32 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from common import FakeChatModel, percentile
+
+from myaa.adapter.discord import run
+from myaa.src.graph_setup import GraphRuntime, set_runtime
+
+
+async def _one_channel(service: run.ChatService, cid: int, turns: int) -> list[float]:
+    latencies: list[float] = []
+    for i in range(turns):
+        start = time.perf_counter()
+        await service.chat(f"{cid}:{cid}", f"hello {i}", speaker="bench")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def main(channels: int, turns: int, latency: float, slots: int) -> dict:
+    runtime = GraphRuntime(llm=FakeChatModel(latency=latency), tools=[])
+    set_runtime(runtime)
+    service = run.ChatService(
+        run.SessionManager(),
+        default_persona=runtime.default_persona_id,
+        max_concurrent_turns=slots,
+    )
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(_one_channel(service, cid, turns) for cid in range(channels))
+    )
+    elapsed = time.perf_counter() - start
+    latencies = [x for per_channel in results for x in per_channel]
+    return {
+        "channels": channels,
+        "turns_per_channel": turns,
+        "llm_latency_s": latency,
+        "max_concurrent_turns": slots,
+        "wall_s": round(elapsed, 3),
+        "p50_s": round(percentile(latencies, 50), 3),
+        "p99_s": round(percentile(latencies, 99), 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channels", type=int, default=32)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--slots", type=int, default=run.MAX_CONCURRENT_TURNS)
+    args = parser.parse_args()
+    report = asyncio.run(main(args.channels, args.turns, args.latency, args.slots))
+    print(json.dumps(report))
@@ -0,0 +1,213 @@
+"""End-to-end load test: fake Discord channels → bot → graph → fake Remo.
+
+python benchmarks/bench_e2e.py --channels 20 --messages 10 --rate 20 --out e2e.json
+python benchmarks/bench_e2e.py ... --baseline e2e.json --tolerance 0.2
+
+Nothing leaves the machine. Synthetic messages arrive in Poisson fashion
+across ``--channels`` fake channels and go through the real ``TurnQueue``
+and ``run.answer_batch`` (streamed, progressive replies). The LLM is
+``ScriptedChatModel``, which calls the room tools on keywords, and the
+tools talk HTTP to an in-process ``FakeRemo``.
+
+The JSON report holds throughput, reply latency percentiles (last message
+of a batch → reply finished), LLM and tool call counts, Remo HTTP calls
+and peak RSS. With ``--baseline`` the run is compared against an earlier
+report and the script exits with status 1 if throughput, p95 latency or
+call counts got worse by more than ``--tolerance``.
+"""
+
+import os
+
+# the Remo tools read their settings at import time
+os.environ.setdefault("NATURE_REMO_TOKEN", "bench")
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import fake_remo
+from common import ScriptedChatModel, latency_summary, peak_rss_mb
+from fake_discord import FakeChannel, FakeGuild, FakeMessage
+
+os.environ.setdefault("REMO_DEVICE_ID", fake_remo.DEVICE_ID)
+os.environ.setdefault("REMO_AC_ID", fake_remo.AC_ID)
+os.environ.setdefault("REMO_LIGHT_ID", fake_remo.LIGHT_ID)
+
+from myaa.adapter.discord import run
+from myaa.src.chat_graph import get_current_time
+from myaa.src.graph_setup import GraphRuntime, set_runtime
+from myaa.src.tool_cache import ToolCache
+from myaa.src.tool_exec import TOOL_LATENCY
+from myaa.src.tools import nature_cli
+from myaa.src.turn_queue import TurnQueue
+
+TEXTS = [
+    "おはよう",
+    "今日は何してた？",
+    "部屋の温度どう？",
+    "エアコンついてる？",
+    "電気ついてる？",
+    "暑いから冷房にして",
+    "そろそろ消灯して",
+    "いま何時間目だっけ",
+    "ありがとう",
+]
+
+# higher is better for these; everything else in COMPARED is lower-is-better
+HIGHER_IS_BETTER = {"throughput_msgs_per_s"}
+COMPARED = (
+    "throughput_msgs_per_s",
+    "reply_latency.p95_s",
+    "llm_calls",
+    "remo_http_calls",
+)
+
+
+def workload(
+    channels: int, messages: int, rate: float, seed: int
+) -> list[tuple[float, int, str, str]]:
+    """(offset_s, channel, speaker, text) with Poisson arrivals at ``rate``/s."""
+    rng = random.Random(seed)
+    rows, t = [], 0.0
+    pending = [messages] * channels
+    while any(pending):
+        t += rng.expovariate(rate)
+        cid = rng.choice([c for c, n in enumerate(pending) if n])
+        pending[cid] -= 1
+        rows.append((t, cid, f"user{rng.randrange(3)}", rng.choice(TEXTS)))
+    return rows
+
+
+def tool_outcomes() -> dict[str, int]:
+    out: dict[str, int] = {}
+    for labels, _ in TOOL_LATENCY.samples():
+        outcome = dict(labels).get("outcome", "?")
+        out[outcome] = out.get(outcome, 0) + TOOL_LATENCY.count(**dict(labels))
+    return out
+
+
+def _lookup(report: dict, dotted: str) -> float | None:
+    value: object = report
+    for part in dotted.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value if isinstance(value, (int, float)) else None
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Human-readable regressions of ``report`` against ``baseline``."""
+    regressions = []
+    for metric in COMPARED:
+        new, old = _lookup(report, metric), _lookup(baseline, metric)
+        if new is None or old is None or old == 0:
+            continue
+        change = (new - old) / old
+        worse = -change if metric in HIGHER_IS_BETTER else change
+        if worse > tolerance:
+            regressions.append(f"{metric}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+async def main(args) -> dict:
+    async with fake_remo.FakeRemo(latency=args.remo_latency) as remo:
+        nature_cli.remo = nature_cli.NatureRemoClient("bench", base_url=remo.url)
+        llm = ScriptedChatModel(
+            latency=args.latency, token_latency=args.token_latency, cpu=args.cpu
+        )
+        tools = [
+            nature_cli.get_room_temp,
+            nature_cli.get_ac_status,
+            nature_cli.get_light_status,
+            nature_cli.set_ac,
+            nature_cli.set_light,
+            get_current_time,
+        ]
+        cache = None if args.no_tool_cache else ToolCache()
+        set_runtime(GraphRuntime(llm=llm, tools=tools, tool_cache=cache))
+        run.service = run.ChatService(
+            run.SessionManager(),
+            default_persona=args.persona,
+            max_concurrent_turns=args.concurrency,
+        )
+        channels = [FakeChannel(1000 + c, FakeGuild(1)) for c in range(args.channels)]
+        latencies: list[float] = []
+        errors = 0
+
+        async def answer(key: str, batch: list[FakeMessage]):
+            nonlocal errors
+            try:
+                await run.answer_batch(key, batch)  # type: ignore[arg-type]
+            except Exception as e:  # noqa: BLE001 — count and keep going
+                errors += 1
+                print(f"⚠️ {key}: {e!r}", file=sys.stderr)
+                return
+            latencies.append(time.perf_counter() - batch[-1].created)
+
+        queue = TurnQueue(
+            answer, debounce=args.debounce, max_wait=args.max_wait, max_depth=100
+        )
+        rows = workload(args.channels, args.messages, args.rate, args.seed)
+        start = time.perf_counter()
+        for offset, cid, speaker, text in rows:
+            await asyncio.sleep(max(0.0, offset - (time.perf_counter() - start)))
+            msg = channels[cid].user_message(text, speaker)
+            queue.submit(run.make_session_key(msg), msg)
+        await queue.drain()
+        wall = time.perf_counter() - start
+        await nature_cli.remo.close()
+
+        return {
+            "config": {
+                k: v for k, v in vars(args).items() if k not in ("out", "baseline")
+            },
+            "messages": len(rows),
+            "turns": len(latencies),
+            "errors": errors,
+            "wall_s": round(wall, 3),
+            "throughput_msgs_per_s": round(len(rows) / wall, 2),
+            "reply_latency": latency_summary(latencies),
+            "llm_calls": llm.calls,
+            "tool_calls": dict(sorted(llm.tool_calls.items())),
+            "tool_outcomes": tool_outcomes(),
+            "remo_http_calls": sum(remo.calls.values()),
+            "messages_sent": sum(len(c.sent) for c in channels),
+            "message_edits": sum(c.edits for c in channels),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=10, help="per channel")
+    parser.add_argument("--rate", type=float, default=20.0, help="messages/s")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--cpu", type=float, default=0.0)
+    parser.add_argument("--remo-latency", type=float, default=0.05)
+    parser.add_argument("--debounce", type=float, default=run.TURN_DEBOUNCE)
+    parser.add_argument("--max-wait", type=float, default=run.TURN_MAX_WAIT)
+    parser.add_argument("--concurrency", type=int, default=run.MAX_CONCURRENT_TURNS)
+    parser.add_argument("--persona", default="example")
+    parser.add_argument("--no-tool-cache", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if report.get("regressions"):
+        sys.exit(1)
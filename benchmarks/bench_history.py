@@ -0,0 +1,59 @@
+"""Prompt tokens per turn over a long synthetic conversation.
+
+python benchmarks/bench_history.py --messages 1000 --max-tokens 6000
+"""
+
+import argparse
+import json
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from myaa.src.history import HistoryPolicy, window
+
+
+def synthetic_turn(i: int) -> list[BaseMessage]:
+    """One user turn; every 5th turn goes through a tool call."""
+    msgs: list[BaseMessage] = [
+        HumanMessage(f"user{i % 7}: 今日の予定について {i} " * 4)
+    ]
+    if i % 5 == 0:
+        call = {"name": "get_room_temp", "args": {}, "id": f"call-{i}"}
+        msgs.append(AIMessage("", tool_calls=[call]))
+        msgs.append(ToolMessage("27.5", tool_call_id=f"call-{i}"))
+    msgs.append(AIMessage(f"了解しました。返答 {i} " * 6))
+    return msgs
+
+
+def run(total: int, policy: HistoryPolicy) -> dict:
+    history: list[BaseMessage] = []
+    unbounded: list[int] = []
+    bounded: list[int] = []
+    i = 0
+    while len(history) < total:
+        turn = synthetic_turn(i)
+        history.append(turn[0])
+        unbounded.append(count_tokens_approximately(history))
+        bounded.append(count_tokens_approximately(window(history, policy)))
+        history.extend(turn[1:])
+        i += 1
+    return {
+        "messages": len(history),
+        "turns": i,
+        "policy": policy.__dict__,
+        "unbounded_last": unbounded[-1],
+        "unbounded_mean": round(sum(unbounded) / len(unbounded)),
+        "bounded_last": bounded[-1],
+        "bounded_mean": round(sum(bounded) / len(bounded)),
+        "bounded_max": max(bounded),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--max-messages", type=int, default=40)
+    parser.add_argument("--max-tokens", type=int, default=6000)
+    args = parser.parse_args()
+    policy = HistoryPolicy(max_messages=args.max_messages, max_tokens=args.max_tokens)
+    print(json.dumps(run(args.messages, policy)))
@@ -0,0 +1,83 @@
+"""Import-time and cold-start benchmark (``python -X importtime``).
+
+    python benchmarks/bench_import.py --budget-ms 300
+
+Exits non-zero when importing ``myaa.src.graph_setup`` exceeds the budget,
+so CI can track it.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+COLD_START = """
+import time
+t = time.perf_counter()
+from common import FakeChatModel
+from myaa.src.graph_setup import GraphRuntime
+GraphRuntime(llm=FakeChatModel(), tools=[]).compiled_graph
+print(time.perf_counter() - t)
+"""
+
+
+def _env() -> dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([ROOT, os.path.join(ROOT, "benchmarks")])
+    # a cold import must not depend on secrets being present
+    for key in ("GEMINI_MODEL", "DISCORD_BOT_TOKEN", "TAVILY_API_KEY"):
+        env.pop(key, None)
+    return env
+
+
+def import_ms(module: str) -> float:
+    """Cumulative import time of ``module`` as reported by -X importtime."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=_env(),
+        check=True,
+    )
+    for line in proc.stderr.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"{module} not found in importtime output")
+
+
+def cold_start_ms() -> float:
+    proc = subprocess.run(
+        [sys.executable, "-c", COLD_START],
+        capture_output=True,
+        text=True,
+        env=_env(),
+        check=True,
+    )
+    return float(proc.stdout.strip().splitlines()[-1]) * 1000
+
+
+def best_of(fn, *args, repeat: int) -> float:
+    return min(fn(*args) for _ in range(repeat))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+    report = {
+        "graph_setup_import_ms": round(
+            best_of(import_ms, "myaa.src.graph_setup", repeat=args.repeat), 1
+        ),
+        "discord_run_import_ms": round(
+            best_of(import_ms, "myaa.adapter.discord.run", repeat=args.repeat), 1
+        ),
+        "graph_cold_start_ms": round(best_of(cold_start_ms, repeat=args.repeat), 1),
+    }
+    print(json.dumps(report))
+    if args.budget_ms is not None and report["graph_setup_import_ms"] > args.budget_ms:
+        sys.exit(f"graph_setup import took {report['graph_setup_import_ms']} ms")
@@ -0,0 +1,181 @@
+"""Long-term memory: indexing, recall latency at 100k memories, eviction.
+
+python benchmarks/bench_memory.py --items 100000 --queries 500
+
+* "index": ``--items`` synthetic facts about ``--speakers`` people are
+  added in batches of ``--batch`` (as extraction would), then ``--planted``
+  known facts; reports facts/s and the size of the vector file
+* "recall": ``--queries`` recalls by random speakers (distinct texts, so
+  the per-turn cache never answers), latency p50/p95/p99, the same when
+  the speaker filter keeps everything (full scan), and how often a planted
+  fact comes back for a question about it (recall@k)
+* "evict": ``--items`` more facts with ``max_items=--items``; the index
+  stays at the cap and the vector file does not grow
+* "graph": a persona learns a fact in one channel (stub model answering
+  the extraction prompt) and gets it in its prompt in another channel
+
+Uses the local hashing embedder in a temporary directory.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Any
+
+from common import FakeChatModel, latency_summary, peak_rss_mb
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+from myaa.src.graph_setup import GraphRuntime, set_runtime, stream_turn
+from myaa.src.memory import MEMORY_HEADER, LongTermMemory
+
+PERSONA = "example"
+TOPICS = [
+    "コーヒー", "紅茶", "カレー", "ラーメン", "寿司", "猫", "犬", "登山", "釣り",
+    "映画", "ピアノ", "ギター", "サッカー", "野球", "読書", "旅行", "料理",
+    "写真", "キャンプ", "ゲーム", "アニメ", "温泉", "自転車", "マラソン",
+]  # fmt: skip
+PLACES = ["東京", "大阪", "札幌", "福岡", "名古屋", "京都", "仙台", "神戸"]
+FORMS = [
+    "{t}が好き",
+    "{p}に住んでいる",
+    "毎週{t}をしている",
+    "{p}で{t}を始めた",
+    "{t}は苦手",
+    "来月{p}へ{t}の旅行に行く予定",
+]
+
+
+def fact(rng: random.Random) -> str:
+    text = rng.choice(FORMS).format(t=rng.choice(TOPICS), p=rng.choice(PLACES))
+    return f"{text}（{rng.randrange(10_000)}）"
+
+
+async def fill(memory: LongTermMemory, n: int, speakers: int, batch: int, rng):
+    for start in range(0, n, batch):
+        facts = [
+            (f"user{rng.randrange(speakers)}", fact(rng))
+            for _ in range(min(batch, n - start))
+        ]
+        await memory.add(PERSONA, facts)
+
+
+async def bench_index(memory: LongTermMemory, args, rng) -> dict:
+    start = time.perf_counter()
+    await fill(memory, args.items, args.speakers, args.batch, rng)
+    elapsed = time.perf_counter() - start
+    planted = [(f"user{i}", f"好きな花はひまわり{i}番") for i in range(args.planted)]
+    await memory.add(PERSONA, planted)
+    path = memory._vector_path(PERSONA)
+    return {
+        "phase": "index",
+        "items": memory.stats()[PERSONA]["items"],
+        "facts_per_s": round(args.items / elapsed),
+        "vector_file_mb": round(os.path.getsize(path) / 2**20, 1),
+    }
+
+
+async def bench_recall(memory: LongTermMemory, args, rng) -> dict:
+    latencies = []
+    for i in range(args.queries):
+        speaker = f"user{rng.randrange(args.speakers)}"
+        query = f"{rng.choice(TOPICS)}について {i}"
+        start = time.perf_counter()
+        await memory.recall(PERSONA, [speaker], query)
+        latencies.append(time.perf_counter() - start)
+    # worst case: the speaker filter keeps every row, so the whole index is read
+    everyone = [f"user{i}" for i in range(args.speakers)]
+    full_scan = []
+    for i in range(args.queries // 5):
+        start = time.perf_counter()
+        await memory.recall(PERSONA, everyone, f"{rng.choice(TOPICS)} {i}")
+        full_scan.append(time.perf_counter() - start)
+    found = 0
+    for i in range(args.planted):
+        got = await memory.recall(PERSONA, [f"user{i}"], "好きな花は何だっけ？")
+        found += any("ひまわり" in m.text for m in got)
+    return {
+        "phase": "recall",
+        "queries": args.queries,
+        "top_k": memory.top_k,
+        "latency": latency_summary(latencies),
+        "latency_full_scan": latency_summary(full_scan),
+        "planted_recall_at_k": round(found / max(1, args.planted), 3),
+    }
+
+
+async def bench_evict(memory: LongTermMemory, args, rng) -> dict:
+    path = memory._vector_path(PERSONA)
+    before = os.path.getsize(path)
+    memory.max_items = args.items
+    await fill(memory, args.items, args.speakers, args.batch, rng)
+    return {
+        "phase": "evict",
+        "items": memory.stats()[PERSONA]["items"],
+        "max_items": memory.max_items,
+        "vector_file_growth_mb": round((os.path.getsize(path) - before) / 2**20, 1),
+    }
+
+
+class RememberingModel(FakeChatModel):
+    """Answers extraction prompts with a fact; records the prompts it got."""
+
+    prompts: list[list[BaseMessage]] = Field(default_factory=list)
+
+    async def _agenerate(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        self.prompts.append(messages)
+        text = str(messages[-1].content)
+        reply = (
+            "alice | 猫アレルギーなので猫カフェには行けない"
+            if "name | fact" in text
+            else "うん"
+        )
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(reply))])
+
+
+async def bench_graph(root: str) -> dict:
+    memory = LongTermMemory(os.path.join(root, "graph"), extract_every=2)
+    llm = RememberingModel(latency=0)
+    set_runtime(GraphRuntime(llm=llm, tools=[], memory=memory))
+    for text in ("実は猫アレルギーなんだ", "だから猫カフェは行けない"):
+        async for _ in stream_turn("channel-a", [("alice", text)], PERSONA):
+            pass
+    await memory.drain()
+    async for _ in stream_turn("channel-b", [("alice", "猫カフェ行かない？")], PERSONA):
+        pass
+    system = [str(m.content) for m in llm.prompts[-1] if isinstance(m, SystemMessage)]
+    recalled = [s for s in system if s.startswith(MEMORY_HEADER)]
+    return {
+        "phase": "graph",
+        "stored": memory.stats()[PERSONA]["items"],
+        "recalled_in_other_channel": recalled[0].splitlines()[1:] if recalled else [],
+    }
+
+
+async def main(args) -> None:
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as root:
+        memory = LongTermMemory(root, max_items=10 * args.items)
+        for phase in (bench_index, bench_recall, bench_evict):
+            print(json.dumps(await phase(memory, args, rng), ensure_ascii=False))
+        memory.close()
+        print(json.dumps(await bench_graph(root), ensure_ascii=False))
+    print(json.dumps({"peak_rss_mb": peak_rss_mb()}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--speakers", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--planted", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args))
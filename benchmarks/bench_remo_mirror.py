@@ -0,0 +1,123 @@
+"""Nature Remo API calls and tool latency: background mirror vs polling per question.
+
+python benchmarks/bench_remo_mirror.py --questions 300 --minutes 30 --scale 0.01
+
+Simulates ``--minutes`` of a room against ``FakeRemo``, compressed in time by
+``--scale`` (0.01: one simulated minute takes 0.6 s). Questions about the
+temperature / AC / light arrive in Poisson fashion, with an occasional
+set_ac, while the temperature drifts across ``--threshold`` (with sensor
+noise of up to ``--jitter`` degrees either way). "direct" is the
+previous behaviour (each question fetches unless the 5 s TTL is still warm);
+"mirror" runs :class:`RemoMirror` with its default schedule. Reports Remo
+HTTP calls per question, the peak calls in any 5-minute window (the API
+allows 30), status-read latency, and the threshold events the mirror saw
+(one "up" and one "down" despite the noise, thanks to the hysteresis).
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import fake_remo
+from common import latency_summary
+
+from myaa.src.tools.nature_cli import NatureRemoClient
+from myaa.src.tools.remo_mirror import RemoEvent, RemoMirror
+
+
+async def run(mode: str, args) -> dict:
+    scale = args.scale
+    rng = random.Random(args.seed)
+    async with fake_remo.FakeRemo(latency=args.remo_latency * scale) as remo:
+        client = NatureRemoClient(
+            "bench",
+            base_url=remo.url,
+            ttl=5 * scale,
+            scheduler_options={"limit": 10**6},  # measure calls, don't throttle
+        )
+        sent: list[float] = []
+        client_send = client._send
+
+        async def counting_send(method, path, data=None):
+            sent.append(time.monotonic())
+            return await client_send(method, path, data)
+
+        client._send = counting_send  # type: ignore[method-assign]
+        events: list[RemoEvent] = []
+        mirror = None
+        if mode == "mirror":
+            mirror = RemoMirror(
+                client,
+                idle=60 * scale,
+                active=15 * scale,
+                active_for=60 * scale,
+            )
+            mirror.set_thresholds([args.threshold])
+
+            async def collect(event: RemoEvent) -> None:
+                events.append(event)
+
+            mirror.subscribe(collect)
+            mirror.start()
+
+        duration = args.minutes * 60 * scale
+        reads: list[float] = []
+        start = time.monotonic()
+        arrivals = sorted(rng.uniform(0, duration) for _ in range(args.questions))
+        for at in arrivals:
+            await asyncio.sleep(max(0.0, at - (time.monotonic() - start)))
+            # temperature drifts across the threshold and back
+            progress = (time.monotonic() - start) / duration
+            drift = args.threshold - 1.5 + 3 * (1 - abs(1 - 2 * progress))
+            remo.temperature = drift + rng.uniform(-args.jitter, args.jitter)
+            if rng.random() < args.writes:
+                await client.send_aircon(
+                    fake_remo.AC_ID, {"operation_mode": "cool", "temperature": "26"}
+                )
+                continue
+            t0 = time.perf_counter()
+            if rng.random() < 0.5:
+                (await client.devices()).get(fake_remo.DEVICE_ID)
+            else:
+                (await client.appliances()).get(fake_remo.AC_ID)
+            reads.append(time.perf_counter() - t0)
+        if mirror:
+            await mirror.stop()
+        await client.close()
+
+    window = 300 * scale
+    peak = max((sum(1 for u in sent if t <= u < t + window) for t in sent), default=0)
+    return {
+        "mode": mode,
+        "questions": args.questions,
+        "minutes": args.minutes,
+        "remo_http_calls": len(sent),
+        "calls_per_question": round(len(sent) / args.questions, 3),
+        "peak_calls_per_5min": peak,
+        "read_latency_ms": {  # in simulated time
+            k.removesuffix("_s"): round(v / scale * 1000, 1)
+            for k, v in latency_summary(reads).items()
+        },
+        "threshold_events": [
+            f"{e.direction} {e.old:.2f}->{e.new:.2f}"
+            for e in events
+            if e.kind == "threshold"
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--minutes", type=float, default=30)
+    parser.add_argument("--writes", type=float, default=0.05, help="share of set_ac")
+    parser.add_argument("--threshold", type=float, default=28.0)
+    parser.add_argument("--jitter", type=float, default=0.3, help="degrees")
+    parser.add_argument("--remo-latency", type=float, default=0.3, help="seconds")
+    parser.add_argument("--scale", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for mode in ("direct", "mirror"):
+        print(json.dumps(asyncio.run(run(mode, args)), ensure_ascii=False))
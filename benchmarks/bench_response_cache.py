@@ -0,0 +1,134 @@
+"""Response cache: model calls and reply latency for repeated prompts.
+
+python benchmarks/bench_response_cache.py --channels 40 --jihou-channels 10
+
+Two personas share ``--channels`` chat channels (alternating). In each
+channel ``alice`` or ``bob`` greets with one of a few wordings, asks a
+question nobody else asks, then says thanks. ``--jihou-channels`` more
+channels get the nightly lights-off instruction, which the stub model
+answers by calling ``set_light`` (a side-effecting tool) before replying.
+Channels run ``--concurrency`` at a time; every model call takes
+``--latency`` seconds. The same workload runs:
+
+* "off": no response cache
+* "exact": ``RESPONSE_CACHE=1`` with ``RESPONSE_CACHE_SIMILARITY=0``
+* "similar": plus the similarity tier (local hashing embedder)
+
+Reports model calls, ``set_light`` calls (must not drop with the cache),
+reply latency and the cache's per-persona stats.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any
+
+from common import ScriptedChatModel, latency_summary
+from langchain_core.tools import tool
+
+from myaa.src.embeddings import HashingEmbedder
+from myaa.src.graph_setup import GraphRuntime, set_runtime, stream_turn
+from myaa.src.personas import PersonaRegistry
+from myaa.src.response_cache import ResponseCache
+from myaa.src.tool_cache import invalidates
+
+# same text as LIGHTS_OFF_PROMPT in myaa/adapter/discord/run.py
+LIGHTS_OFF_PROMPT = (
+    "INSTRUCTION: 0時になりました。ツールを使用して部屋の照明を消灯してください。"
+)
+GREETINGS = [
+    "おはようございます",
+    "おはようございます！",
+    "おはようございます、みんな",
+    "みんなおはようございます",
+    "みんな、おはようございます！",
+]
+PERSONAS = {
+    "default_persona": "alpha",
+    "alpha": {"name": "Alpha", "description": "You are a calm assistant."},
+    "beta": {"name": "Beta", "description": "You are a cheerful assistant."},
+}
+light_calls = 0
+
+
+@invalidates("light")
+@tool
+def set_light(action: str) -> str:
+    """部屋の照明を操作します。"""
+    global light_calls
+    light_calls += 1
+    return json.dumps({"ok": True, "action": action})
+
+
+def make_cache(setup: str) -> ResponseCache | None:
+    if setup == "off":
+        return None
+    return ResponseCache(embedder=HashingEmbedder() if setup == "similar" else None)
+
+
+async def run(setup: str, args) -> dict:
+    global light_calls
+    light_calls = 0
+    llm = ScriptedChatModel(
+        latency=args.latency,
+        reply="はい",
+        script={"消灯": ("set_light", {"action": "off"})},
+    )
+    cache = make_cache(setup)
+    set_runtime(
+        GraphRuntime(
+            llm=llm,
+            tools=[set_light],
+            personas=PersonaRegistry(data=PERSONAS),
+            response_cache=cache,
+        )
+    )
+    latencies: list[float] = []
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def turn(thread: str, speaker: str, text: str, persona: str) -> None:
+        start = time.perf_counter()
+        async for _ in stream_turn(thread, [(speaker, text)], persona):
+            pass
+        latencies.append(time.perf_counter() - start)
+
+    async def chat(i: int) -> None:
+        async with sem:
+            thread, persona = f"{setup}-chat-{i}", ("alpha", "beta")[i % 2]
+            speaker = ("alice", "bob")[i // 2 % 2]
+            await turn(thread, speaker, GREETINGS[i % len(GREETINGS)], persona)
+            await turn(thread, speaker, f"{i}番の質問です", persona)
+            await turn(thread, speaker, "ありがとう", persona)
+
+    async def jihou(i: int) -> None:
+        async with sem:
+            await turn(f"{setup}-jihou-{i}", "時報", LIGHTS_OFF_PROMPT, "alpha")
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(chat(i) for i in range(args.channels)),
+        *(jihou(i) for i in range(args.jihou_channels)),
+    )
+    out: dict[str, Any] = {
+        "setup": setup,
+        "turns": len(latencies),
+        "llm_calls": llm.calls,
+        "set_light_calls": light_calls,
+        "reply_latency": latency_summary(latencies),
+        "wall_s": round(time.perf_counter() - start, 2),
+    }
+    if cache is not None:
+        out["cache"] = cache.stats()
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channels", type=int, default=40)
+    parser.add_argument("--jihou-channels", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+    for setup in ("off", "exact", "similar"):
+        print(json.dumps(asyncio.run(run(setup, args)), ensure_ascii=False))
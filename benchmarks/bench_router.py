@@ -0,0 +1,143 @@
+"""Model failover, circuit breakers and hedging through the graph.
+
+python benchmarks/bench_router.py --turns 200 --concurrency 10
+
+Two stub providers stream their reply word by word: "primary" is fast but
+fails ``--error-rate`` of its requests and stalls for ``--stall`` seconds
+on ``--slow-rate`` of them; "backup" is slower and reliable. Every setup
+runs the same turns through ``stream_tokens``:
+
+* "single": the primary alone, as before (no router)
+* "failover": primary then backup, ``--timeout`` per attempt
+* "hedge": as failover, plus a backup request once the primary is slower
+  than its recent p95 time to first chunk
+* "outage": the primary is down for the whole run; the breaker stops
+  sending it requests after 3 failures (requests already in flight
+  still go out)
+
+Reports failed turns, time to first token, requests sent per provider and
+whether any reply was streamed twice (duplicate tokens).
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+from common import FakeChatModel, latency_summary
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+from myaa.src.graph_setup import GraphRuntime, set_runtime, stream_tokens
+from myaa.src.model_router import ModelRouter, RouterStats
+
+REPLY = "今日は 晴れ です よ"
+
+
+class FlakyModel(FakeChatModel):
+    """Fails or stalls before its first chunk at seeded random rates."""
+
+    error_rate: float = 0.0
+    slow_rate: float = 0.0
+    stall: float = 0.0
+    seed: int = 0
+    rng: Any = None
+
+    def model_post_init(self, context: Any) -> None:
+        self.rng = random.Random(self.seed)
+
+    async def _astream(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        roll = self.rng.random()
+        if roll < self.error_rate:
+            self.calls += 1
+            await asyncio.sleep(self.latency / 2)
+            raise ConnectionError("503 service unavailable")
+        if roll < self.error_rate + self.slow_rate:
+            await asyncio.sleep(self.stall)
+        async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+            yield chunk
+
+
+def make_llm(setup: str, args) -> Any:
+    primary = FlakyModel(
+        latency=args.latency,
+        token_latency=0.005,
+        reply=REPLY,
+        error_rate=1.0 if setup == "outage" else args.error_rate,
+        slow_rate=args.slow_rate,
+        stall=args.stall,
+        seed=1,
+    )
+    backup = FlakyModel(
+        latency=args.latency * 2, token_latency=0.005, reply=REPLY, seed=2
+    )
+    if setup == "single":
+        return primary, backup, primary
+    router = ModelRouter(
+        routes=[("primary", primary), ("backup", backup)],
+        timeout=args.timeout,
+        hedge=setup == "hedge",
+        hedge_min=args.hedge_min,
+        router_stats=RouterStats(failures=3, cooldown=args.cooldown),
+    )
+    return primary, backup, router
+
+
+async def run(setup: str, args) -> dict:
+    primary, backup, llm = make_llm(setup, args)
+    set_runtime(GraphRuntime(llm=llm, tools=[]))
+    first_token: list[float] = []
+    failed = duplicated = 0
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def turn(i: int) -> None:
+        nonlocal failed, duplicated
+        async with sem:
+            start = time.perf_counter()
+            text = ""
+            try:
+                async for piece in stream_tokens(
+                    f"{setup}-{i}", [("user", "天気は？")], "example"
+                ):
+                    if not text:
+                        first_token.append(time.perf_counter() - start)
+                    text += piece
+            except (ConnectionError, RuntimeError):  # incl. AllRoutesFailed
+                failed += 1
+                return
+            duplicated += text != REPLY
+
+    start = time.perf_counter()
+    await asyncio.gather(*(turn(i) for i in range(args.turns)))
+    out: dict[str, Any] = {
+        "setup": setup,
+        "failed_turns": failed,
+        "duplicated_replies": duplicated,
+        "first_token": latency_summary(first_token),
+        "requests": {"primary": primary.calls, "backup": backup.calls},
+        "wall_s": round(time.perf_counter() - start, 2),
+    }
+    if isinstance(llm, ModelRouter):
+        out["routes"] = llm.stats()
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--stall", type=float, default=2.0)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    parser.add_argument("--hedge-min", type=float, default=0.1)
+    parser.add_argument("--cooldown", type=float, default=30.0)
+    args = parser.parse_args()
+    for setup in ("single", "failover", "hedge", "outage"):
+        print(json.dumps(asyncio.run(run(setup, args)), ensure_ascii=False))
@@ -0,0 +1,59 @@
+"""Midnight fan-out: one scheduled job per channel firing at the same slot.
+
+python benchmarks/bench_scheduler.py --channels 20 --latency 0.5 --bound 4
+
+The clock is injected, so no real waiting for midnight happens. Compares
+``--bound 1`` (channels one after another, like the old 60 s loop) with
+the configured bound, and checks that every job fired exactly once.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from common import FakeChatModel
+
+from myaa.adapter.discord import run
+from myaa.src.graph_setup import GraphRuntime, set_runtime
+from myaa.src.scheduler import JST, Job, Scheduler
+
+
+async def fan_out(channels: int, latency: float, bound: int) -> dict:
+    set_runtime(GraphRuntime(llm=FakeChatModel(latency=latency), tools=[]))
+    service = run.ChatService(run.SessionManager(), default_persona="example")
+    now = [datetime(2026, 1, 1, 23, 59, tzinfo=JST).timestamp()]
+    fired: list[int] = []
+
+    async def handler(job: Job):
+        key = f"{job.channel_id}:{job.channel_id}"
+        await service.chat(key, job.prompt, speaker=run.REMINDER_SPEAKER)
+        fired.append(job.channel_id)
+
+    scheduler = Scheduler(handler, clock=lambda: now[0], max_concurrent=bound)
+    for cid in range(channels):
+        scheduler.add(cid, "0 0 * * *", run.LIGHTS_OFF_PROMPT, kind="jihou")
+    now[0] += 60
+    start = time.perf_counter()
+    await scheduler.run_due()
+    await scheduler.run_due()  # same slot again: must not fire twice
+    await scheduler.drain()
+    elapsed = time.perf_counter() - start
+    return {
+        "channels": channels,
+        "bound": bound,
+        "fan_out_s": round(elapsed, 3),
+        "fired": len(fired),
+        "exactly_once": sorted(fired) == list(range(channels)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--bound", type=int, default=run.SCHEDULE_MAX_CONCURRENT)
+    args = parser.parse_args()
+    for bound in (1, args.bound):
+        print(json.dumps(asyncio.run(fan_out(args.channels, args.latency, bound))))
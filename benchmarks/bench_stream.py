@@ -0,0 +1,64 @@
+"""Time to first visible output: whole-turn replies vs token streaming.
+
+python benchmarks/bench_stream.py --latency 0.4 --token-latency 0.03 --words 150
+
+"turn" is the old path (``stream_chat``; the reply is sent once the turn
+finishes). "stream" is ``stream_tokens`` fed into ``ProgressiveReply``
+against a fake channel; it also reports how many sends/edits were made.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from common import FakeChatModel, percentile
+from fake_discord import FakeChannel
+
+from myaa.adapter.discord.streaming import ProgressiveReply
+from myaa.src.graph_setup import GraphRuntime, set_runtime, stream_chat, stream_tokens
+
+
+async def main(args) -> dict:
+    reply = " ".join(f"word{i}" for i in range(args.words))
+    llm = FakeChatModel(
+        latency=args.latency, token_latency=args.token_latency, reply=reply
+    )
+    set_runtime(GraphRuntime(llm=llm, tools=[]))
+    turn, stream, totals = [], [], []
+    sends = edits = 0
+    for i in range(args.turns):
+        start = time.perf_counter()
+        async for _ in stream_chat(f"turn{i}", "hello", "example", "bench"):
+            pass
+        turn.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        channel = FakeChannel(i)
+        progressive = ProgressiveReply(channel, interval=args.interval)
+        async for delta in stream_tokens(f"stream{i}", [("bench", "hello")], "example"):
+            await progressive.feed(delta)
+        await progressive.close()
+        totals.append(time.perf_counter() - start)
+        stream.append(channel.log[0][1] - start)
+        sends += len(channel.sent)
+        edits += channel.edits
+    return {
+        "reply_chars": len(reply),
+        "turn_first_output_p50_s": round(percentile(turn, 50), 3),
+        "stream_first_output_p50_s": round(percentile(stream, 50), 3),
+        "stream_total_p50_s": round(percentile(totals, 50), 3),
+        "messages_per_reply": sends / args.turns,
+        "edits_per_reply": edits / args.turns,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.4)
+    parser.add_argument("--token-latency", type=float, default=0.03)
+    parser.add_argument("--words", type=int, default=150)
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args))))
@@ -0,0 +1,112 @@
+"""Tool result cache under a mixed read/write workload.
+
+python benchmarks/bench_tool_cache.py --steps 200 --latency 0.05
+
+Random steps ask for the room temperature, AC/light status, a search from a
+small pool of queries (with varying case/spacing), or switch the light.
+Reports per-tool hit rate and estimated latency saved, plus the step time
+with and without the cache.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+from myaa.src.tool_cache import ToolCache, cacheable, invalidates
+from myaa.src.tool_exec import ParallelToolNode
+
+
+def make_tools(latency: float):
+    @cacheable(60, tags=("room",))
+    @tool
+    async def get_room_temp() -> str:
+        """室温"""
+        await asyncio.sleep(latency)
+        return "24.5"
+
+    @cacheable(30, tags=("light",))
+    @tool
+    async def get_light_status() -> str:
+        """照明"""
+        await asyncio.sleep(latency)
+        return "ON"
+
+    @invalidates("light")
+    @tool
+    async def set_light(action: str) -> str:
+        """照明操作"""
+        await asyncio.sleep(latency)
+        return "✅"
+
+    @cacheable(3600, persist=True)
+    @tool
+    async def web_search(query: str) -> str:
+        """検索"""
+        await asyncio.sleep(latency * 10)
+        return f"results for {query}"
+
+    return [get_room_temp, get_light_status, set_light, web_search]
+
+
+def workload(steps: int, seed: int) -> list[AIMessage]:
+    rng = random.Random(seed)
+    queries = ["tokyo weather", "Tokyo  Weather", "train delays", "news today"]
+    out = []
+    for i in range(steps):
+        r = rng.random()
+        if r < 0.3:
+            call = {"name": "get_room_temp", "args": {}}
+        elif r < 0.6:
+            call = {"name": "get_light_status", "args": {}}
+        elif r < 0.7:
+            call = {"name": "set_light", "args": {"action": "on"}}
+        else:
+            call = {"name": "web_search", "args": {"query": rng.choice(queries)}}
+        out.append(AIMessage(content="", tool_calls=[{**call, "id": f"c{i}"}]))
+    return out
+
+
+async def run(steps: list[AIMessage], cache: ToolCache | None, latency: float):
+    node = ParallelToolNode(make_tools(latency), cache=cache)
+    start = time.perf_counter()
+    for msg in steps:
+        await node.run({"messages": [msg]})
+    return time.perf_counter() - start
+
+
+async def main(args) -> dict:
+    steps = workload(args.steps, args.seed)
+    path = os.path.join(tempfile.mkdtemp(), "tool_cache.sqlite")
+    uncached = await run(steps, None, args.latency)
+    cache = ToolCache(path=path)
+    cached = await run(steps, cache, args.latency)
+    stats = cache.stats()
+    cache.close()
+    # a fresh process only has the persisted search results
+    warm = ToolCache(path=path)
+    await run(steps[:20], warm, args.latency)
+    return {
+        "steps": args.steps,
+        "uncached_s": round(uncached, 3),
+        "cached_s": round(cached, 3),
+        "per_tool": stats,
+        "after_restart_search_hit_rate": warm.stats()
+        .get("web_search", {})
+        .get("hit_rate"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args)), indent=2))
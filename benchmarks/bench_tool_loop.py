@@ -0,0 +1,123 @@
+"""Runaway tool loops with and without per-turn budgets.
+
+python benchmarks/bench_tool_loop.py --turns 10 --latency 0.05
+
+The model stub never stops asking for tools: every step it requests
+``get_light_status`` plus a web search for the same query. "obedient"
+answers once it is told the budget is spent; "stubborn" keeps asking even
+then. "unbounded" is the previous graph (no budget): the turn runs until
+LangGraph's recursion limit. Reports LLM calls and tool executions per
+turn, duplicate calls served from earlier results, and turn time.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any
+
+from common import FakeChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from langgraph.errors import GraphRecursionError
+
+from myaa.src.graph_setup import GraphRuntime, set_runtime, stream_turn
+from myaa.src.tool_cache import cacheable
+from myaa.src.turn_budget import DUPLICATES, FINAL_ANSWER_PROMPT, TurnBudget
+
+# measure the in-turn duplicate short-circuit, not the cross-turn tool cache
+os.environ["TOOL_CACHE"] = "0"
+executed = {"get_light_status": 0, "web_search": 0}
+
+
+@cacheable(30)  # read-only: repeats within a turn may be served
+@tool
+async def get_light_status() -> str:
+    """照明"""
+    executed["get_light_status"] += 1
+    return "ON"
+
+
+@cacheable(3600)
+@tool
+async def web_search(query: str) -> str:
+    """検索"""
+    executed["web_search"] += 1
+    return f"results for {query}"
+
+
+class LoopingModel(FakeChatModel):
+    stubborn: bool = False
+
+    def _message(self, messages: list[BaseMessage]) -> AIMessage:
+        last = messages[-1]
+        told = isinstance(last, HumanMessage) and last.content == FINAL_ANSWER_PROMPT
+        if told and not self.stubborn:
+            return AIMessage("照明はついています")
+        n = sum(isinstance(m, AIMessage) for m in messages)
+        return AIMessage(
+            "",
+            tool_calls=[
+                {"name": "get_light_status", "args": {}, "id": f"a{n}"},
+                {"name": "web_search", "args": {"query": "light"}, "id": f"b{n}"},
+            ],
+        )
+
+    async def _agenerate(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        self.calls += 1
+        msg = self._message(messages)
+        return ChatResult(generations=[ChatGeneration(message=msg)])
+
+
+async def run(mode: str, args) -> dict:
+    budget = (
+        TurnBudget(0, 0, 0, dedupe=False)
+        if mode == "unbounded"
+        else TurnBudget(args.max_llm_calls, args.max_tool_calls, args.max_seconds)
+    )
+    llm = LoopingModel(latency=args.latency, stubborn=mode == "stubborn")
+    set_runtime(
+        GraphRuntime(llm=llm, tools=[get_light_status, web_search], turn_budget=budget)
+    )
+    for key in executed:
+        executed[key] = 0
+    errors, replies = 0, []
+    duplicates = sum(v for _, v in DUPLICATES.samples())
+    start = time.perf_counter()
+    for turn in range(args.turns):
+        try:
+            async for reply in stream_turn(
+                f"{mode}-{turn}", [("user", "電気ついてる？")], "example"
+            ):
+                pass
+            replies.append(reply)
+        except GraphRecursionError:
+            errors += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "llm_calls_per_turn": llm.calls / args.turns,
+        "tool_runs_per_turn": sum(executed.values()) / args.turns,
+        "duplicates_per_turn": (sum(v for _, v in DUPLICATES.samples()) - duplicates)
+        / args.turns,
+        "recursion_errors": errors,
+        "turn_s": round(elapsed / args.turns, 3),
+        "last_reply": replies[-1] if replies else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--max-llm-calls", type=int, default=TurnBudget.max_llm_calls)
+    parser.add_argument("--max-tool-calls", type=int, default=TurnBudget.max_tool_calls)
+    parser.add_argument("--max-seconds", type=float, default=TurnBudget.max_seconds)
+    args = parser.parse_args()
+    for mode in ("unbounded", "obedient", "stubborn"):
+        print(json.dumps(asyncio.run(run(mode, args)), ensure_ascii=False))
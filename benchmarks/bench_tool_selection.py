@@ -0,0 +1,125 @@
+"""Prompt tokens and time to first token with per-turn tool selection.
+
+python benchmarks/bench_tool_selection.py --turns 20 --prefill-ms 0.25
+
+Runs the real default tools (Tavily schema included; nothing is called)
+through the graph under three setups:
+
+* "all": every tool bound, as before (Remo fully configured)
+* "no-remo": the ``REMO_*`` settings are unset, so the Remo tools are
+  excluded automatically
+* "persona": a room-control persona lists four tools (no web search)
+
+The model stub charges ``--latency`` plus ``--prefill-ms`` per prompt token
+(messages + bound tool schemas, estimated like ``count_tokens_approximately``)
+before its first token. Reports tool-schema tokens, prompt tokens per call,
+time to first token and how often ``bind_tools`` ran.
+"""
+
+import os
+
+os.environ.setdefault("TAVILY_API_KEY", "bench")  # schema only, never called
+os.environ.setdefault("NATURE_REMO_TOKEN", "bench")
+
+import argparse
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+from common import ScriptedChatModel, percentile
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+from myaa.src.chat_graph import default_tools
+from myaa.src.graph_setup import GraphRuntime, set_runtime, stream_tokens
+from myaa.src.personas import PersonaRegistry
+
+REMO_ENV = ("REMO_DEVICE_ID", "REMO_AC_ID", "REMO_LIGHT_ID")
+
+
+def schema_tokens(tools: list) -> int:
+    text = json.dumps([convert_to_openai_tool(t) for t in tools], ensure_ascii=False)
+    return count_tokens_approximately([SystemMessage(text)])
+
+
+class PrefillModel(ScriptedChatModel):
+    """Scripted model whose first token waits for the prompt to be "read"."""
+
+    prefill: float = 0.0
+    schema_tokens: int = 0
+    binds: list[int] = Field(default_factory=list)
+    prompts: list[int] = Field(default_factory=list)
+    first_token: list[float] = Field(default_factory=list)
+
+    def bind_tools(self, tools, **kwargs: Any):  # type: ignore[override]
+        self.binds.append(len(tools))
+        return self.model_copy(update={"schema_tokens": schema_tokens(tools)})
+
+    async def _astream(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        start = time.perf_counter()
+        tokens = count_tokens_approximately(messages) + self.schema_tokens
+        self.prompts.append(tokens)
+        await asyncio.sleep(self.prefill * tokens)
+        first = True
+        async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+            if first:
+                self.first_token.append(time.perf_counter() - start)
+                first = False
+            yield chunk
+
+
+async def run(setup: str, args) -> dict:
+    for name in REMO_ENV:
+        if setup == "no-remo":
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = "bench"
+    persona: dict[str, Any] = {"name": "Bench", "description": "bench"}
+    if setup == "persona":
+        persona["tools"] = [
+            "get_room_temp",
+            "get_ac_status",
+            "set_ac",
+            "get_current_time",
+        ]
+    llm = PrefillModel(
+        latency=args.latency, prefill=args.prefill_ms / 1000, reply="ok " * 20
+    )
+    runtime = GraphRuntime(
+        llm=llm,
+        tools=default_tools(),
+        personas=PersonaRegistry(data={"default_persona": "bench", "bench": persona}),
+    )
+    set_runtime(runtime)
+    for turn in range(args.turns):
+        async for _ in stream_tokens(
+            f"{setup}-{turn % 4}", [("user", f"こんにちは {turn}")], "bench"
+        ):
+            pass
+    bound = runtime.select_tools(runtime.personas.get("bench").tools)
+    return {
+        "setup": setup,
+        "tools_bound": [t.name for t in bound],
+        "schema_tokens": schema_tokens(bound),
+        "prompt_tokens_per_call": round(sum(llm.prompts) / len(llm.prompts)),
+        "first_token_p50_ms": round(percentile(llm.first_token, 50) * 1000, 1),
+        "bind_tools_calls": len(llm.binds),
+        "llm_calls": len(llm.prompts),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--prefill-ms", type=float, default=0.25, help="per token")
+    args = parser.parse_args()
+    for setup in ("all", "no-remo", "persona"):
+        print(json.dumps(asyncio.run(run(setup, args)), ensure_ascii=False))
@@ -0,0 +1,90 @@
+"""One tools step with three status reads and a slow search.
+
+python benchmarks/bench_tools.py --latency 0.3 --slow 5 --timeout 1
+
+"sequential" runs the calls one after another (blocking tools, the old
+behaviour); "parallel" is ``ParallelToolNode``, where the slow call is cut
+off at ``--timeout`` and reported as a structured timeout error.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+from myaa.src.tool_exec import TOOL_LATENCY, ParallelToolNode, ToolLimits
+
+
+def make_tools(latency: float, slow: float):
+    @tool
+    def get_room_temp() -> str:
+        """室温"""
+        time.sleep(latency)
+        return "24.5"
+
+    @tool
+    async def get_ac_status() -> str:
+        """エアコン"""
+        await asyncio.sleep(latency)
+        return "cool 26"
+
+    @tool
+    async def get_light_status() -> str:
+        """照明"""
+        await asyncio.sleep(latency)
+        return "on"
+
+    @tool
+    def web_search(query: str) -> str:
+        """検索"""
+        time.sleep(slow)
+        return "result"
+
+    return [get_room_temp, get_ac_status, get_light_status, web_search]
+
+
+def step_message() -> AIMessage:
+    names = ["get_room_temp", "get_ac_status", "get_light_status"]
+    calls = [{"name": n, "args": {}, "id": f"c{i}"} for i, n in enumerate(names)]
+    calls.append({"name": "web_search", "args": {"query": "x"}, "id": "c9"})
+    return AIMessage(content="", tool_calls=calls)
+
+
+async def main(args) -> list[dict]:
+    tools = make_tools(args.latency, args.slow)
+    msg = step_message()
+
+    start = time.perf_counter()
+    by_name = {t.name: t for t in tools}
+    for call in msg.tool_calls:
+        await by_name[call["name"]].ainvoke(call["args"])
+    sequential = time.perf_counter() - start
+
+    node = ParallelToolNode(
+        tools, ToolLimits(timeout=args.timeout, step_timeout=args.timeout * 2)
+    )
+    start = time.perf_counter()
+    out = await node.run({"messages": [msg]})
+    parallel = time.perf_counter() - start
+    return [
+        {"mode": "sequential", "step_s": round(sequential, 3)},
+        {
+            "mode": "parallel",
+            "step_s": round(parallel, 3),
+            "errors": [m.content for m in out["messages"] if m.status == "error"],
+            "p50_ok_s": TOOL_LATENCY.quantile(0.5, tool="get_ac_status", outcome="ok"),
+        },
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--slow", type=float, default=3.0)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    args = parser.parse_args()
+    for row in asyncio.run(main(args)):
+        print(json.dumps(row, ensure_ascii=False))
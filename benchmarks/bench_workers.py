@@ -0,0 +1,73 @@
+"""Turn throughput with N worker processes (stub LLM with CPU work).
+
+python benchmarks/bench_workers.py --workers 0 1 2 4 --turns 200 --cpu 0.02
+
+``0`` runs every turn in this process's event loop (the default deployment);
+``N > 0`` uses ``WorkerPool``. Each turn costs ``--latency`` seconds of
+waiting plus ``--cpu`` seconds of busy work, the part that one event loop
+cannot overlap.
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import time
+
+from common import fake_runtime, percentile
+
+from myaa.adapter.discord import run
+from myaa.src.graph_setup import set_runtime
+from myaa.src.worker_pool import WorkerPool
+
+
+async def measure(workers: int, args) -> dict:
+    factory = functools.partial(fake_runtime, latency=args.latency, cpu=args.cpu)
+    pool = None
+    if workers:
+        pool = WorkerPool(workers, factory)
+        await pool.wait_ready()
+    else:
+        set_runtime(factory())
+    service = run.ChatService(
+        run.SessionManager(),
+        default_persona="example",
+        max_concurrent_turns=args.concurrency,
+        pool=pool,
+    )
+    latencies: list[float] = []
+
+    async def one(i: int):
+        start = time.perf_counter()
+        await service.chat(f"{i % args.threads}:0", f"hello {i}", "bench")
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.turns)))
+    elapsed = time.perf_counter() - start
+    health = pool.health() if pool else []
+    if pool:
+        await pool.close()
+    return {
+        "workers": workers,
+        "turns": args.turns,
+        "turns_per_s": round(args.turns / elapsed, 1),
+        "p50_s": round(percentile(latencies, 50), 3),
+        "p99_s": round(percentile(latencies, 99), 3),
+        "healthy_workers": sum(w["healthy"] for w in health),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--cpu", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    print(f"# cpus={os.cpu_count()}")
+    for n in args.workers:
+        print(json.dumps(asyncio.run(measure(n, args))))
@@ -0,0 +1,194 @@
+"""Shared helpers for the offline benchmarks (stub LLMs, percentiles, RSS)."""
+
+import asyncio
+import json
+import resource
+import sys
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model stub that answers after a fixed latency.
+
+    ``latency`` is the time to the first token; each further word of
+    ``reply`` takes ``token_latency`` (streamed word by word when the
+    caller streams, in one piece otherwise). ``cpu`` seconds of busy work
+    per call stand in for CPU-bound processing around the model.
+    """
+
+    latency: float = 0.2
+    token_latency: float = 0.0
+    cpu: float = 0.0
+    reply: str = "ok"
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _burn(self) -> None:
+        end = time.process_time() + self.cpu
+        while time.process_time() < end:
+            pass
+
+    def _result(self) -> ChatResult:
+        self._burn()
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(self.reply))])
+
+    def _generate(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        words = max(0, len(self.reply.split()) - 1)
+        await asyncio.sleep(self.latency + words * self.token_latency)
+        return self._result()
+
+    async def _astream(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        self._burn()
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        for i, word in enumerate(self.reply.split(" ")):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            text = word if i == 0 else " " + word
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    def bind_tools(self, tools, **kwargs: Any):  # type: ignore[override]
+        return self
+
+
+# keyword in the user's text -> (tool, args) the scripted model calls
+DEFAULT_SCRIPT: dict[str, tuple[str, dict[str, Any]]] = {
+    "温度": ("get_room_temp", {}),
+    "エアコン": ("get_ac_status", {}),
+    "冷房": ("set_ac", {"mode": "cool", "temp": 26}),
+    "電気": ("get_light_status", {}),
+    "消灯": ("set_light", {"action": "off"}),
+    "時間": ("get_current_time", {}),
+}
+
+
+class ScriptedChatModel(FakeChatModel):
+    """Deterministic agent stub: calls tools by keyword, then answers.
+
+    When the newest human message contains a keyword of ``script``, the
+    model asks for the matching tool call(s) in one step; once the tool
+    results are in, it replies with them. Anything else gets ``reply``.
+    ``tool_calls`` counts the calls it asked for, by tool name.
+    """
+
+    script: dict[str, tuple[str, dict[str, Any]]] = DEFAULT_SCRIPT
+    tool_calls: dict[str, int] = Field(default_factory=dict)
+
+    def _message(self, messages: list[BaseMessage]) -> AIMessage:
+        last = messages[-1] if messages else None
+        if isinstance(last, ToolMessage):
+            results = [m.content for m in messages if isinstance(m, ToolMessage)]
+            return AIMessage(f"{self.reply} ({results[-1]})")
+        text = str(last.content) if isinstance(last, HumanMessage) else ""
+        calls = []
+        for i, (keyword, (name, args)) in enumerate(self.script.items()):
+            if keyword in text:
+                calls.append({"name": name, "args": args, "id": f"call-{i}"})
+                self.tool_calls[name] = self.tool_calls.get(name, 0) + 1
+        return AIMessage("", tool_calls=calls) if calls else AIMessage(self.reply)
+
+    def _result_for(self, messages: list[BaseMessage]) -> ChatResult:
+        self._burn()
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    def _generate(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result_for(messages)
+
+    async def _agenerate(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result_for(messages)
+
+    async def _astream(
+        self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        msg = self._result_for(messages).generations[0].message
+        assert isinstance(msg, AIMessage)
+        if msg.tool_calls:
+            chunks = [
+                {
+                    "name": c["name"],
+                    "args": json.dumps(c["args"]),
+                    "id": c["id"],
+                    "index": i,
+                }
+                for i, c in enumerate(msg.tool_calls)
+            ]
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(content="", tool_call_chunks=chunks)
+            )
+            return
+        for i, word in enumerate(str(msg.content).split(" ")):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            text = word if i == 0 else " " + word
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def fake_runtime(latency: float = 0.2, cpu: float = 0.0, **kwargs: Any):
+    """GraphRuntime on a stub LLM without tools (picklable via functools.partial)."""
+    from myaa.src.graph_setup import GraphRuntime
+
+    llm = FakeChatModel(latency=latency, cpu=cpu, **kwargs)
+    return GraphRuntime(llm=llm, tools=[])
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 < pct <= 100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(values: list[float]) -> dict[str, float]:
+    return {f"p{p}_s": round(percentile(values, p), 4) for p in (50, 95, 99)} | {
+        "max_s": round(max(values, default=0.0), 4)
+    }
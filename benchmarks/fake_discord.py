@@ -0,0 +1,65 @@
+"""Minimal stand-ins for the discord.py objects the adapter touches.
+
+Enough for ``run.answer_batch`` / ``ProgressiveReply``: a channel with
+``send`` and ``typing()``, messages with ``edit``, an author and a guild.
+Every send/edit is timestamped so drivers can measure reply latency.
+"""
+
+import contextlib
+import itertools
+import time
+from dataclasses import dataclass, field
+
+_ids = itertools.count(1)
+
+
+@dataclass
+class FakeAuthor:
+    display_name: str
+    bot: bool = False
+    id: int = field(default_factory=lambda: next(_ids))
+
+
+@dataclass
+class FakeGuild:
+    id: int
+
+
+class FakeMessage:
+    def __init__(self, channel: "FakeChannel", content: str, author: FakeAuthor):
+        self.id = next(_ids)
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.author = author
+        self.created = time.perf_counter()
+
+    async def edit(self, *, content: str):
+        self.content = content
+        self.channel.log.append(("edit", time.perf_counter(), content))
+
+
+@dataclass
+class FakeChannel:
+    id: int
+    guild: FakeGuild = field(default_factory=lambda: FakeGuild(1))
+    bot_author: FakeAuthor = field(default_factory=lambda: FakeAuthor("bot", True))
+    log: list[tuple[str, float, str]] = field(default_factory=list)
+    sent: list[FakeMessage] = field(default_factory=list)
+
+    async def send(self, content: str) -> FakeMessage:
+        msg = FakeMessage(self, content, self.bot_author)
+        self.sent.append(msg)
+        self.log.append(("send", time.perf_counter(), content))
+        return msg
+
+    def typing(self):
+        return contextlib.nullcontext()
+
+    def user_message(self, content: str, speaker: str = "user") -> FakeMessage:
+        """A message as if a human had posted it in this channel."""
+        return FakeMessage(self, content, FakeAuthor(speaker))
+
+    @property
+    def edits(self) -> int:
+        return sum(1 for kind, _, _ in self.log if kind == "edit")
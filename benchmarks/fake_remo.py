@@ -0,0 +1,97 @@
+"""In-process fake of the Nature Remo Cloud API (aiohttp).
+
+    async with FakeRemo(latency=0.05) as remo:
+        client = NatureRemoClient("token", base_url=remo.url)
+
+Point the bot at it with ``NATURE_REMO_BASE_URL=<remo.url>``.
+"""
+
+import asyncio
+from collections import Counter
+
+from aiohttp import web
+
+DEVICE_ID = "device-1"
+AC_ID = "ac-1"
+LIGHT_ID = "light-1"
+
+
+class FakeRemo:
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.calls: Counter[str] = Counter()
+        self.temperature = 27.5
+        self.ac = {"temp": "26", "mode": "cool", "vol": "auto", "button": ""}
+        self.light = {"brightness": "100", "power": "on", "last_button": "on"}
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/1"
+
+    def _app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/1/devices", self._devices)
+        app.router.add_get("/1/appliances", self._appliances)
+        app.router.add_post("/1/appliances/{id}/aircon_settings", self._aircon)
+        app.router.add_post("/1/appliances/{id}/light", self._light)
+        return app
+
+    async def _delay(self, request: web.Request) -> None:
+        self.calls[f"{request.method} {request.path}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def _devices(self, request: web.Request) -> web.Response:
+        await self._delay(request)
+        return web.json_response(
+            [
+                {"id": "other-device", "newest_events": {"te": {"val": 20.0}}},
+                {"id": DEVICE_ID, "newest_events": {"te": {"val": self.temperature}}},
+            ]
+        )
+
+    async def _appliances(self, request: web.Request) -> web.Response:
+        await self._delay(request)
+        return web.json_response(
+            [
+                {"id": AC_ID, "type": "AC", "settings": dict(self.ac)},
+                {"id": LIGHT_ID, "type": "LIGHT", "light": {"state": dict(self.light)}},
+            ]
+        )
+
+    async def _aircon(self, request: web.Request) -> web.Response:
+        await self._delay(request)
+        form = await request.post()
+        if form.get("button") == "power-off":
+            self.ac["button"] = "power-off"
+        else:
+            self.ac.update(
+                button="",
+                mode=str(form.get("operation_mode", self.ac["mode"])),
+                temp=str(form.get("temperature", self.ac["temp"])),
+                vol=str(form.get("air_volume", self.ac["vol"])),
+            )
+        return web.json_response(dict(self.ac))
+
+    async def _light(self, request: web.Request) -> web.Response:
+        await self._delay(request)
+        button = str((await request.post()).get("button", ""))
+        if button in ("on", "off"):
+            self.light["power"] = button
+        self.light["last_button"] = button
+        return web.json_response(dict(self.light))
+
+    async def __aenter__(self) -> "FakeRemo":
+        self._runner = web.AppRunner(self._app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._runner:
+            await self._runner.cleanup()
@@ -7,6 +7,8 @@ commands = {
     "format": ["black", "myaa"],
     "check-format": ["black", "myaa", "--check"],
     "test": ["pytest"],
+    "bench-import": ["python", "benchmarks/bench_import.py", "--budget-ms", "300"],
+    "bench-e2e": ["python", "benchmarks/bench_e2e.py", "--out", "bench-e2e.json"],
     "typecheck": ["mypy", "myaa", "--check-untyped-defs"],
     "check-all": [
         ["ruff", "check", "myaa"],
@@ -1,108 +1,421 @@
-import datetime as dt
-import pytz
 import asyncio
+import functools
 import os
+import re
+import signal
+import time
+import weakref
+from collections.abc import Callable
 from dotenv import load_dotenv
 import discord
 from discord.ext import commands, tasks
-from typing import cast
+from typing import Any, cast
 
+from myaa.src import inspection, telemetry
+from myaa.src.memory import LongTermMemory
+from myaa.src.scheduler import CronError, Job, Scheduler
 from myaa.src.session_manager import SessionManager
+from myaa.src.session_store import SessionStore, make_session_store, shard_of
+from myaa.src.tool_select import missing_settings
+from myaa.src.tools import nature_cli
+from myaa.src.tools.remo_mirror import RemoEvent, RemoMirror
+from myaa.src.tracing import PrintSink, TraceSink
+from myaa.src.turn_queue import TurnQueue
+from myaa.src.worker_pool import WorkerPool
 from myaa.src.graph_setup import (
-    stream_chat,
-    stream_chat_debug,
-    list_graph_states,
-    default_persona_id,
+    Line,
+    get_runtime,
+    root_dir,
+    stream_tokens,
+    stream_turn,
 )
+from myaa.adapter.discord.streaming import ProgressiveReply
 
-JST = pytz.timezone("Asia/Tokyo")
 load_dotenv()
 TOKEN = os.getenv("DISCORD_BOT_TOKEN")
-if not TOKEN:
-    raise RuntimeError("DISCORD_BOT_TOKEN が設定されていません。")
 REMINDER_SPEAKER = "時報"
-
-session_mgr = SessionManager()
+# 同時に実行するグラフのターン数の上限（LLM / ツール呼び出しの同時実行数を抑える）
+MAX_CONCURRENT_TURNS = int(os.getenv("MAX_CONCURRENT_TURNS", "8"))
+# この秒数だけ発言が途切れたら、溜まったメッセージをまとめて 1 ターンで返答する
+TURN_DEBOUNCE = float(os.getenv("TURN_DEBOUNCE", "1.5"))
+# 発言が続いても最初のメッセージからこの秒数で打ち切る
+TURN_MAX_WAIT = float(os.getenv("TURN_MAX_WAIT", "5"))
+# 他の bot の発言には少し長めに待つ（bot 同士の応酬を緩める）
+BOT_DEBOUNCE = float(os.getenv("BOT_DEBOUNCE", "2"))
+# チャンネルごとに溜められるメッセージ数の上限（超えた分は無視）
+TURN_QUEUE_DEPTH = int(os.getenv("TURN_QUEUE_DEPTH", "20"))
+# ストリーミング返信でメッセージを編集する最短間隔（秒）。Discord のレート制限対策
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+# 同じ時刻に発火したスケジュールジョブを同時に処理するチャンネル数の上限
+SCHEDULE_MAX_CONCURRENT = int(os.getenv("SCHEDULE_MAX_CONCURRENT", "4"))
+# >0 でグラフのターンをワーカープロセスで実行する（thread_id ごとに同じワーカー）
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "0"))
+# 1 で AutoShardedBot を使う。SHARD_IDS=0,1 / SHARD_COUNT=4 でこのプロセスの担当を指定
+SHARD_IDS = [int(x) for x in os.getenv("SHARD_IDS", "").split(",") if x.strip()]
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0")) or None
+BOT_SHARDED = os.getenv("BOT_SHARDED") == "1" or bool(SHARD_IDS)
+# 終了時に処理中のターンを待つ最大秒数
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "30"))
+# 指定すると http://127.0.0.1:<port>/metrics で Prometheus 形式のメトリクスを公開する
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# !dump の 1 ページあたりのセッション数 / メッセージ数
+DUMP_PAGE_SIZE = int(os.getenv("DUMP_PAGE_SIZE", "10"))
+# Nature Remo の状態をバックグラウンドで取得し続ける（NATURE_REMO_TOKEN があれば既定で ON）
+# 通常は IDLE 秒ごと、操作の後 ACTIVE_FOR 秒間は家電の状態を ACTIVE 秒ごとに取る
+REMO_MIRROR = os.getenv(
+    "REMO_MIRROR", "1" if os.getenv("NATURE_REMO_TOKEN") else "0"
+) not in ("0", "")
+REMO_MIRROR_IDLE = float(os.getenv("REMO_MIRROR_IDLE", "60"))
+REMO_MIRROR_ACTIVE = float(os.getenv("REMO_MIRROR_ACTIVE", "15"))
+REMO_MIRROR_ACTIVE_FOR = float(os.getenv("REMO_MIRROR_ACTIVE_FOR", "60"))
+# !remo watch のしきい値の幅（℃）。一度またいだら、この幅だけ戻るまで再通知しない
+REMO_WATCH_HYSTERESIS = float(os.getenv("REMO_WATCH_HYSTERESIS", "0.5"))
+
+
+@functools.cache
+def get_session_mgr() -> SessionManager:
+    # SESSION_BACKEND=sqlite (default) keeps threads, personas and joined channels
+    return SessionManager(make_session_store(root_dir))
 
 
 class ChatService:
-    def __init__(self, session_mgr: SessionManager, default_persona):
-        self.session_mgr = session_mgr
+    def __init__(
+        self,
+        session_mgr: SessionManager | None,
+        default_persona,
+        max_concurrent_turns: int = MAX_CONCURRENT_TURNS,
+        trace_sink: TraceSink | None = None,
+        pool: WorkerPool | None = None,
+    ):
+        # None: the store from SESSION_BACKEND, opened on first use
+        self._session_mgr = session_mgr
         self.default_persona = default_persona
-        self.debug_map: dict[str, bool] = {}
-        self.char_bindings: dict[str, str] = {}
-        self.joined_channels: set[int] = set()
-        self.jihou_channels: set[int] = set()
+        self.trace_sink: TraceSink = trace_sink or PrintSink()
+        # BOT_WORKERS > 0: turns run in worker processes instead of this loop
+        self.pool = pool
+        self._turn_slots = asyncio.Semaphore(max_concurrent_turns)
+        # one turn at a time per session, so turns never race on a checkpoint
+        self._session_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+
+    @property
+    def session_mgr(self) -> SessionManager:
+        return self._session_mgr or get_session_mgr()
+
+    @property
+    def store(self) -> SessionStore:
+        # debug flags, persona bindings and joined channels live in the store
+        return self.session_mgr.store
 
-    def toggle_debug(self, session_key: str) -> bool:
-        current = self.debug_map.get(session_key, False)
-        self.debug_map[session_key] = not current
-        return not current
+    async def _flag(self, ns: str, session_key: str, on: bool):
+        if on:
+            await self.store.aput(ns, session_key, "1", shard=shard_of(session_key))
+        else:
+            await self.store.adelete(ns, session_key)
+
+    async def toggle_debug(self, session_key: str) -> bool:
+        new_state = not self.get_debug(session_key)
+        await self._flag("debug", session_key, new_state)
+        return new_state
 
     def get_debug(self, session_key: str) -> bool:
-        return self.debug_map.get(session_key, False)
+        return self.store.get("debug", session_key) is not None
 
-    def bind_character(self, session_key: str, char_id: str):
-        self.char_bindings[session_key] = char_id
+    async def bind_character(self, session_key: str, char_id: str):
+        await self.store.aput(
+            "persona", session_key, char_id, shard=shard_of(session_key)
+        )
 
     def get_character(self, session_key: str) -> str:
-        return self.char_bindings.get(session_key, self.default_persona)
+        return self.store.get("persona", session_key) or self.default_persona
+
+    async def join(self, session_key: str):
+        await self._flag("joined", session_key, True)
+
+    async def leave(self, session_key: str):
+        await self._flag("joined", session_key, False)
+
+    def is_joined(self, session_key: str) -> bool:
+        return self.store.get("joined", session_key) is not None
+
+    async def set_tools(self, session_key: str, names: list[str] | None):
+        """Bind only ``names`` in this channel (None: the persona's tool set)."""
+        if names is None:
+            await self.store.adelete("tools", session_key)
+        else:
+            await self.store.aput(
+                "tools", session_key, ",".join(names), shard=shard_of(session_key)
+            )
+
+    def get_tools(self, session_key: str) -> list[str] | None:
+        raw = self.store.get("tools", session_key)
+        return [n for n in raw.split(",") if n] if raw is not None else None
+
+    def _session_lock(self, session_key: str) -> asyncio.Lock:
+        lock = self._session_locks.get(session_key)
+        if lock is None:
+            lock = self._session_locks[session_key] = asyncio.Lock()
+        return lock
 
     async def chat(self, session_key: str, user_text: str, speaker: str) -> str | None:
-        thread_id = self.session_mgr.resolve(session_key)
-        debug = self.get_debug(session_key)
+        return await self.chat_batch(session_key, [(speaker, user_text)])
+
+    async def chat_batch(self, session_key: str, lines: list[Line]) -> str | None:
+        """Answer several ``(speaker, text)`` lines with a single turn."""
+        if self.pool:
+            reply = "".join([d async for d in self.chat_stream(session_key, lines)])
+            return reply or None
+        thread_id = await self.session_mgr.aresolve(session_key)
+        sink = self.trace_sink if self.get_debug(session_key) else None
         persona_id = self.get_character(session_key)
+        tools = self.get_tools(session_key)
         last_reply: str | None = None
-        async for chunk in stream_chat(thread_id, user_text, persona_id, speaker):
-            last_reply = chunk
-        if debug:
-            async for chunk in stream_chat_debug(
-                thread_id, user_text, persona_id, speaker
-            ):
-                print(chunk)
+        with telemetry.turn(session_key) as turn:
+            turn.thread_id = thread_id
+            waited = time.perf_counter()
+            async with self._session_lock(session_key), self._turn_slots:
+                telemetry.record("turn.wait", time.perf_counter() - waited)
+                with telemetry.span("graph"):
+                    async for chunk in stream_turn(
+                        thread_id, lines, persona_id, trace_sink=sink, tools=tools
+                    ):
+                        last_reply = chunk
         return last_reply
 
-    def dump(self) -> str:
-        return list_graph_states(self.session_mgr)
-
-
-service = ChatService(session_mgr, default_persona=default_persona_id)
+    async def chat_stream(self, session_key: str, lines: list[Line]):
+        """Like :meth:`chat_batch`, but yields the reply text as it streams."""
+        thread_id = await self.session_mgr.aresolve(session_key)
+        debug = self.get_debug(session_key)
+        persona_id = self.get_character(session_key)
+        tools = self.get_tools(session_key)
+        if turn := telemetry.current():
+            turn.thread_id = thread_id
+        waited = time.perf_counter()
+        async with self._session_lock(session_key), self._turn_slots:
+            telemetry.record("turn.wait", time.perf_counter() - waited)
+            if self.pool:
+                deltas = self.pool.stream(thread_id, lines, persona_id, debug, tools)
+            else:
+                sink = self.trace_sink if debug else None
+                deltas = stream_tokens(
+                    thread_id, lines, persona_id, trace_sink=sink, tools=tools
+                )
+            async for delta in deltas:
+                yield delta
+
+    async def on_runtime(
+        self, thread_id: str, attr: str, fn: Callable[..., Any], *args: Any
+    ) -> Any:
+        """``fn(runtime.<attr>, *args)`` where ``thread_id``'s turns run.
+
+        With workers that is the owning worker process (its checkpointer and
+        memory, not this process's); otherwise a thread of this process.
+        None when ``runtime.<attr>`` is None (e.g. memory disabled).
+        """
+        if self.pool:
+            return await self.pool.call(thread_id, attr, fn, *args)
+        target = getattr(get_runtime(), attr)
+        if target is None:
+            return None
+        return await asyncio.to_thread(fn, target, *args)
+
+    async def dump(self, channel_id: int | None = None, page: int = 1) -> str:
+        """Session list (no channel) or one page of a channel's history."""
+        if channel_id is None:
+            pairs = await asyncio.to_thread(inspection.sessions, self.session_mgr)
+            if not pairs:
+                return "⚠️ No active sessions."
+            pages = max(1, -(-len(pairs) // DUMP_PAGE_SIZE))
+            page = min(max(1, page), pages)
+            start = (page - 1) * DUMP_PAGE_SIZE
+            lines = [f"sessions {len(pairs)} — page {page}/{pages}"]
+            for session_key, thread_id in pairs[start : start + DUMP_PAGE_SIZE]:
+                stats = await self.on_runtime(
+                    thread_id,
+                    "checkpointer",
+                    inspection.thread_stats,
+                    session_key,
+                    thread_id,
+                )
+                if stats is not None:
+                    lines.append(stats.line())
+            return "\n".join(lines)
+        pairs = await asyncio.to_thread(
+            inspection.sessions,
+            self.session_mgr,
+            inspection.channel_filter(channel_id),
+        )
+        if not pairs:
+            return f"⚠️ No session for channel {channel_id}."
+        out = []
+        for session_key, thread_id in pairs:
+            view = await self.on_runtime(
+                thread_id,
+                "checkpointer",
+                inspection.message_page,
+                session_key,
+                thread_id,
+                page,
+                DUMP_PAGE_SIZE,
+            )
+            if view is None:
+                out.append(f"{session_key} (no checkpoint found)")
+                continue
+            out.append(f"{view.stats.line()}\npage {view.page}/{view.pages}")
+            out += view.lines or ["(no messages found)"]
+        return "\n".join(out)
+
+
+service = ChatService(None, default_persona=get_runtime().default_persona_id)
+
+
+async def answer_batch(session_key: str, msgs: list[discord.Message]):
+    """Reply once to the messages a channel sent while the bot was busy."""
+    channel = msgs[-1].channel
+    # the author id keys long-term memories (display names can be changed)
+    lines: list[Line] = [
+        (m.author.display_name, m.content, str(m.author.id)) for m in msgs
+    ]
+    reply = ProgressiveReply(channel, interval=STREAM_EDIT_INTERVAL)
+    with telemetry.turn(session_key):
+        stream = aiter(service.chat_stream(session_key, lines))
+        # typing indicator until the first chunk arrives, then edit in place
+        async with channel.typing():
+            with telemetry.span("first_chunk"):
+                first = await anext(stream, None)
+        if first is None:
+            return
+        await reply.feed(first)
+        async for delta in stream:
+            await reply.feed(delta)
+        await reply.close()
+
+
+turn_queue: TurnQueue[discord.Message] = TurnQueue(
+    answer_batch,
+    debounce=TURN_DEBOUNCE,
+    max_wait=TURN_MAX_WAIT,
+    max_depth=TURN_QUEUE_DEPTH,
+)
 
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot: commands.Bot | commands.AutoShardedBot
+if BOT_SHARDED:
+    # SHARD_IDS を分けて複数プロセスで起動すれば、ギルドをプロセス間で分担できる
+    bot = commands.AutoShardedBot(
+        command_prefix="!",
+        intents=intents,
+        shard_ids=SHARD_IDS or None,
+        shard_count=SHARD_COUNT,
+    )
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents)
+draining = False
+
+
+LIGHTS_OFF_PROMPT = (
+    "INSTRUCTION: 0時になりました。ツールを使用して部屋の照明を消灯してください。"
+    "\nキャラクターとして適当なコメントを添えてください。"
+)
 
 
-@tasks.loop(seconds=60)
-async def midnight_lights_off():
-    """毎日 0:00 に時報チャンネルへ『消灯して』プロンプトを送る"""
-    now = dt.datetime.now(JST)
+async def run_prompt(channel_id: int, prompt: str) -> bool:
+    """``prompt`` をそのチャンネルのセッションで 1 ターン実行して返信する。
+
+    チャンネルが見つからなければ False（SHARD_IDS なら他プロセスの担当かもしれない）。
+    """
+    ch_raw = bot.get_channel(channel_id)
+    if ch_raw is None:
+        return False
+    guild = getattr(ch_raw, "guild", None)
+    session_key = f"{guild.id if guild else 0}:{channel_id}"
+    ch = cast(discord.abc.Messageable, ch_raw)
+    async with ch.typing():
+        reply = await service.chat(session_key, prompt, speaker=REMINDER_SPEAKER)
+    if reply:
+        await ch.send(reply)
+    return True
 
-    if not (now.hour == 0 and now.minute == 0):
+
+def owns_guild(guild_id: int) -> bool:
+    """このプロセスの担当シャードのギルドか（SHARD_IDS がなければ常に True）"""
+    if not SHARD_IDS:
+        return True
+    shard_count = bot.shard_count or SHARD_COUNT or 1
+    return (guild_id >> 22) % shard_count in SHARD_IDS
+
+
+async def fire_job(job: Job):
+    """スケジュールされたジョブを、そのチャンネルのセッションで 1 ターン実行する"""
+    prompt = job.prompt if job.kind == "jihou" else f"INSTRUCTION: {job.prompt}"
+    if await run_prompt(job.channel_id, prompt):
         return
+    # 担当ギルドのチャンネルが見つからない = 削除済み。ギルド不明（0）のジョブは
+    # SHARD_IDS では他プロセスの担当かもしれないので残す
+    if not SHARD_IDS or (job.guild_id and owns_guild(job.guild_id)):
+        get_scheduler().remove(job.id)
+
+
+@functools.cache
+def get_scheduler() -> Scheduler:
+    path = os.getenv("SCHEDULE_PATH") or os.path.join(root_dir, "schedule.sqlite")
+    return Scheduler(
+        fire_job,
+        path,
+        max_concurrent=SCHEDULE_MAX_CONCURRENT,
+        owns=owns_guild if SHARD_IDS else None,
+    )
+
+
+def is_jihou_channel(cid: int) -> bool:
+    return get_scheduler().has_job(cid, "jihou")
+
+
+# !remo watch: ns "remo_watch", key "<session_key>/<op><threshold>", value = 指示
+REMO_WATCH_NS = "remo_watch"
+_WATCH_RE = re.compile(r"([<>])(\d+(?:\.\d+)?)$")
+remo_mirror = RemoMirror(
+    nature_cli.remo,
+    idle=REMO_MIRROR_IDLE,
+    active=REMO_MIRROR_ACTIVE,
+    active_for=REMO_MIRROR_ACTIVE_FOR,
+    hysteresis=REMO_WATCH_HYSTERESIS,
+)
 
-    for cid in list(service.jihou_channels):
-        ch_raw = bot.get_channel(cid)
-        if ch_raw is None:
-            service.jihou_channels.discard(cid)
-            continue
 
-        session_key = f"{cid}:{cid}"
-        prompt = (
-            "INSTRUCTION: 0時になりました。ツールを使用して部屋の照明を消灯してください。"
-            "\nキャラクターとして適当なコメントを添えてください。"
-        )
-        ch = cast(discord.abc.Messageable, ch_raw)
-        async with ch.typing():
-            reply = await service.chat(session_key, prompt, speaker=REMINDER_SPEAKER)
+def remo_watches() -> list[tuple[str, str, float, str]]:
+    """``(session_key, op, threshold, prompt)`` of every ``!remo watch``."""
+    out = []
+    for key, prompt in service.store.items(REMO_WATCH_NS).items():
+        session_key, _, cond = key.rpartition("/")
+        if m := _WATCH_RE.match(cond):
+            out.append((session_key, m.group(1), float(m.group(2)), prompt))
+    return out
 
-        if reply:
-            await ch.send(reply)
 
+def sync_remo_thresholds() -> None:
+    remo_mirror.set_thresholds(t for _, _, t, _ in remo_watches())
 
-@midnight_lights_off.before_loop
-async def _wait_ready():
-    await bot.wait_until_ready()
+
+async def on_remo_event(event: RemoEvent):
+    """室温がしきい値をまたいだら、そのしきい値を見ているチャンネルで 1 ターン実行する"""
+    if event.kind != "threshold" or event.key != nature_cli.DEVICE_ID:
+        return
+    op = ">" if event.direction == "up" else "<"
+    for session_key, w_op, threshold, prompt in remo_watches():
+        if w_op != op or threshold != event.threshold:
+            continue
+        channel_id = int(session_key.rpartition(":")[2])
+        await run_prompt(
+            channel_id,
+            f"INSTRUCTION: 室温が {event.new:.1f}℃ になりました"
+            f"（{op}{threshold:g}℃）。{prompt}",
+        )
+
+
+metrics_server = None
 
 
 @bot.event
@@ -111,23 +424,39 @@ async def on_ready():
     assert user is not None, "User should be set in on_ready()"
     print(f"Logged in as {user} (ID: {user.id})")
 
-    if not midnight_lights_off.is_running():
-        midnight_lights_off.start()
+    get_scheduler().start()
+    if REMO_MIRROR and not remo_mirror.running:
+        # BOT_WORKERS > 0 ではツールはワーカー側のクライアントを使う（イベントだけ届く）
+        sync_remo_thresholds()
+        remo_mirror.subscribe(on_remo_event)
+        remo_mirror.start()
+    global metrics_server
+    if METRICS_PORT and metrics_server is None:
+        metrics_server = await telemetry.serve_metrics(METRICS_PORT)
+        print(f"📈 metrics on http://127.0.0.1:{METRICS_PORT}/metrics")
+    if service.pool and not pool_monitor.is_running():
+        pool_monitor.start()
+
+
+@tasks.loop(seconds=10)
+async def pool_monitor():
+    """ワーカープロセスの死活監視。落ちていれば再起動する"""
+    assert service.pool is not None
+    if restarted := service.pool.check():
+        print(f"⚠️ restarted {restarted} worker process(es)")
 
 
 def make_session_key(ctx_or_msg) -> str:
-    if isinstance(ctx_or_msg, discord.Message):
-        cid = ctx_or_msg.channel.id
-        return f"{cid}:{cid}"
-    channel_id = ctx_or_msg.channel.id
-    return f"{channel_id}:{channel_id}"
+    """``"<guild_id>:<channel_id>"``; the guild id is the store's shard key."""
+    guild = ctx_or_msg.guild
+    return f"{guild.id if guild else 0}:{ctx_or_msg.channel.id}"
 
 
 @bot.command()
 async def join(ctx: commands.Context):
     key = make_session_key(ctx)
     char_id = service.get_character(key)
-    service.joined_channels.add(ctx.channel.id)
+    await service.join(key)
     await ctx.send(f"✅ {char_id} がログインしました。")
 
 
@@ -135,7 +464,7 @@ async def join(ctx: commands.Context):
 async def leave(ctx: commands.Context):
     key = make_session_key(ctx)
     char_id = service.get_character(key)
-    service.joined_channels.discard(ctx.channel.id)
+    await service.leave(key)
     await ctx.send(f"👋 {char_id} が退出しました。")
 
 
@@ -147,71 +476,329 @@ async def debug(ctx: commands.Context):
         )
         return
     key = make_session_key(ctx)
-    new_state = service.toggle_debug(key)
+    new_state = await service.toggle_debug(key)
     await ctx.send(f"🔧 Debug mode: {'ON' if new_state else 'OFF'}")
 
 
 @bot.command(name="char")
 async def char(ctx: commands.Context, character_id: str):
     key = make_session_key(ctx)
-    service.bind_character(key, character_id)
+    await service.bind_character(key, character_id)
     await ctx.send(f"🔖 Character set to `{character_id}`")
 
 
+@bot.command()
+async def tools(ctx: commands.Context, action: str = "list", *names: str):
+    """!tools               → このチャンネルで使うツール
+    !tools set <名前...>  → このチャンネルで使うツールを限定
+    !tools reset          → キャラクターの設定（personas.yaml の tools）に戻す"""
+    key = make_session_key(ctx)
+    runtime = get_runtime()
+    known = [t.name for t in runtime.tools]
+    if action == "set":
+        unknown = [n for n in names if n not in known]
+        if not names or unknown:
+            await ctx.send(
+                f"⚠️ 不明なツール: {', '.join(unknown) or '（なし）'}"
+                f"\n使えるツール: {', '.join(known)}"
+            )
+            return
+        await service.set_tools(key, list(names))
+    elif action == "reset":
+        await service.set_tools(key, None)
+    channel = service.get_tools(key)
+    persona = runtime.personas.get(service.get_character(key))
+    names_in_use = channel if channel is not None else persona.tools
+    source = (
+        "channel"
+        if channel is not None
+        else ("persona" if persona.tools is not None else "all")
+    )
+    bound = [t.name for t in runtime.select_tools(names_in_use)]
+    lines = [f"tools ({source}): {', '.join(bound) or '（なし）'}"]
+    lines += [
+        f"excluded {t.name}: {', '.join(missing)} not set"
+        for t in runtime.tools
+        if (missing := missing_settings(t))
+        and (names_in_use is None or t.name in names_in_use)
+    ]
+    await ctx.send("```" + "\n".join(lines) + "```")
+
+
+@bot.command()
+async def memory(ctx: commands.Context, action: str = "list"):
+    """!memory         → このキャラクターが覚えているあなたのこと
+    !memory forget  → あなたについての記憶を消す"""
+    session_key = make_session_key(ctx)
+    persona = service.get_character(session_key)
+    # 記憶は表示名ではなくユーザー ID で引く（名前を変えても他人の記憶は見えない）
+    speaker = str(ctx.author.id)
+    # BOT_WORKERS > 0 ではワーカー側の LongTermMemory に問い合わせる（記憶はファイルで共有）
+    read = LongTermMemory.forget if action == "forget" else LongTermMemory.about
+    result = await service.on_runtime(session_key, "memory", read, persona, speaker)
+    if result is None:
+        await ctx.send("⚠️ 長期記憶は無効です（.env で MEMORY=1）")
+        return
+    if action == "forget":
+        await ctx.send(
+            f"🧹 {ctx.author.display_name} についての記憶を {result} 件消しました"
+        )
+        return
+    items = result
+    lines = [m.text for m in items] or ["（まだ何も覚えていません）"]
+    await ctx.send("```" + "\n".join(lines) + "```")
+
+
 @bot.command()
 async def jihou(ctx: commands.Context, mode: str | None = None):
     """!jihou        → 0 時時報 ON
     !jihou off    → OFF"""
     cid = ctx.channel.id
+    guild_id = ctx.guild.id if ctx.guild else 0
+    scheduler = get_scheduler()
     if mode == "off":
-        service.jihou_channels.discard(cid)
+        for job in scheduler.jobs(cid):
+            if job.kind == "jihou":
+                scheduler.remove(job.id)
         await ctx.send("🔕 時報を停止しました")
         return
 
-    if cid in service.joined_channels:
+    if service.is_joined(make_session_key(ctx)):
         await ctx.send(
             "⚠️ ここは !join 済みなので時報にできません（!leave してください）"
         )
         return
 
-    service.jihou_channels.add(cid)
+    if not is_jihou_channel(cid):
+        scheduler.add(
+            cid, "0 0 * * *", LIGHTS_OFF_PROMPT, kind="jihou", guild_id=guild_id
+        )
     await ctx.send("🔔 このチャンネルで毎日 0 時に消灯するよ！")
 
 
 @bot.command()
-async def dump(ctx: commands.Context):
+async def schedule(ctx: commands.Context, action: str = "list", *, rest: str = ""):
+    """!schedule add <分 時 日 月 曜日> <指示>  → 登録（例: !schedule add 0 7 * * 1-5 天気を教えて）
+    !schedule list                         → このチャンネルのジョブ一覧
+    !schedule rm <id>                      → 削除"""
+    cid = ctx.channel.id
+    scheduler = get_scheduler()
+    if action == "add":
+        parts = rest.split(maxsplit=5)
+        if len(parts) < 6:
+            await ctx.send("⚠️ 使い方: `!schedule add <分 時 日 月 曜日> <指示>`")
+            return
+        try:
+            job = scheduler.add(
+                cid,
+                " ".join(parts[:5]),
+                parts[5],
+                guild_id=ctx.guild.id if ctx.guild else 0,
+            )
+        except CronError as e:
+            await ctx.send(f"⚠️ cron 式が不正です: {e}")
+            return
+        await ctx.send(f"⏰ `{job.id}` を登録しました（`{job.cron}`）")
+    elif action == "rm":
+        job_ids = {j.id for j in scheduler.jobs(cid)}
+        if rest.strip() in job_ids and scheduler.remove(rest.strip()):
+            await ctx.send(f"🗑️ `{rest.strip()}` を削除しました")
+        else:
+            await ctx.send(f"⚠️ `{rest.strip()}` はこのチャンネルにありません")
+    else:
+        jobs = scheduler.jobs(cid)
+        if not jobs:
+            await ctx.send("📭 スケジュールはありません")
+            return
+        lines = [
+            f"`{j.id}` `{j.cron}` {j.prompt if j.kind != 'jihou' else '（時報）'}"
+            f" — 次回 <t:{int(j.next_run)}:f>"
+            for j in jobs
+        ]
+        await ctx.send("\n".join(lines))
+
+
+@bot.command()
+async def dump(ctx: commands.Context, channel: str | None = None, page: int = 1):
+    """!dump → セッション一覧 / !dump <#channel|id|here> [page] → 会話履歴"""
     if os.getenv("DEBUG_MODE") != "1":
         await ctx.send(
             "⚠️ This command is disabled. Set DEBUG_MODE=1 in your .env to enable it."
         )
         return
-    dump_text = service.dump()
+    channel_id: int | None = None
+    if channel == "here":
+        channel_id = ctx.channel.id
+    elif channel and channel.isdigit() and len(channel) < 6:
+        page = int(channel)  # "!dump 2": page 2 of the session list
+    elif channel:
+        digits = "".join(c for c in channel if c.isdigit())
+        if not digits:
+            await ctx.send("使い方: `!dump [#channel|id|here] [page]`")
+            return
+        channel_id = int(digits)
+    # read where the threads live; SQLite and decoding stay off the event loop
+    dump_text = await service.dump(channel_id, page)
     if len(dump_text) > 1900:
         dump_text = dump_text[:1900] + "\n…（省略）"
     await ctx.send(f"```{dump_text}```")
 
 
+@bot.command()
+async def health(ctx: commands.Context):
+    if os.getenv("DEBUG_MODE") != "1":
+        await ctx.send(
+            "⚠️ This command is disabled. Set DEBUG_MODE=1 in your .env to enable it."
+        )
+        return
+    lines = [f"latency {bot.latency * 1000:.0f}ms, draining={draining}"]
+    if service.pool:
+        for w in service.pool.health():
+            mark = "✅" if w["healthy"] else "❌"
+            lines.append(
+                f"{mark} worker {w['worker']} pid={w['pid']} "
+                f"inflight={w['inflight']} heartbeat={w['heartbeat_age_s']}s"
+            )
+    else:
+        lines.append("workers: in-process")
+        # worker processes keep their own routers; only shown in-process
+        from myaa.src.model_router import ModelRouter  # heavy import, only here
+
+        runtime = get_runtime()
+        if "llm" in runtime.__dict__ and isinstance(runtime.llm, ModelRouter):
+            for name, s in runtime.llm.stats().items():
+                counts = ", ".join(
+                    f"{k}={v}" for k, v in s.items() if isinstance(v, int)
+                )
+                lines.append(
+                    f"model {name} [{s['state']}] {counts} "
+                    f"p50={s['first_chunk_p50_s']}s p95={s['first_chunk_p95_s']}s"
+                )
+        cache = runtime.__dict__.get("response_cache")
+        if cache is not None:
+            for pid, s in cache.stats().items():
+                lines.append(
+                    f"response cache {pid}: hit_rate={s['hit_rate']} "
+                    f"hits={s['hits']}+{s['similar_hits']} misses={s['misses']} "
+                    f"bypassed={s['bypassed']} saved={s['saved_s']}s"
+                )
+    await ctx.send("```" + "\n".join(lines) + "```")
+
+
+@bot.command()
+async def remo(ctx: commands.Context, action: str = "status", *, rest: str = ""):
+    """!remo                       → ミラーの状態（室温・取得からの経過秒）
+    !remo watch >28 <指示>       → 室温が 28℃ を超えたら指示を実行（<18 で下回ったら）
+    !remo unwatch >28            → 解除"""
+    key = make_session_key(ctx)
+    if action in ("watch", "unwatch"):
+        cond, _, prompt = rest.strip().partition(" ")
+        m = _WATCH_RE.match(cond)
+        if not m or (action == "watch" and not prompt.strip()):
+            await ctx.send(
+                "⚠️ 使い方: `!remo watch <>28|<18> <指示>` / `!remo unwatch >28`"
+            )
+            return
+        cond = f"{m.group(1)}{float(m.group(2)):g}"
+        if action == "watch":
+            await service.store.aput(
+                REMO_WATCH_NS, f"{key}/{cond}", prompt.strip(), shard=shard_of(key)
+            )
+            await ctx.send(f"👀 室温が {cond}℃ になったら知らせます")
+        else:
+            await service.store.adelete(REMO_WATCH_NS, f"{key}/{cond}")
+            await ctx.send(f"🗑️ `{cond}` の監視を解除しました")
+        sync_remo_thresholds()
+        return
+
+    def ago(path: str) -> str:
+        age = remo_mirror.age(path)
+        return f"{age:.0f}s ago" if age is not None else "never"
+
+    temp = remo_mirror.temperature(nature_cli.DEVICE_ID or "")
+    state = "running" if remo_mirror.running else "off"
+    temp_txt = f"{temp:.1f}℃" if temp is not None else "?"
+    lines = [
+        f"mirror: {state} (every {remo_mirror.interval('/appliances'):g}s)",
+        f"temperature: {temp_txt} ({ago('/devices')})",
+        f"appliances: {ago('/appliances')}",
+    ]
+    lines += [
+        f"watch {op}{t:g}: {prompt}"
+        for session_key, op, t, prompt in remo_watches()
+        if session_key == key
+    ]
+    await ctx.send("```" + "\n".join(lines) + "```")
+
+
 @bot.event
 async def on_message(msg: discord.Message):
     await bot.process_commands(msg)
-    if msg.author == bot.user or msg.content.startswith("!"):
+    if msg.author == bot.user or msg.content.startswith("!") or draining:
         return
-    if (
-        msg.channel.id not in service.joined_channels
-        and msg.channel.id not in service.jihou_channels
-    ):
-        return
-    if msg.author.bot and msg.author != bot.user:
-        await asyncio.sleep(2)
     session_key = make_session_key(msg)
-    user_text = msg.content
-    speaker = msg.author.display_name
-    async with msg.channel.typing():
-        reply = await service.chat(session_key, user_text, speaker)
-    if reply:
-        await msg.channel.send(reply)
+    if not service.is_joined(session_key) and not is_jihou_channel(msg.channel.id):
+        return
+    debounce = BOT_DEBOUNCE if msg.author.bot else None
+    if not turn_queue.submit(session_key, msg, debounce=debounce):
+        print(f"⚠️ turn queue full for {session_key}; dropped message {msg.id}")
+
+
+async def shutdown():
+    """Stop taking messages, let queued and running turns finish, then exit."""
+    global draining
+    draining = True
+    try:
+        await asyncio.wait_for(turn_queue.drain(), DRAIN_TIMEOUT)
+    except TimeoutError:
+        print("⚠️ drain timed out; dropping remaining turns")
+    await get_scheduler().stop()
+    await remo_mirror.stop()
+    await get_runtime().drain()  # summaries, facts still being extracted
+    if service.pool:
+        await service.pool.close(DRAIN_TIMEOUT)
+    if metrics_server:
+        await metrics_server.cleanup()
+    telemetry.set_sink(None)
+    await bot.close()
+
+
+async def serve(token: str):
+    # TRACE_FILE=path でターンごとのスパンを JSONL で追記する
+    telemetry.configure_from_env()
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows: Ctrl+C still raises KeyboardInterrupt
+            pass
+    async with bot:
+        runner = asyncio.create_task(bot.start(token))
+        stopper = asyncio.create_task(stop.wait())
+        await asyncio.wait({runner, stopper}, return_when=asyncio.FIRST_COMPLETED)
+        if stop.is_set():
+            await shutdown()
+        stopper.cancel()
+        await runner
 
 
 def entrypoint():
-    assert TOKEN is not None
-    bot.run(TOKEN)
+    if not TOKEN:
+        raise RuntimeError("DISCORD_BOT_TOKEN が設定されていません。")
+    if BOT_WORKERS > 0:
+        if os.getenv("CHECKPOINT_BACKEND", "memory") == "memory":
+            # a restarted worker would come back without its conversations
+            raise RuntimeError(
+                "BOT_WORKERS を使うときは CHECKPOINT_BACKEND=sqlite にしてください。"
+            )
+        # each worker builds its own graph; this process only runs the gateway
+        service.pool = WorkerPool(BOT_WORKERS)
+    else:
+        # build the LLM / tools / graph before connecting, not on the first message
+        get_runtime().warm_up()
+    discord.utils.setup_logging()
+    try:
+        asyncio.run(serve(TOKEN))
+    except KeyboardInterrupt:
+        pass
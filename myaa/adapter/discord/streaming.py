@@ -0,0 +1,87 @@
+"""Show a streamed reply in Discord by editing the message as it grows."""
+
+import time
+from collections.abc import Callable
+from typing import Any, Protocol
+
+from myaa.src import telemetry
+
+DISCORD_LIMIT = 2000
+
+
+class _Editable(Protocol):
+    async def edit(self, *, content: str) -> Any: ...
+
+
+class _Sendable(Protocol):
+    async def send(self, content: str) -> Any: ...
+
+
+def split_point(text: str, limit: int = DISCORD_LIMIT) -> int:
+    """Where to cut ``text`` so the head fits in one message.
+
+    Prefers the last newline, then the last space, in the second half of
+    the window; hard-cuts at ``limit`` otherwise.
+    """
+    if len(text) <= limit:
+        return len(text)
+    for sep in ("\n", " "):
+        cut = text.rfind(sep, limit // 2, limit)
+        if cut > 0:
+            return cut + 1
+    return limit
+
+
+class ProgressiveReply:
+    """Accumulates streamed text and mirrors it into Discord messages.
+
+    The first chunk is sent right away; later chunks are folded into at
+    most one edit per ``interval`` seconds (Discord allows roughly five
+    edits per five seconds per channel). Text beyond 2,000 characters is
+    finalized into the current message and continued in a new one.
+    """
+
+    def __init__(
+        self,
+        channel: _Sendable,
+        *,
+        interval: float = 1.0,
+        limit: int = DISCORD_LIMIT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.channel = channel
+        self.interval = interval
+        self.limit = limit
+        self._clock = clock
+        self._buf = ""  # text of the message currently being edited
+        self._shown = ""  # what Discord currently displays for it
+        self._msg: _Editable | None = None
+        self._last_edit = 0.0
+        self.sent: list[Any] = []
+
+    async def feed(self, delta: str) -> None:
+        self._buf += delta
+        while len(self._buf) > self.limit:
+            cut = split_point(self._buf, self.limit)
+            head, self._buf = self._buf[:cut], self._buf[cut:]
+            await self._show(head)
+            self._msg, self._shown = None, ""
+        if self._msg is None or self._clock() - self._last_edit >= self.interval:
+            await self._show(self._buf)
+
+    async def close(self) -> None:
+        """Flush whatever has not been shown yet."""
+        await self._show(self._buf)
+
+    async def _show(self, text: str) -> None:
+        if not text.strip() or text == self._shown:
+            return
+        if self._msg is None:
+            with telemetry.span("discord.send", chars=len(text)):
+                self._msg = await self.channel.send(text)
+            self.sent.append(self._msg)
+        else:
+            with telemetry.span("discord.edit", chars=len(text)):
+                await self._msg.edit(content=text)
+        self._shown = text
+        self._last_edit = self._clock()
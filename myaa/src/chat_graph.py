@@ -0,0 +1,225 @@
+"""LangGraph definition of the chat agent (state, nodes, default tools).
+
+Imported lazily by :class:`myaa.src.graph_setup.GraphRuntime`; importing
+LangGraph and the tool clients is the bulk of the bot's start-up cost.
+"""
+
+import os
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Annotated, Any, NotRequired, TypedDict
+from zoneinfo import ZoneInfo
+
+from langchain_core.messages import (
+    AIMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+)
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import add_messages
+from langgraph.prebuilt import tools_condition
+from langgraph.types import interrupt
+
+from . import telemetry
+from .history import overflow, summary_prompt, window
+from .memory import memory_prompt, turn_query, turn_speakers
+from .tool_cache import cacheable
+from .tool_exec import ParallelToolNode
+from .tool_select import requires, signature
+from .turn_budget import BUDGET_FALLBACK_REPLY, EXHAUSTED, FINAL_ANSWER_PROMPT
+
+if TYPE_CHECKING:
+    from .graph_setup import GraphRuntime
+
+
+# ---------------------------------------------------------------------------
+# Tools
+# ---------------------------------------------------------------------------
+@tool
+def human_assistance(query: str) -> str:
+    """Fallback: ask a human for help (pauses graph via interrupt)."""
+    human_response = interrupt({"query": query})
+    return human_response["data"]
+
+
+@tool
+def get_current_time() -> str:
+    """現在の日時を日本標準時（JST）で取得します。"""
+    jst_now = datetime.now(ZoneInfo("Asia/Tokyo"))
+    return jst_now.strftime("%Y-%m-%d %H:%M:%S (JST)")
+
+
+def default_tools() -> list:
+    from .tools.nature_cli import (
+        get_ac_status,
+        get_light_status,
+        get_room_temp,
+        set_ac,
+        set_light,
+    )
+
+    search: list = []
+    if os.getenv("TAVILY_API_KEY"):  # TavilySearch refuses to build without it
+        from langchain_tavily import TavilySearch  # type: ignore
+
+        # search results barely change within an hour; keep them across restarts
+        search_tool = cacheable(3600, persist=True)(TavilySearch(max_results=2))
+        search.append(requires("TAVILY_API_KEY")(search_tool))
+    return [
+        *search,
+        human_assistance,
+        get_room_temp,
+        set_ac,
+        set_light,
+        get_current_time,
+        get_ac_status,
+        get_light_status,
+    ]
+
+
+# ---------------------------------------------------------------------------
+# State & Nodes
+# ---------------------------------------------------------------------------
+class ChatState(TypedDict):
+    messages: Annotated[list, add_messages]
+    persona_id: str
+    summary: NotRequired[str]
+
+
+def build_graph(runtime: "GraphRuntime") -> StateGraph:
+    """Wire the chat graph; nodes read the LLM and personas from ``runtime``."""
+    graph_builder = StateGraph(ChatState)
+
+    async def chatbot(state: ChatState, config: RunnableConfig):
+        pid = state["persona_id"]
+        persona = config["configurable"].get("persona") or runtime.personas.get(pid)
+        prefix = [persona.system_message]
+        if summary := state.get("summary"):
+            # after the cached persona prompt so the stable prefix is unchanged
+            prefix.append(
+                SystemMessage(
+                    content=f"Summary of the earlier conversation:\n{summary}"
+                )
+            )
+        # long-term memories about the turn's speakers, after the summary
+        memory = runtime.memory
+        human = next(
+            (
+                m
+                for m in reversed(state.get("messages", []))
+                if isinstance(m, HumanMessage)
+            ),
+            None,
+        )
+        speaker_names = turn_speakers(human) if human is not None else {}
+        if memory is not None and human is not None:
+            speakers, query = turn_query(human)
+            with telemetry.span("memory.recall") as attrs:
+                recalled = await memory.recall(persona.id, speakers, query)
+                attrs["memories"] = len(recalled)
+            if recalled:
+                # memories are keyed by author id; show today's display names
+                by_key = {key: name for name, key in speaker_names.items()}
+                prefix.append(SystemMessage(content=memory_prompt(recalled, by_key)))
+        policy = runtime.history_policy.override(persona.history)
+        history = window(state.get("messages", []), policy)
+        messages = prefix + history
+        # only the tools this persona / channel may use, and only configured ones
+        names = config["configurable"].get("tools", persona.tools)
+        tools = runtime.select_tools(names)
+        llm = runtime.bound_llm(tools, persona.models)
+        limit = runtime.turn_budget.exhausted(
+            state.get("messages", []), config["configurable"].get("turn_started")
+        )
+        if limit:
+            # forced final answer: same bound model (stable prefix), told to stop
+            EXHAUSTED.inc(limit=limit)
+            messages = messages + [HumanMessage(content=FINAL_ANSWER_PROMPT)]
+        # repeated prompts (greetings, fixed instructions): first call of a turn
+        cache = runtime.response_cache
+        key = None
+        if cache is not None and not limit:
+            key = cache.key(
+                persona.id, prefix, history, signature(tools), persona.models
+            )
+        cached = None
+        if cache is not None and key is not None:
+            with telemetry.span("response_cache") as attrs:
+                cached = await cache.get(key)
+                attrs["hit"] = cached is not None
+        if cached is not None:
+            raw = AIMessage(content=cached)
+        else:
+            with telemetry.span(
+                "llm", messages=len(messages), tools=len(tools)
+            ) as attrs:
+                started = time.perf_counter()
+                raw = await llm.ainvoke(messages)
+                if isinstance(raw, AIMessage):
+                    attrs["tokens"] = telemetry.llm_response(raw)
+                    attrs["tool_calls"] = len(raw.tool_calls)
+                if limit:
+                    attrs["budget_exhausted"] = limit
+            if cache is not None and key is not None and isinstance(raw, AIMessage):
+                cache.put(key, raw, time.perf_counter() - started, tools)
+        name = persona.name
+        ai_msg = None
+        if isinstance(raw, AIMessage):
+            update: dict[str, Any] = {"additional_kwargs": {"name": name}}
+            if limit and raw.tool_calls:
+                update["tool_calls"] = []
+                update["content"] = raw.content or BUDGET_FALLBACK_REPLY
+            ai_msg = raw.model_copy(update=update)
+        else:
+            ai_msg = AIMessage(
+                content=f"{name}: {raw}", additional_kwargs={"name": name}
+            )
+        if memory is not None and human is not None and not ai_msg.tool_calls:
+            # the turn is answered; facts are extracted in the background
+            memory.observe(
+                config["configurable"]["thread_id"],
+                persona.id,
+                name,
+                f"{human.content}\n{name}: {ai_msg.text()}",
+                runtime.llm,
+                speaker_names,
+            )
+        return {"messages": [ai_msg]}
+
+    graph_builder.add_node("chatbot", chatbot)
+
+    tool_node = ParallelToolNode(
+        runtime.tools, runtime.tool_limits, runtime.tool_cache, runtime.turn_budget
+    )
+    graph_builder.add_node("tools", tool_node.run)
+
+    graph_builder.add_conditional_edges("chatbot", tools_condition, ["tools", END])
+    graph_builder.add_edge("tools", "chatbot")
+
+    graph_builder.set_entry_point("chatbot")
+    return graph_builder
+
+
+async def summarize_update(
+    runtime: "GraphRuntime", persona_id: str, values: dict[str, Any]
+) -> dict[str, Any]:
+    """State update folding the messages that fell out of the window into
+    the running summary (``{}`` if nothing overflowed).
+
+    Run after the turn by :meth:`GraphRuntime.summarize_later`, not as a
+    graph node, so the extra model call never delays a reply.
+    """
+    policy = runtime.persona_history_policy(persona_id)
+    old = overflow(values.get("messages", []), policy)
+    if not old:
+        return {}
+    prompt = summary_prompt(values.get("summary", ""), old)
+    with telemetry.span("llm.summarize", messages=len(old)):
+        raw = await runtime.llm.ainvoke([HumanMessage(content=prompt)])
+    return {
+        "summary": str(raw.content),
+        "messages": [RemoveMessage(id=m.id) for m in old if m.id],
+    }
@@ -0,0 +1,710 @@
+"""Checkpointer backends for the chat graph.
+
+``CHECKPOINT_BACKEND=memory`` (default) keeps LangGraph's ``InMemorySaver``
+(:class:`MemorySaver`, which also reports checkpoint sizes);
+``CHECKPOINT_BACKEND=sqlite`` selects :class:`SqliteSaver`, a durable local
+store that keeps only the newest ``CHECKPOINT_KEEP`` checkpoints per thread.
+
+Every checkpoint carries the full ``messages`` list, so a thread's history
+would be stored once per checkpoint. :class:`SqliteSaver` instead keeps
+each message once in a content-addressed per-thread log (``messages``
+table, msgpack via the serializer, zlib above ``compress_min`` bytes) and
+stores only the list of message digests with each checkpoint.
+"""
+
+import asyncio
+import builtins
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+from . import telemetry
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    message_refs BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    thread_id TEXT NOT NULL,
+    digest BLOB NOT NULL,
+    type TEXT,
+    value BLOB,
+    PRIMARY KEY (thread_id, digest)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+# (task_id, channel, (type, bytes), idx)
+_Write = tuple[str, str, tuple[str, bytes], int]
+
+_DIGEST = 16  # bytes of blake2b per message
+_ZLIB = "z:"  # type prefix of compressed message blobs
+_IN_BATCH = 500  # digests per "IN (...)", below SQLite's variable limit
+_CHECKPOINT_COLUMNS = (
+    "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+    "type, checkpoint, metadata_type, metadata, message_refs"
+)
+
+
+def _split_refs(refs: bytes) -> list[bytes]:
+    return [refs[i : i + _DIGEST] for i in range(0, len(refs), _DIGEST)]
+
+
+class _Entry:
+    """Serialized form of one checkpoint, as held in the hot cache."""
+
+    __slots__ = (
+        "checkpoint",
+        "checkpoint_id",
+        "messages",
+        "metadata",
+        "parent_id",
+        "refs",
+        "writes",
+    )
+
+    def __init__(
+        self,
+        checkpoint_id: str,
+        parent_id: str | None,
+        checkpoint: tuple[str, bytes],
+        metadata: tuple[str, bytes],
+        writes: list[_Write] | None = None,
+        refs: bytes | None = None,
+        messages: dict[bytes, tuple[str, bytes]] | None = None,
+    ):
+        self.checkpoint_id = checkpoint_id
+        self.parent_id = parent_id
+        self.checkpoint = checkpoint
+        self.metadata = metadata
+        self.writes: list[_Write] = writes or []
+        # concatenated message digests; None = messages are inline
+        self.refs = refs
+        self.messages: dict[bytes, tuple[str, bytes]] = messages or {}
+
+    @property
+    def size(self) -> int:
+        return len(self.checkpoint[1]) + sum(len(v[1]) for v in self.messages.values())
+
+
+class SqliteSaver(BaseCheckpointSaver[str]):
+    """SQLite (WAL) checkpointer with pruning, an LRU hot cache and batched writes.
+
+    * only the newest ``keep`` checkpoints of each thread/namespace survive a
+      flush (``keep=0`` disables pruning);
+    * the latest checkpoint of up to ``cache_size`` threads is kept serialized
+      in memory, so the read at the start of every turn skips SQLite;
+    * writes are buffered and committed in one transaction once ``batch_size``
+      rows are pending or ``flush_interval`` seconds have passed;
+    * with ``compact`` (default) messages go to the per-thread message log
+      and each checkpoint keeps only their digests (see the module
+      docstring); a message already stored is not compressed again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        keep: int = 20,
+        cache_size: int = 256,
+        batch_size: int = 64,
+        flush_interval: float = 1.0,
+        compact: bool = True,
+        compress_min: int = 1024,
+        serde=None,
+    ):
+        super().__init__(serde=serde)
+        self.path = path
+        self.compact = compact
+        self.compress_min = compress_min
+        self.keep = keep
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = {r[1] for r in self._conn.execute("PRAGMA table_info(checkpoints)")}
+        if columns and "message_refs" not in columns:  # file from before compact
+            self._conn.execute("ALTER TABLE checkpoints ADD COLUMN message_refs BLOB")
+        self._conn.executescript(_SCHEMA)
+        self._pending_messages: list[tuple] = []
+        self._cache: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        self._pending_checkpoints: list[tuple] = []
+        self._pending_writes: dict[str, list[tuple]] = {"replace": [], "ignore": []}
+        self._touched: set[tuple[str, str]] = set()
+        self._first_pending: float | None = None
+
+    # -- buffering ----------------------------------------------------------
+    def _pending_rows(self) -> int:
+        return (
+            len(self._pending_checkpoints)
+            + len(self._pending_messages)
+            + sum(len(rows) for rows in self._pending_writes.values())
+        )
+
+    def _maybe_flush(self) -> None:
+        if self._first_pending is None:
+            self._first_pending = time.monotonic()
+            # make sure an idle bot still commits the tail of the last turn
+            timer = threading.Timer(self.flush_interval, self.flush)
+            timer.daemon = True
+            timer.start()
+        if (
+            self._pending_rows() >= self.batch_size
+            or time.monotonic() - self._first_pending >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Commit all buffered rows and prune old checkpoints."""
+        with self._lock:
+            if not self._pending_rows():
+                return
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO messages VALUES (?, ?, ?, ?)",
+                    self._pending_messages,
+                )
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO checkpoints ({_CHECKPOINT_COLUMNS}) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._pending_checkpoints,
+                )
+                for mode, rows in self._pending_writes.items():
+                    if rows:
+                        self._conn.executemany(
+                            f"INSERT OR {mode.upper()} INTO writes "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            rows,
+                        )
+                if self.keep > 0:
+                    for thread_id, ns in self._touched:
+                        self._prune(thread_id, ns)
+            self._pending_checkpoints = []
+            self._pending_messages = []
+            self._pending_writes = {"replace": [], "ignore": []}
+            self._touched = set()
+            self._first_pending = None
+
+    def _prune(self, thread_id: str, ns: str) -> None:
+        row = self._conn.execute(
+            "SELECT checkpoint_id FROM checkpoints "
+            "WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, ns, self.keep - 1),
+        ).fetchone()
+        if row is None:
+            return
+        where = "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id"
+        dropped = set()
+        for (refs,) in self._conn.execute(
+            f"SELECT message_refs FROM checkpoints {where} < ?", (thread_id, ns, row[0])
+        ):
+            dropped.update(_split_refs(refs or b""))
+        for table in ("checkpoints", "writes"):
+            self._conn.execute(
+                f"DELETE FROM {table} {where} < ?", (thread_id, ns, row[0])
+            )
+        if not dropped:
+            return
+        # messages only leave the log once no kept checkpoint refers to them
+        for (refs,) in self._conn.execute(
+            "SELECT message_refs FROM checkpoints WHERE thread_id = ?", (thread_id,)
+        ):
+            dropped.difference_update(_split_refs(refs or b""))
+        self._conn.executemany(
+            "DELETE FROM messages WHERE thread_id = ? AND digest = ?",
+            [(thread_id, d) for d in dropped],
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    # -- cache --------------------------------------------------------------
+    def _remember(self, key: tuple[str, str], entry: _Entry) -> None:
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _load(
+        self, thread_id: str, ns: str, checkpoint_id: str | None
+    ) -> _Entry | None:
+        key = (thread_id, ns)
+        cached = self._cache.get(key)
+        if cached and checkpoint_id in (None, cached.checkpoint_id):
+            self._cache.move_to_end(key)
+            return cached
+        self.flush()
+        if checkpoint_id:
+            row = self._conn.execute(
+                "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                "metadata_type, metadata, message_refs FROM checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, ns, checkpoint_id),
+            ).fetchone()
+        else:
+            row = self._conn.execute(
+                "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                "metadata_type, metadata, message_refs FROM checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1",
+                (thread_id, ns),
+            ).fetchone()
+        if row is None:
+            return None
+        entry = self._entry_from_row(thread_id, ns, row)
+        if checkpoint_id is None:
+            self._remember(key, entry)
+        return entry
+
+    def _entry_from_row(self, thread_id: str, ns: str, row: tuple) -> _Entry:
+        cid, parent, ctype, cblob, mtype, mblob, refs = row
+        messages = {}
+        if refs:
+            wanted = list(dict.fromkeys(_split_refs(refs)))
+            for i in range(0, len(wanted), _IN_BATCH):
+                batch = wanted[i : i + _IN_BATCH]
+                marks = ", ".join("?" * len(batch))
+                for digest, vtype, value in self._conn.execute(
+                    "SELECT digest, type, value FROM messages "
+                    f"WHERE thread_id = ? AND digest IN ({marks})",
+                    (thread_id, *batch),
+                ):
+                    messages[digest] = (vtype, value)
+        writes = [
+            (task_id, channel, (wtype, wblob), idx)
+            for task_id, channel, wtype, wblob, idx in self._conn.execute(
+                "SELECT task_id, channel, type, value, idx FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+                "ORDER BY task_id, idx",
+                (thread_id, ns, cid),
+            )
+        ]
+        return _Entry(
+            cid, parent, (ctype, cblob), (mtype, mblob), writes, refs, messages
+        )
+
+    # -- message log --------------------------------------------------------
+    def _encode_message(
+        self, msg: Any, known: dict[bytes, tuple[str, bytes]]
+    ) -> tuple[bytes, tuple[str, bytes]]:
+        """Digest of ``msg``'s serialized bytes, and its stored form.
+
+        ``known`` holds the messages of the thread's previous checkpoint;
+        one with the same digest is not compressed again.
+        """
+        mtype, blob = self.serde.dumps_typed(msg)
+        digest = hashlib.blake2b(blob, digest_size=_DIGEST).digest()
+        if (stored := known.get(digest)) is not None:
+            return digest, stored
+        if len(blob) >= self.compress_min:
+            packed = zlib.compress(blob, 1)
+            if len(packed) < len(blob):
+                mtype, blob = _ZLIB + mtype, packed
+        return digest, (mtype, blob)
+
+    def _decode_message(self, digest: bytes, value: tuple[str, bytes]) -> Any:
+        mtype, blob = value
+        if mtype.startswith(_ZLIB):
+            mtype, blob = mtype[len(_ZLIB) :], zlib.decompress(blob)
+        return self.serde.loads_typed((mtype, blob))
+
+    def _to_tuple(self, thread_id: str, ns: str, entry: _Entry) -> CheckpointTuple:
+        def cfg(cid: str) -> RunnableConfig:
+            return {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": ns,
+                    "checkpoint_id": cid,
+                }
+            }
+
+        checkpoint = self.serde.loads_typed(entry.checkpoint)
+        if entry.refs is not None:
+            checkpoint["channel_values"]["messages"] = [
+                self._decode_message(d, entry.messages[d])
+                for d in _split_refs(entry.refs)
+            ]
+        return CheckpointTuple(
+            config=cfg(entry.checkpoint_id),
+            checkpoint=checkpoint,
+            metadata=self.serde.loads_typed(entry.metadata),
+            parent_config=cfg(entry.parent_id) if entry.parent_id else None,
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed(value))
+                for task_id, channel, value, _ in entry.writes
+            ],
+        )
+
+    # -- BaseCheckpointSaver ------------------------------------------------
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            entry = self._load(thread_id, ns, get_checkpoint_id(config))
+        return self._to_tuple(thread_id, ns, entry) if entry else None
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (ns := config["configurable"].get("checkpoint_ns")) is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        query = (
+            f"SELECT {_CHECKPOINT_COLUMNS} FROM checkpoints"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + " ORDER BY checkpoint_id DESC"
+        )
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(query, params).fetchall()
+            entries = [
+                (row[0], row[1], self._entry_from_row(row[0], row[1], row[2:]))
+                for row in rows
+            ]
+        for thread_id, ns, entry in entries:
+            if filter:
+                metadata = self.serde.loads_typed(entry.metadata)
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield self._to_tuple(thread_id, ns, entry)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        values = checkpoint.get("channel_values", {})
+        refs: bytes | None = None
+        messages: dict[bytes, tuple[str, bytes]] = {}
+        if self.compact and isinstance(values.get("messages"), builtins.list):
+            with self._lock:
+                previous = self._cache.get((thread_id, ns))
+            known = previous.messages if previous else {}
+            encoded = [self._encode_message(m, known) for m in values["messages"]]
+            messages = dict(encoded)
+            refs = b"".join(d for d, _ in encoded)
+            rest = {k: v for k, v in values.items() if k != "messages"}
+            checkpoint = {**checkpoint, "channel_values": rest}
+        entry = _Entry(
+            checkpoint["id"],
+            config["configurable"].get("checkpoint_id"),
+            self.serde.dumps_typed(checkpoint),
+            self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+            refs=refs,
+            messages=messages,
+        )
+        telemetry.checkpoint_saved(entry.size)
+        with self._lock:
+            previous = self._cache.get((thread_id, ns))
+            stored = previous.messages if previous else {}
+            self._pending_messages.extend(
+                (thread_id, d, *v) for d, v in messages.items() if d not in stored
+            )
+            self._pending_checkpoints.append(
+                (
+                    thread_id,
+                    ns,
+                    entry.checkpoint_id,
+                    entry.parent_id,
+                    *entry.checkpoint,
+                    *entry.metadata,
+                    refs,
+                )
+            )
+            self._touched.add((thread_id, ns))
+            self._remember((thread_id, ns), entry)
+            self._maybe_flush()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        replace = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            wtype, wblob = self.serde.dumps_typed(value)
+            rows.append(
+                (
+                    thread_id,
+                    ns,
+                    checkpoint_id,
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    wtype,
+                    wblob,
+                    task_path,
+                )
+            )
+        with self._lock:
+            self._pending_writes["replace" if replace else "ignore"].extend(rows)
+            cached = self._cache.get((thread_id, ns))
+            if cached and cached.checkpoint_id == checkpoint_id:
+                keys = {(w[0], w[3]): i for i, w in enumerate(cached.writes)}
+                for row in rows:
+                    write: _Write = (row[3], row[5], (row[6], row[7]), row[4])
+                    if (row[3], row[4]) not in keys:
+                        cached.writes.append(write)
+                    elif replace:
+                        cached.writes[keys[(row[3], row[4])]] = write
+            self._maybe_flush()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.flush()
+            with self._conn:
+                for table in ("checkpoints", "writes", "messages"):
+                    self._conn.execute(
+                        f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,)
+                    )
+            for key in [k for k in self._cache if k[0] == thread_id]:
+                del self._cache[key]
+
+    def checkpoint_size(self, thread_id: str, ns: str = "") -> int | None:
+        """Serialized size of the thread's latest checkpoint, without decoding it.
+
+        With ``compact``, the messages it refers to are counted once each.
+        """
+        with self._lock:
+            entry = self._load(thread_id, ns, None)
+        return entry.size if entry else None
+
+    def thread_stats(
+        self, thread_id: str, ns: str = ""
+    ) -> tuple[int, int, bool] | None:
+        """``(messages, bytes, summarized)`` of the thread's latest checkpoint.
+
+        Counted from its ``message_refs`` and blob sizes; no message is
+        decoded. None without a checkpoint, or when messages are inline
+        (``compact=False``) and can only be counted by decoding.
+        """
+        with self._lock:
+            entry = self._load(thread_id, ns, None)
+        if entry is None or entry.refs is None:
+            return None
+        values = self.serde.loads_typed(entry.checkpoint).get("channel_values", {})
+        return len(entry.refs) // _DIGEST, entry.size, bool(values.get("summary"))
+
+    def read_messages(
+        self, thread_id: str, start: int, stop: int, ns: str = ""
+    ) -> builtins.list | None:
+        """``messages[start:stop]`` of the latest checkpoint, decoding only
+        those (None as for :meth:`thread_stats`)."""
+        with self._lock:
+            entry = self._load(thread_id, ns, None)
+        if entry is None or entry.refs is None:
+            return None
+        return [
+            self._decode_message(d, entry.messages[d])
+            for d in _split_refs(entry.refs)[start:stop]
+        ]
+
+    def thread_ids(self) -> builtins.list[str]:
+        with self._lock:
+            self.flush()
+            return [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT DISTINCT thread_id FROM checkpoints"
+                )
+            ]
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: str | None, channel: Any) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+class MemorySaver(InMemorySaver):
+    """LangGraph's ``InMemorySaver`` that reports each checkpoint's size."""
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        c = saved["configurable"]
+        telemetry.checkpoint_saved(
+            self._size(
+                c["thread_id"],
+                c["checkpoint_ns"],
+                c["checkpoint_id"],
+                checkpoint["channel_versions"],
+            )
+        )
+        return saved
+
+    def checkpoint_size(self, thread_id: str, ns: str = "") -> int | None:
+        """Serialized size of the thread's latest checkpoint, values included."""
+        checkpoints = self.storage.get(thread_id, {}).get(ns)
+        if not checkpoints:
+            return None
+        checkpoint_id = max(checkpoints)
+        blob = checkpoints[checkpoint_id][0]
+        versions = self.serde.loads_typed(blob)["channel_versions"]
+        return self._size(thread_id, ns, checkpoint_id, versions)
+
+    def _size(
+        self, thread_id: str, ns: str, checkpoint_id: str, versions: ChannelVersions
+    ) -> int:
+        blob = self.storage[thread_id][ns][checkpoint_id][0]
+        return len(blob[1]) + sum(
+            len(self.blobs[(thread_id, ns, k, v)][1])
+            for k, v in versions.items()
+            if (thread_id, ns, k, v) in self.blobs
+        )
+
+
+def make_checkpointer(root_dir: str) -> BaseCheckpointSaver:
+    """Build the checkpointer selected by ``CHECKPOINT_BACKEND``."""
+    backend = os.getenv("CHECKPOINT_BACKEND", "memory")
+    if backend == "memory":
+        return MemorySaver()
+    if backend == "sqlite":
+        path = os.getenv("CHECKPOINT_PATH") or os.path.join(
+            root_dir, "checkpoints.sqlite"
+        )
+        return SqliteSaver(
+            path,
+            keep=int(os.getenv("CHECKPOINT_KEEP", "20")),
+            cache_size=int(os.getenv("CHECKPOINT_CACHE_SIZE", "256")),
+            compact=os.getenv("CHECKPOINT_COMPACT", "1") != "0",
+        )
+    raise ValueError(f"Unknown CHECKPOINT_BACKEND: {backend!r}")
+
+
+def read_thread_messages(saver: BaseCheckpointSaver, thread_id: str) -> list | None:
+    """Read-only view of a thread's latest messages (``None`` if no checkpoint)."""
+    cp = saver.get_tuple({"configurable": {"thread_id": thread_id}})
+    if not cp:
+        return None
+    return cp.checkpoint.get("channel_values", {}).get("messages", [])
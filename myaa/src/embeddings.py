@@ -0,0 +1,128 @@
+"""Text embeddings for similarity lookups (long-term memory).
+
+``MEMORY_EMBEDDINGS`` picks the embedder:
+
+* ``hashing`` (default): hashed words and character n-grams, computed
+  locally with NumPy — no model, no network, stable across processes. It
+  finds texts that share words (Japanese: kanji / katakana and character
+  pairs), not paraphrases.
+* ``google_genai:<model>`` (e.g. ``google_genai:models/text-embedding-004``)
+  or any ``provider:model`` that ``init_embeddings`` knows: a hosted model
+  through LangChain.
+
+Vectors are float32 and L2-normalized, so the inner product is the cosine.
+NumPy is an optional dependency (``pip install myaa[memory]``).
+"""
+
+import os
+import re
+import zlib
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Any, Protocol
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def require_numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as e:  # optional extra
+        raise RuntimeError(
+            "NumPy が必要です: pip install 'myaa[memory]' (または numpy)"
+        ) from e
+    return numpy
+
+
+class Embedder(Protocol):
+    #: identifies the vector space; vectors of different names never mix
+    name: str
+    #: cosine below which a match is noise for this embedder
+    min_score: float
+
+    async def aembed(self, texts: Sequence[str]) -> "np.ndarray": ...
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+_RUNS = re.compile(r"[0-9a-z]+|[^\W\d_a-z]+")
+_HIRAGANA = re.compile(r"[\u3040-\u309f]")
+
+
+def _features(text: str):
+    """``(feature, weight)``: words and their trigrams for spaced scripts;
+    characters (not lone hiragana, mostly particles) and character pairs
+    for Japanese."""
+    for run in _RUNS.findall(text.casefold()):
+        if run.isascii():
+            yield "w:" + run, 1.0
+            padded = f"#{run}#"
+            for i in range(len(padded) - 2):
+                yield padded[i : i + 3], 0.5
+            continue
+        for i, ch in enumerate(run):
+            if not _HIRAGANA.match(ch):
+                yield ch, 1.0
+            if i + 1 < len(run):
+                yield run[i : i + 2], 1.0
+
+
+class HashingEmbedder:
+    """Signed feature hashing of words and character n-grams into ``dim``
+    buckets."""
+
+    min_score = 0.15
+
+    def __init__(self, dim: int = 256):
+        self.np = require_numpy()
+        self.dim = dim
+        self.name = f"hashing-v1-{dim}"
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        np = self.np
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in _features(text):
+                # crc32, not hash(): str hashes differ between processes
+                h = zlib.crc32(feature.encode())
+                out[row, h % self.dim] += weight if h & 0x80000000 else -weight
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+    async def aembed(self, texts: Sequence[str]) -> "np.ndarray":
+        return self.embed(texts)
+
+
+class LangChainEmbedder:
+    """Adapter for a LangChain ``Embeddings`` model."""
+
+    def __init__(self, model: Any, name: str, min_score: float = 0.6):
+        self.np = require_numpy()
+        self.model = model
+        self.name = name
+        self.min_score = min_score
+
+    async def aembed(self, texts: Sequence[str]) -> "np.ndarray":
+        np = self.np
+        vectors = np.asarray(
+            await self.model.aembed_documents(list(texts)), dtype=np.float32
+        )
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+def make_embedder(spec: str | None = None) -> Embedder:
+    """Build the embedder named by ``spec`` or ``MEMORY_EMBEDDINGS``."""
+    spec = spec or os.getenv("MEMORY_EMBEDDINGS") or "hashing"
+    if spec == "hashing":
+        return HashingEmbedder()
+    provider, _, model = spec.partition(":")
+    if provider == "google_genai":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        return LangChainEmbedder(GoogleGenerativeAIEmbeddings(model=model), spec)
+    from langchain.embeddings import init_embeddings
+
+    return LangChainEmbedder(init_embeddings(spec), spec)
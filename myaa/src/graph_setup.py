@@ -1,209 +1,431 @@
+import asyncio
+import contextvars
 import os
-from typing import Annotated, TypedDict, List
+import time
+import weakref
+from collections.abc import Collection, Sequence
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, cast
+
 from dotenv import load_dotenv
-from langchain.chat_models import init_chat_model
-from langgraph.graph import StateGraph
-from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode, tools_condition
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_tavily import TavilySearch  # type: ignore
-from langchain_core.tools import tool
-from langgraph.types import interrupt
-from langchain_core.runnables import RunnableConfig
-from langgraph.checkpoint.memory import InMemorySaver
-import yaml
-from langchain.schema import SystemMessage, HumanMessage, AIMessage
-from datetime import datetime
-from zoneinfo import ZoneInfo
-
-from .tools.nature_cli import (
-    get_room_temp,
-    set_ac,
-    set_light,
-    get_ac_status,
-    get_light_status,
-)
 
-# ---------------------------------------------------------------------------
-# 1. ENV + LLM
-# ---------------------------------------------------------------------------
+from .tracing import TraceSink, TurnTracer
+
+# one message of a turn: (speaker, text), or (speaker, text, speaker_id) when
+# the adapter knows who wrote it (long-term memory keys people by that id)
+Line = tuple[str, str] | tuple[str, str, str]
+
+if TYPE_CHECKING:
+    from langgraph.checkpoint.base import BaseCheckpointSaver
+    from langgraph.types import StreamMode
+
+    from .history import HistoryPolicy
+    from .memory import LongTermMemory
+    from .model_router import RouterStats
+    from .personas import PersonaRegistry
+    from .response_cache import ResponseCache
+    from .tool_cache import ToolCache
+    from .tool_exec import ToolLimits
+    from .turn_budget import TurnBudget
+
 load_dotenv()
-llm = init_chat_model(os.environ["GEMINI_MODEL"])
 
 root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
 persona_file = os.path.join(root_dir, "personas.yaml")
-if os.path.exists(persona_file):
-    with open(persona_file, encoding="utf-8") as f:
-        persona_configs = yaml.safe_load(f)
-else:
-    persona_configs = {}
-default_persona_id = persona_configs.get("default_persona", "example")
 
 
 # ---------------------------------------------------------------------------
-# 2. Tools
+# Runtime
 # ---------------------------------------------------------------------------
-@tool
-def human_assistance(query: str) -> str:
-    """Fallback: ask a human for help (pauses graph via interrupt)."""
-    human_response = interrupt({"query": query})
-    return human_response["data"]
-
-
-@tool
-def get_current_time() -> str:
-    """現在の日時を日本標準時（JST）で取得します。"""
-    jst_now = datetime.now(ZoneInfo("Asia/Tokyo"))
-    return jst_now.strftime("%Y-%m-%d %H:%M:%S (JST)")
-
-
-search_tool = TavilySearch(max_results=2)
-tools = [
-    search_tool,
-    human_assistance,
-    get_room_temp,
-    set_ac,
-    set_light,
-    get_current_time,
-    get_ac_status,
-    get_light_status,
-]
-llm_with_tools = llm.bind_tools(tools)
+class GraphRuntime:
+    """Builds the LLM, tools, checkpointer and compiled graph on first use.
 
+    Every piece is created once and cached. Pass any of them to the
+    constructor to inject fakes (tests, benchmarks); the rest is still built
+    lazily from the environment.
+    """
 
-# ---------------------------------------------------------------------------
-# 3. State & Nodes
-# ---------------------------------------------------------------------------
-class ChatState(TypedDict):
-    messages: Annotated[List, add_messages]
-    persona_id: str
-
-
-graph_builder = StateGraph(ChatState)
-
-
-def chatbot(state: ChatState):
-    pid = state["persona_id"]
-    config = persona_configs.get(pid, {})
-    name = config.get("name", pid)
-    owners = config.get("owners") or (
-        [] if config.get("owner") is None else [config.get("owner")]
-    )
-    owners_str = ", ".join(owners) if owners else None
-    desc = config.get("description", pid)
-    system_msg = SystemMessage(
-        content=(
-            f"You are {name}. \n{desc}\n" + f"Your owner: {owners_str}.\n"
-            if owners_str
-            else ""
-            + "Human messages are read in the format 'name: content'.\n"
-            + "Please do not include the name in the reply, only output the message content.\n"
+    def __init__(
+        self,
+        *,
+        llm: Any = None,
+        tools: list | None = None,
+        checkpointer: "BaseCheckpointSaver | None" = None,
+        personas: "PersonaRegistry | None" = None,
+        history_policy: "HistoryPolicy | None" = None,
+        tool_limits: "ToolLimits | None" = None,
+        tool_cache: "ToolCache | None" = None,
+        turn_budget: "TurnBudget | None" = None,
+        memory: "LongTermMemory | None" = None,
+        response_cache: "ResponseCache | None" = None,
+    ):
+        # (models, tool-set signature) -> model with exactly those tools bound
+        self._bound: dict[tuple[Any, tuple[str, ...]], Any] = {}
+        # persona model lists -> router over them (sharing router_stats)
+        self._routers: dict[tuple[str, ...], Any] = {}
+        # thread id -> lock held by a running turn; background state writes
+        # (summaries) take it so they never interleave with a turn's writes
+        self._thread_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+            weakref.WeakValueDictionary()
         )
-    )
-    history = state.get("messages", [])
-    messages = [system_msg] + history
-    raw = llm_with_tools.invoke(messages)
-    ai_msg = None
-    if isinstance(raw, AIMessage):
-        ai_msg = raw.model_copy(update={"additional_kwargs": {"name": name}})
-    else:
-        ai_msg = AIMessage(content=f"{name}: {raw}", additional_kwargs={"name": name})
-    return {"messages": [ai_msg]}
+        self._summarizing: set[str] = set()
+        self._background: set[asyncio.Task] = set()
+        # cached_property is a non-data descriptor: assigning here pre-fills it
+        for name, value in {
+            "llm": llm,
+            "tools": tools,
+            "checkpointer": checkpointer,
+            "personas": personas,
+            "history_policy": history_policy,
+            "tool_limits": tool_limits,
+            "tool_cache": tool_cache,
+            "turn_budget": turn_budget,
+            "memory": memory,
+            "response_cache": response_cache,
+        }.items():
+            if value is not None:
+                setattr(self, name, value)
+
+    @cached_property
+    def personas(self) -> "PersonaRegistry":
+        # personas.yaml is re-read when it changes; no restart needed
+        from .personas import PersonaRegistry
+
+        return PersonaRegistry(persona_file)
+
+    @property
+    def default_persona_id(self) -> str:
+        return self.personas.default_id
+
+    @cached_property
+    def history_policy(self) -> "HistoryPolicy":
+        # HISTORY_* env vars set the default; personas may override it with `history:`
+        from .history import HistoryPolicy
+
+        return HistoryPolicy.from_env()
+
+    def persona_history_policy(self, pid: str) -> "HistoryPolicy":
+        return self.history_policy.override(self.personas.get(pid).history)
+
+    @cached_property
+    def router_stats(self) -> "RouterStats":
+        # LLM_BREAKER_FAILURES / LLM_BREAKER_COOLDOWN; one breaker per model name
+        from .model_router import RouterStats
+
+        return RouterStats.from_env()
+
+    @cached_property
+    def llm(self) -> Any:
+        # LLM_MODELS (fallback order) or GEMINI_MODEL; LLM_TIMEOUT / LLM_HEDGE
+        from .model_router import ModelRouter
+
+        return ModelRouter.from_env(stats=self.router_stats)
 
+    def model_for(self, models: Sequence[str] | None = None) -> Any:
+        """The router over a persona's ``models:``, or :attr:`llm` if None."""
+        if not models:
+            return self.llm
+        key = tuple(models)
+        router = self._routers.get(key)
+        if router is None:
+            from .model_router import ModelRouter
 
-graph_builder.add_node("chatbot", chatbot)
+            router = self._routers[key] = ModelRouter.from_env(
+                key, stats=self.router_stats
+            )
+        return router
 
-tool_node = ToolNode(tools=tools)
-graph_builder.add_node("tools", tool_node)
+    @cached_property
+    def tools(self) -> list:
+        from .chat_graph import default_tools
 
-graph_builder.add_conditional_edges("chatbot", tools_condition)
-graph_builder.add_edge("tools", "chatbot")
+        return default_tools()
 
-graph_builder.set_entry_point("chatbot")
+    @cached_property
+    def tool_limits(self) -> "ToolLimits":
+        # TOOL_TIMEOUT / TOOL_STEP_TIMEOUT / TOOL_MAX_PARALLEL / TOOL_TIMEOUTS
+        from .tool_exec import ToolLimits
 
-# Single‑file memory (can be swapped with RedisSaver etc.)
-memory = MemorySaver()
-compiled_graph = graph_builder.compile(checkpointer=memory)
+        return ToolLimits.from_env()
+
+    @cached_property
+    def turn_budget(self) -> "TurnBudget":
+        # TURN_MAX_LLM_CALLS / TURN_MAX_TOOL_CALLS / TURN_MAX_SECONDS
+        from .turn_budget import TurnBudget
+
+        return TurnBudget.from_env()
+
+    @cached_property
+    def tool_cache(self) -> "ToolCache | None":
+        # TOOL_CACHE=0 disables it; TOOL_CACHE_SIZE / TOOL_CACHE_PATH
+        from .tool_cache import make_tool_cache
+
+        return make_tool_cache(root_dir)
+
+    @cached_property
+    def memory(self) -> "LongTermMemory | None":
+        # MEMORY=1 enables it (needs NumPy); MEMORY_PATH / MEMORY_EMBEDDINGS / ...
+        from .memory import make_memory
+
+        return make_memory(root_dir)
+
+    @cached_property
+    def response_cache(self) -> "ResponseCache | None":
+        # RESPONSE_CACHE=1 enables it; RESPONSE_CACHE_TTL / _SIZE / _SIMILARITY / ...
+        from .response_cache import make_response_cache
+
+        return make_response_cache()
+
+    def select_tools(self, names: Collection[str] | None = None) -> list:
+        """Configured tools, limited to ``names`` if given (see tool_select)."""
+        from .tool_select import select_tools
+
+        return select_tools(self.tools, names)
+
+    def bound_llm(self, tools: list, models: Sequence[str] | None = None) -> Any:
+        """The LLM with ``tools`` bound, built once per models + tool-set signature."""
+        from .tool_select import signature
+
+        key = (tuple(models) if models else None, signature(tools))
+        bound = self._bound.get(key)
+        if bound is None:
+            llm = self.model_for(models)
+            bound = self._bound[key] = llm.bind_tools(tools) if tools else llm
+        return bound
+
+    @property
+    def llm_with_tools(self) -> Any:
+        return self.bound_llm(self.select_tools())
+
+    @cached_property
+    def checkpointer(self) -> "BaseCheckpointSaver":
+        # CHECKPOINT_BACKEND=memory (default) or sqlite — see checkpoint.py
+        from .checkpoint import make_checkpointer
+
+        return make_checkpointer(root_dir)
+
+    @cached_property
+    def compiled_graph(self) -> Any:
+        from .chat_graph import build_graph
+
+        return build_graph(self).compile(checkpointer=self.checkpointer)
+
+    def warm_up(self) -> None:
+        """Build the graph (and the LLM, tools and checkpointer it uses) now
+        instead of on the first turn."""
+        _ = self.compiled_graph
+
+    def thread_lock(self, thread_id: str) -> asyncio.Lock:
+        lock = self._thread_locks.get(thread_id)
+        if lock is None:
+            lock = self._thread_locks[thread_id] = asyncio.Lock()
+        return lock
+
+    def summarize_later(self, thread_id: str, persona_id: str) -> None:
+        """Fold the thread's overflow into its summary after the turn, in the
+        background (one at a time per thread; see ``HISTORY_SUMMARIZE``)."""
+        if thread_id in self._summarizing:
+            return
+        self._summarizing.add(thread_id)
+        # a fresh context: not part of the turn's telemetry or its token stream
+        task = asyncio.get_running_loop().create_task(
+            self._summarize(thread_id, persona_id), context=contextvars.Context()
+        )
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _summarize(self, thread_id: str, persona_id: str) -> None:
+        from .chat_graph import summarize_update
+
+        graph = self.compiled_graph
+        config: Any = {"configurable": {"thread_id": thread_id}}
+        try:
+            snapshot = await graph.aget_state(config)
+            # the model call runs while later turns of the thread go on; only
+            # the write waits for the running turn
+            update = await summarize_update(self, persona_id, snapshot.values)
+            if not update:
+                return
+            async with self.thread_lock(thread_id):
+                if (await graph.aget_state(config)).next:
+                    return  # a turn paused on interrupt(); leave it alone
+                await graph.aupdate_state(config, update, as_node="chatbot")
+        except Exception as e:  # noqa: BLE001 — background; the turn is done
+            print(f"⚠️ summary failed for {thread_id}: {e!r}")
+        finally:
+            self._summarizing.discard(thread_id)
+
+    async def drain(self) -> None:
+        """Wait for background work (summaries, memory extraction); shutdown."""
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        if "memory" in self.__dict__ and self.memory is not None:
+            await self.memory.drain()
+
+
+_runtime: GraphRuntime | None = None
+
+
+def get_runtime() -> GraphRuntime:
+    global _runtime
+    if _runtime is None:
+        _runtime = GraphRuntime()
+    return _runtime
+
+
+def set_runtime(runtime: GraphRuntime | None) -> None:
+    """Replace the process-wide runtime (``None`` resets to a fresh lazy one)."""
+    global _runtime
+    _runtime = runtime
 
 
 # ---------------------------------------------------------------------------
 # Public helper
 # ---------------------------------------------------------------------------
-async def stream_chat(thread_id: str, user_text: str, persona_id: str, speaker: str):
-    """Invoke the graph and yield AI messages (for streaming to Discord)."""
-    config: RunnableConfig = {"configurable": {"thread_id": thread_id}}
-    formatted = f"{speaker}: {user_text}"
-    payload = {
-        "messages": [
-            HumanMessage(content=formatted, additional_kwargs={"name": speaker})
-        ],
-        "persona_id": persona_id,
-    }
-    events = compiled_graph.stream(payload, config, stream_mode="values")
-    for ev in events:
-        if "messages" in ev:
-            yield ev["messages"][-1].content
+# The graph is driven with ``astream`` so that LLM calls never block the
+# caller's event loop. The tools of one step run concurrently under
+# deadlines (ParallelToolNode); synchronous ones (Tavily) in the default
+# executor.
+async def stream_chat(
+    thread_id: str,
+    user_text: str,
+    persona_id: str,
+    speaker: str,
+    trace_sink: TraceSink | None = None,
+):
+    """Invoke the graph and yield AI messages (for streaming to Discord).
+
+    When ``trace_sink`` is given the same run also streams ``debug`` events,
+    which are folded into structured trace records and sent to the sink.
+    """
+    async for chunk in stream_turn(
+        thread_id, [(speaker, user_text)], persona_id, trace_sink
+    ):
+        yield chunk
 
 
-async def stream_chat_debug(
-    thread_id: str, user_text: str, persona_id: str, speaker: str
+async def stream_turn(
+    thread_id: str,
+    lines: Sequence[Line],
+    persona_id: str,
+    trace_sink: TraceSink | None = None,
+    tools: Sequence[str] | None = None,
 ):
-    config: RunnableConfig = {"configurable": {"thread_id": thread_id}}
-    formatted = f"{speaker}: {user_text}"
-    payload = {
-        "messages": [
-            HumanMessage(content=formatted, additional_kwargs={"name": speaker})
-        ],
-        "persona_id": persona_id,
-    }
-    events = compiled_graph.stream(payload, config, stream_mode="debug")
-    for ev in events:
-        print("🛠 EVENT:", ev)
-
-        if "tool_calls" in ev:
-            print("➡️ tool_calls:", ev["tool_calls"])
-        if "tool_results" in ev:
-            print("⬅️ tool_results:", ev["tool_results"])
-
-        if "messages" in ev:
-            for m in ev["messages"]:
-                print(f"   · [{m.role}] {m.content}")
+    """Like :func:`stream_chat`, for several :data:`Line` s at once.
+
+    The lines become a single ``HumanMessage`` so a burst of messages is
+    answered by one turn. ``tools`` (a channel's tool names) replaces the
+    persona's tool set for this turn.
+    """
+    async for mode, ev in _run_turn(
+        thread_id, lines, persona_id, trace_sink, [], tools
+    ):
+        if mode == "values" and "messages" in ev:
             yield ev["messages"][-1].content
 
 
-def list_graph_states(session_mgr) -> str:
-    if not isinstance(memory, InMemorySaver):
-        return "⚠️ This memory backend does not support inspection."
-    lines: list[str] = []
-    for thread_id in session_mgr.list_thread_ids():
-        lines.append(f"🧵 Thread ID: {thread_id}")
-        cp = memory.get_tuple({"configurable": {"thread_id": thread_id}})
-        if not cp:
-            lines.append("  (no checkpoint found)\n")
+async def stream_tokens(
+    thread_id: str,
+    lines: Sequence[Line],
+    persona_id: str,
+    trace_sink: TraceSink | None = None,
+    tools: Sequence[str] | None = None,
+):
+    """Yield the reply text as it is generated, token chunk by token chunk.
+
+    Only text produced by the ``chatbot`` node is yielded; tool traffic is
+    not. If a later model call in the same turn (after a tool loop) produces
+    more text, a blank line separates it from the earlier text. When the
+    model does not stream at all, the final reply is yielded in one piece.
+    """
+    from langchain_core.messages import AIMessageChunk
+
+    streamed = False
+    step = None
+    final = None
+    async for mode, ev in _run_turn(
+        thread_id, lines, persona_id, trace_sink, ["messages"], tools
+    ):
+        if mode == "values":
+            if "messages" in ev:
+                final = ev["messages"][-1]
             continue
-        msgs = cp.checkpoint.get("channel_values", {}).get("messages", [])
-        if not msgs:
-            lines.append("  (no messages found)\n")
+        chunk, meta = ev
+        if not isinstance(chunk, AIMessageChunk):
             continue
-        for m in msgs:
-            # content
-            if hasattr(m, "content"):
-                raw = m.content or ""
-            elif isinstance(m, dict):
-                raw = m.get("content") or ""
+        if meta.get("langgraph_node") != "chatbot":
+            continue
+        text = chunk.text()
+        if not text:
+            continue
+        if streamed and meta.get("langgraph_step") != step:
+            yield "\n\n"
+        step = meta.get("langgraph_step")
+        streamed = True
+        yield text
+    if not streamed and final is not None and final.content:
+        yield final.text()
+
+
+async def _run_turn(
+    thread_id: str,
+    lines: Sequence[Line],
+    persona_id: str,
+    trace_sink: TraceSink | None,
+    extra_modes: "list[StreamMode]",
+    tools: Sequence[str] | None = None,
+):
+    """Drive one graph turn and yield ``(mode, event)`` pairs.
+
+    ``values`` is always streamed; ``debug`` is added and consumed here when
+    tracing.
+    """
+    from langchain_core.messages import HumanMessage
+    from langchain_core.runnables import RunnableConfig
+
+    from .history import needs_summary
+
+    runtime = get_runtime()
+    # pin the persona for the whole turn (tool loops included), even if
+    # personas.yaml is reloaded while the turn is running
+    persona = runtime.personas.get(persona_id)
+    config: RunnableConfig = {
+        "configurable": {
+            "thread_id": thread_id,
+            "persona": persona,
+            "tools": tuple(tools) if tools is not None else persona.tools,
+            "turn_started": time.monotonic(),  # TurnBudget.max_seconds
+        }
+    }
+    formatted = "\n".join(f"{line[0]}: {line[1]}" for line in lines)
+    extra: dict[str, Any] = {
+        "name": ", ".join(dict.fromkeys(line[0] for line in lines))
+    }
+    if ids := {line[0]: line[2] for line in lines if len(line) > 2}:
+        extra["speaker_ids"] = ids  # display name -> id; see memory.turn_speakers
+    payload = {
+        "messages": [HumanMessage(content=formatted, additional_kwargs=extra)],
+        "persona_id": persona_id,
+    }
+    tracer = TurnTracer(trace_sink, thread_id) if trace_sink else None
+    modes: list[StreamMode] = ["values", *extra_modes]
+    if tracer:
+        modes.append("debug")
+    final: Any = None
+    async with runtime.thread_lock(thread_id):
+        events = runtime.compiled_graph.astream(payload, config, stream_mode=modes)
+        async for item in events:
+            mode, ev = cast(tuple[str, Any], item)
+            if mode == "debug":
+                assert tracer is not None
+                tracer.feed(ev)
             else:
-                raw = str(m) or ""
-            content = raw.strip()
-            # role
-            kind = m.__class__.__name__.lower()
-            role = "user" if "human" in kind else "ai"
-            # speaker
-            speaker = None
-            if hasattr(m, "additional_kwargs"):
-                speaker = m.additional_kwargs.get("name")
-            elif isinstance(m, dict):
-                speaker = m.get("name")
-            speaker = speaker or role
-            lines.append(f"  [{role}][{speaker}] {content}")
-        lines.append("")
-    return "\n".join(lines) if lines else "⚠️ No active sessions."
+                if mode == "values":
+                    final = ev
+                yield mode, ev
+    if tracer:
+        tracer.close()
+    policy = runtime.history_policy.override(persona.history)
+    if final and needs_summary(final.get("messages", []), policy):
+        # after the reply and outside the turn slot; see GraphRuntime._summarize
+        runtime.summarize_later(thread_id, persona_id)
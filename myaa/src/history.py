@@ -0,0 +1,117 @@
+"""Bounded conversation window and rolling-summary helpers for ``ChatState``."""
+
+import os
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, replace
+from typing import Any
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
+
+
+def _env_int(name: str, default: int | None) -> int | None:
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return default
+    value = int(raw)
+    return value if value > 0 else None
+
+
+@dataclass(frozen=True)
+class HistoryPolicy:
+    """How much of a thread's history is sent to the LLM on each call.
+
+    ``None`` disables a budget. When ``summarize`` is on, messages that fall
+    out of the window are folded into ``ChatState["summary"]`` once at least
+    ``summarize_batch`` of them have accumulated, and then dropped from state.
+    """
+
+    max_messages: int | None = 40
+    max_tokens: int | None = 6000
+    summarize: bool = False
+    summarize_batch: int = 20
+
+    @classmethod
+    def from_env(cls) -> "HistoryPolicy":
+        base = cls()
+        return cls(
+            max_messages=_env_int("HISTORY_MAX_MESSAGES", base.max_messages),
+            max_tokens=_env_int("HISTORY_MAX_TOKENS", base.max_tokens),
+            summarize=os.getenv("HISTORY_SUMMARIZE", "0") == "1",
+            summarize_batch=(
+                _env_int("HISTORY_SUMMARIZE_BATCH", base.summarize_batch)
+                or base.summarize_batch
+            ),
+        )
+
+    def override(self, cfg: Mapping[str, Any] | None) -> "HistoryPolicy":
+        """Apply a persona's ``history:`` block from personas.yaml."""
+        if not cfg:
+            return self
+        known = {k: v for k, v in cfg.items() if k in self.__dataclass_fields__}
+        for budget in ("max_messages", "max_tokens"):
+            # 0 means "no limit", as for HISTORY_MAX_MESSAGES / HISTORY_MAX_TOKENS
+            if known.get(budget) is not None and known[budget] <= 0:
+                known[budget] = None
+        return replace(self, **known)
+
+
+def _last_human_index(messages: Sequence[BaseMessage]) -> int:
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return i
+    return 0
+
+
+def window(messages: Sequence[BaseMessage], policy: HistoryPolicy) -> list[BaseMessage]:
+    """Return the suffix of ``messages`` that fits the policy's budgets.
+
+    The current turn (from the latest human message on, including any tool
+    loop in progress) is always kept. Older history is trimmed from the front
+    so that it starts on a human message, which keeps every AI tool call
+    together with its tool results.
+    """
+    split = _last_human_index(messages)
+    earlier, current = list(messages[:split]), list(messages[split:])
+    if policy.max_messages is not None:
+        earlier = trim_messages(
+            earlier,
+            strategy="last",
+            token_counter=len,
+            max_tokens=max(0, policy.max_messages - len(current)),
+            start_on="human",
+        )
+    if policy.max_tokens is not None:
+        earlier = trim_messages(
+            earlier,
+            strategy="last",
+            token_counter=count_tokens_approximately,
+            max_tokens=max(0, policy.max_tokens - count_tokens_approximately(current)),
+            start_on="human",
+        )
+    return earlier + current
+
+
+def overflow(
+    messages: Sequence[BaseMessage], policy: HistoryPolicy
+) -> list[BaseMessage]:
+    """Messages that no longer fit in the window (oldest first)."""
+    kept = window(messages, policy)
+    return list(messages[: len(messages) - len(kept)])
+
+
+def needs_summary(messages: Sequence[BaseMessage], policy: HistoryPolicy) -> bool:
+    return policy.summarize and len(overflow(messages, policy)) >= max(
+        1, policy.summarize_batch
+    )
+
+
+def summary_prompt(previous: str, old: Sequence[BaseMessage]) -> str:
+    lines = [f"{m.type}: {m.content}" for m in old if m.content]
+    return (
+        "Update the running summary of this conversation.\n"
+        "Keep names, preferences, promises and facts worth remembering; "
+        "drop small talk. Answer with the summary only.\n\n"
+        f"Current summary:\n{previous or '(none)'}\n\n"
+        "New messages:\n" + "\n".join(lines)
+    )
@@ -0,0 +1,191 @@
+"""Read-only, paginated inspection of stored conversation state (``!dump``).
+
+Works against any ``BaseCheckpointSaver``: it only uses ``get_tuple``.
+With :class:`SqliteSaver` (compact), counts and sizes come from the stored
+message references and blob sizes (:meth:`SqliteSaver.thread_stats`) and
+only the requested page of messages is decoded; other backends decode the
+thread and re-serialize it to estimate its size. Nothing is loaded or
+formatted up front — only the sessions on the requested page are read, one
+at a time. Everything here is blocking; call it from a worker thread.
+"""
+
+import itertools
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass
+from typing import Any, cast
+
+from langchain_core.messages import BaseMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+from .session_manager import SessionManager
+
+
+@dataclass(frozen=True)
+class ThreadStats:
+    session_key: str
+    thread_id: str
+    messages: int
+    tokens: int | None  # approximate; None when counted without decoding
+    checkpoint_bytes: int | None
+    summarized: bool = False
+
+    def line(self) -> str:
+        size = (
+            f"{self.checkpoint_bytes / 1024:.1f}KiB"
+            if self.checkpoint_bytes is not None
+            else "?"
+        )
+        summary = " +summary" if self.summarized else ""
+        tokens = f" ~tok={self.tokens}" if self.tokens is not None else ""
+        return (
+            f"{self.session_key} {self.thread_id[:8]} "
+            f"msgs={self.messages}{tokens} cp={size}{summary}"
+        )
+
+
+@dataclass(frozen=True)
+class MessagePage:
+    stats: ThreadStats
+    page: int  # 1 = newest messages
+    pages: int
+    lines: list[str]
+
+
+def channel_filter(channel_id: int) -> Callable[[str], bool]:
+    """Match the session key ``"<guild_id>:<channel_id>"`` of one channel."""
+    suffix = f":{channel_id}"
+    return lambda key: key.endswith(suffix)
+
+
+def _channel_values(saver: BaseCheckpointSaver, thread_id: str) -> dict | None:
+    cp = saver.get_tuple({"configurable": {"thread_id": thread_id}})
+    return cp.checkpoint.get("channel_values", {}) if cp else None
+
+
+def _size(saver: BaseCheckpointSaver, thread_id: str, values: dict) -> int | None:
+    size_of = getattr(saver, "checkpoint_size", None)
+    if size_of is not None:
+        return size_of(thread_id)
+    # other backends: re-serialize this one thread's values (an estimate)
+    try:
+        return len(saver.serde.dumps_typed(values)[1])
+    except Exception:  # noqa: BLE001 — stats only
+        return None
+
+
+def _stored_stats(
+    saver: BaseCheckpointSaver, session_key: str, thread_id: str
+) -> ThreadStats | None:
+    """Stats from what the backend stores, without decoding (SqliteSaver)."""
+    stored = getattr(saver, "thread_stats", None)
+    known = stored(thread_id) if stored is not None else None
+    if known is None:
+        return None
+    messages, size, summarized = known
+    return ThreadStats(session_key, thread_id, messages, None, size, summarized)
+
+
+def thread_stats(
+    saver: BaseCheckpointSaver, session_key: str, thread_id: str
+) -> ThreadStats | None:
+    if (stats := _stored_stats(saver, session_key, thread_id)) is not None:
+        return stats
+    values = _channel_values(saver, thread_id)
+    if values is None:
+        return None
+    return _stats(saver, session_key, thread_id, values)
+
+
+def _stats(
+    saver: BaseCheckpointSaver, session_key: str, thread_id: str, values: dict
+) -> ThreadStats:
+    msgs = values.get("messages", [])
+    return ThreadStats(
+        session_key=session_key,
+        thread_id=thread_id,
+        messages=len(msgs),
+        tokens=count_tokens_approximately(msgs) if msgs else 0,
+        checkpoint_bytes=_size(saver, thread_id, values),
+        summarized=bool(values.get("summary")),
+    )
+
+
+def sessions(
+    session_mgr: SessionManager, match: Callable[[str], bool] | None = None
+) -> list[tuple[str, str]]:
+    """``(session_key, thread_id)`` pairs, sorted, optionally filtered by key."""
+    return [
+        (key, tid)
+        for key, tid in sorted(session_mgr.sessions().items())
+        if match is None or match(key)
+    ]
+
+
+def iter_stats(
+    saver: BaseCheckpointSaver,
+    pairs: Sequence[tuple[str, str]],
+    start: int = 0,
+    stop: int | None = None,
+) -> Iterator[ThreadStats]:
+    """Stats of ``pairs[start:stop]``, loading one checkpoint at a time.
+
+    Sessions without a checkpoint yet are skipped.
+    """
+    for session_key, thread_id in itertools.islice(pairs, start, stop):
+        stats = thread_stats(saver, session_key, thread_id)
+        if stats is not None:
+            yield stats
+
+
+def format_message(m: Any, width: int = 200) -> str:
+    """``[role][speaker] content`` on one line, cut at ``width`` characters."""
+    raw: Any
+    if isinstance(m, BaseMessage):
+        raw, kwargs, kind = m.content, m.additional_kwargs, m.type
+    elif isinstance(m, dict):
+        raw, kwargs, kind = m.get("content"), m, str(m.get("type", ""))
+    else:
+        raw, kwargs, kind = str(m), {}, ""
+    content = " ".join(str(raw or "").split())
+    role = {"human": "user", "tool": "tool"}.get(kind, "ai")
+    speaker = kwargs.get("name") or role
+    if role == "ai" and not content and getattr(m, "tool_calls", None):
+        content = "→ " + ", ".join(c["name"] for c in m.tool_calls)
+    if len(content) > width:
+        content = content[: width - 1] + "…"
+    return f"[{role}][{speaker}] {content}"
+
+
+def message_page(
+    saver: BaseCheckpointSaver,
+    session_key: str,
+    thread_id: str,
+    page: int = 1,
+    page_size: int = 10,
+    width: int = 160,
+) -> MessagePage | None:
+    """One page of a thread's messages, oldest first; page 1 is the newest."""
+    if (stats := _stored_stats(saver, session_key, thread_id)) is not None:
+        pages = max(1, -(-stats.messages // page_size))
+        page = min(max(1, page), pages)
+        end = stats.messages - (page - 1) * page_size
+        start = max(0, end - page_size)
+        window = cast(Any, saver).read_messages(thread_id, start, end) or []
+        return MessagePage(
+            stats, page, pages, [format_message(m, width) for m in window]
+        )
+    values = _channel_values(saver, thread_id)
+    if values is None:
+        return None
+    msgs: Sequence[Any] = values.get("messages", [])
+    pages = max(1, -(-len(msgs) // page_size))
+    page = min(max(1, page), pages)
+    end = len(msgs) - (page - 1) * page_size
+    window = msgs[max(0, end - page_size) : end]
+    return MessagePage(
+        stats=_stats(saver, session_key, thread_id, values),
+        page=page,
+        pages=pages,
+        lines=[format_message(m, width) for m in window],
+    )
@@ -0,0 +1,731 @@
+"""Long-term memory: facts from past turns, recalled by similarity.
+
+The ``chatbot`` node only sees a window of its thread (history.py), and
+nothing crosses channels or survives a reset checkpointer. With
+``MEMORY=1`` every persona also keeps a long-term memory:
+
+* every ``extract_every`` finished turns of a thread, the model is asked
+  (in the background, after the reply) for the durable facts in them, one
+  ``name | fact`` line each; they are embedded and added to the persona's
+  index. A fact very close to one already known about the same person
+  replaces it, so updated facts do not pile up.
+* before each model call the node recalls the ``top_k`` memories most
+  similar to the turn's message that are about one of its speakers (or
+  nobody in particular) and score at least ``min_score``, up to
+  ``max_chars`` of text, and sends them as a system message after the
+  persona prompt.
+* a persona keeps at most ``max_items`` memories; beyond that the ones
+  recalled least recently are evicted and their rows reused.
+
+Storage is a directory (``MEMORY_PATH``): ``memory.sqlite`` holds the text
+and bookkeeping, ``<persona>.f32`` the unit vectors of each persona as a
+memory-mapped float32 matrix. Recall is an exact inner-product scan over
+that matrix; ``benchmarks/bench_memory.py`` measures it at 100k memories.
+Worker processes share the directory: a write bumps the persona's
+``generation`` and the other processes reload their row masks when they
+see it change.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from .embeddings import Embedder, make_embedder, normalize_text, require_numpy
+from .metrics import REGISTRY
+
+if TYPE_CHECKING:
+    import numpy as np
+
+RECALL_SECONDS = REGISTRY.histogram(
+    "memory_recall_seconds", "Embedding + scan + fetch of one recall"
+)
+RECALLED = REGISTRY.counter(
+    "memory_recalled_total", "Memories put into prompts (label: persona)"
+)
+EXTRACTED = REGISTRY.counter(
+    "memory_facts_total", "Facts stored by extraction (labels: persona, outcome)"
+)
+EVICTED = REGISTRY.counter(
+    "memory_evicted_total", "Memories dropped over max_items (label: persona)"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memories (
+    id INTEGER PRIMARY KEY,
+    persona TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    speaker TEXT NOT NULL,
+    text TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    UNIQUE (persona, slot),
+    UNIQUE (persona, digest)
+);
+CREATE INDEX IF NOT EXISTS memories_used ON memories (persona, used_at);
+CREATE TABLE IF NOT EXISTS memory_meta (
+    persona TEXT PRIMARY KEY,
+    embedder TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    generation INTEGER NOT NULL
+);
+"""
+
+MEMORY_HEADER = "Things you remember from earlier conversations (may be outdated):"
+
+
+@dataclass(frozen=True)
+class Memory:
+    id: int
+    speaker: str  # "" = not about anyone in particular
+    text: str
+    score: float = 0.0
+
+    def line(self, names: Mapping[str, str] | None = None) -> str:
+        """``- (name) text``; ``names`` maps speaker keys to display names."""
+        if not self.speaker:
+            return f"- {self.text}"
+        return f"- ({(names or {}).get(self.speaker, self.speaker)}) {self.text}"
+
+
+def memory_prompt(
+    memories: Sequence[Memory], names: Mapping[str, str] | None = None
+) -> str:
+    return "\n".join([MEMORY_HEADER, *(m.line(names) for m in memories)])
+
+
+def turn_speakers(message: Any) -> dict[str, str]:
+    """Display name -> memory key of each speaker of a turn's ``HumanMessage``.
+
+    The key is the author id the adapter sent (``speaker_ids``), so renaming
+    yourself does not reach someone else's memories; speakers without an id
+    (the scheduler's ``時報``) are keyed by name.
+    """
+    ids = message.additional_kwargs.get("speaker_ids") or {}
+    names = str(message.additional_kwargs.get("name", "")).split(", ")
+    return {n: str(ids.get(n, n)) for n in names if n}
+
+
+def turn_query(message: Any) -> tuple[list[str], str]:
+    """Speaker keys of a turn's ``HumanMessage`` (see :func:`turn_speakers`)
+    and its text without the ``name: `` prefixes."""
+    speakers = turn_speakers(message)
+    lines = []
+    for line in str(message.content).splitlines():
+        name, sep, text = line.partition(": ")
+        lines.append(text if sep and name in speakers else line)
+    return list(dict.fromkeys(speakers.values())), "\n".join(lines)
+
+
+def extraction_prompt(persona_name: str, turns: Sequence[str]) -> str:
+    return (
+        f"Below are recent conversation turns with {persona_name}.\n"
+        "List the facts worth remembering in future conversations: names, "
+        "preferences, plans, promises, personal details. Skip small talk, "
+        "questions and anything only relevant right now.\n"
+        "One fact per line as `name | fact`, where name is the person the "
+        "fact is about (`-` if nobody in particular). Answer NONE if there "
+        "is nothing.\n\n" + "\n\n".join(turns)
+    )
+
+
+def parse_facts(text: str) -> list[tuple[str, str]]:
+    """``(speaker, fact)`` pairs from an extraction answer."""
+    facts = []
+    for line in text.splitlines():
+        line = line.strip().lstrip("-*• ").strip()
+        name, sep, fact = line.partition("|")
+        fact = fact.strip()
+        if not sep or not fact:
+            continue
+        name = name.strip().strip("`")
+        facts.append(("" if name in ("", "-") else name, fact))
+    return facts
+
+
+def key_facts(
+    facts: Sequence[tuple[str, str]], speakers: Mapping[str, str]
+) -> list[tuple[str, str]]:
+    """Re-key ``(name, fact)`` pairs by the speakers' memory keys.
+
+    A fact about someone who did not speak in those turns cannot be tied to
+    an id; it is kept as a general fact with the name in its text.
+    """
+    out = []
+    for name, fact in facts:
+        if not name:
+            out.append(("", fact))
+        elif name in speakers:
+            out.append((speakers[name], fact))
+        else:
+            out.append(("", f"{name}: {fact}"))
+    return out
+
+
+class _StaleVectors(Exception):
+    """The persona's vectors were made by another embedder."""
+
+
+class _Vectors:
+    """Memory-mapped ``capacity × dim`` float32 matrix that grows by doubling."""
+
+    def __init__(self, path: str, dim: int, np: Any):
+        self.path = path
+        self.dim = dim
+        self.np = np
+        if not os.path.exists(path):
+            open(path, "wb").close()
+        self._map()
+
+    def _map(self) -> None:
+        np = self.np
+        self.capacity = os.path.getsize(self.path) // (4 * self.dim)
+        if self.capacity:
+            self.array = np.memmap(
+                self.path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim)
+            )
+        else:
+            self.array = np.zeros((0, self.dim), dtype=np.float32)
+
+    def refresh(self) -> None:
+        """Remap if another process grew the file."""
+        if os.path.getsize(self.path) // (4 * self.dim) != self.capacity:
+            self._map()
+
+    def ensure(self, rows: int) -> None:
+        self.refresh()
+        if rows <= self.capacity:
+            return
+        new = max(rows, 2 * self.capacity, 1024)
+        with open(self.path, "r+b") as f:
+            f.truncate(new * 4 * self.dim)
+        self._map()
+
+    def flush(self) -> None:
+        if self.capacity:
+            self.array.flush()
+
+
+class _Index:
+    """Row masks of one persona: which slots are live, and about whom."""
+
+    def __init__(self, vectors: _Vectors, np: Any):
+        self.vectors = vectors
+        self.np = np
+        self.generation = -1
+        self.reset([])
+
+    def reset(self, rows: Sequence[tuple[int, str]]) -> None:
+        np = self.np
+        self.size = max((slot for slot, _ in rows), default=-1) + 1
+        self.alive = np.zeros(max(self.size, 1024), dtype=bool)
+        self.speaker = np.zeros(len(self.alive), dtype=np.int32)
+        self.codes: dict[str, int] = {"": 0}
+        for slot, speaker in rows:
+            self.alive[slot] = True
+            self.speaker[slot] = self.code(speaker)
+        self.count = len(rows)
+        self.free = [int(s) for s in np.flatnonzero(~self.alive[: self.size])]
+
+    def code(self, speaker: str) -> int:
+        return self.codes.setdefault(speaker, len(self.codes))
+
+    def take_slot(self) -> int:
+        if self.free:
+            return self.free.pop()
+        self.size += 1
+        if self.size > len(self.alive):
+            grow = len(self.alive)
+            self.alive = self.np.concatenate([self.alive, self.np.zeros(grow, bool)])
+            self.speaker = self.np.concatenate(
+                [self.speaker, self.np.zeros(grow, self.np.int32)]
+            )
+        return self.size - 1
+
+    def mark(self, slot: int, speaker: str) -> None:
+        self.alive[slot] = True
+        self.speaker[slot] = self.code(speaker)
+        self.count += 1
+
+    def drop(self, slots: Sequence[int]) -> None:
+        for slot in slots:
+            if self.alive[slot]:
+                self.alive[slot] = False
+                self.count -= 1
+                self.free.append(slot)
+
+    def search(
+        self, q: "np.ndarray", speakers: Sequence[str], k: int
+    ) -> list[tuple[int, float]]:
+        """``(slot, cosine)`` of the ``k`` best live memories about one of
+        ``speakers`` or nobody in particular, best first.
+
+        The speaker filter runs before the scan: when it leaves a small part
+        of the index only those rows are read (the full scan is bound by
+        memory bandwidth, ~13 ms for 100k × 256).
+        """
+        np = self.np
+        n = self.size
+        allowed = [0] + [self.codes[s] for s in speakers if s in self.codes]
+        mask = self.alive[:n] & np.isin(self.speaker[:n], allowed)
+        slots = np.flatnonzero(mask)
+        if not len(slots):
+            return []
+        if len(slots) < n // 4:
+            scores = self.vectors.array[slots] @ q
+        else:
+            scores = (self.vectors.array[:n] @ q)[slots]
+        k = min(k, len(slots))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(slots[i]), float(scores[i])) for i in top]
+
+
+class LongTermMemory:
+    """Per-persona vector index of remembered facts; see the module docstring."""
+
+    def __init__(
+        self,
+        path: str,
+        embedder: Embedder | None = None,
+        *,
+        top_k: int = 5,
+        min_score: float | None = None,
+        max_chars: int = 800,
+        max_items: int = 20000,
+        extract_every: int = 4,
+        replace_score: float = 0.9,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.np = require_numpy()
+        self.path = path
+        self.embedder = embedder or make_embedder()
+        self.top_k = top_k
+        self.min_score = self.embedder.min_score if min_score is None else min_score
+        self.max_chars = max_chars
+        self.max_items = max_items
+        self.extract_every = extract_every
+        self.replace_score = replace_score
+        self._clock = clock
+        os.makedirs(path, exist_ok=True)
+        # autocommit; writes take BEGIN IMMEDIATE so processes never interleave
+        self._db = sqlite3.connect(
+            os.path.join(path, "memory.sqlite"),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._indexes: dict[str, _Index] = {}
+        # (persona, stored generation, speakers, query) -> memories; the
+        # model calls of one turn (tool loop) ask again and get the same answer
+        self._recent: OrderedDict[tuple, list[Memory]] = OrderedDict()
+        # (thread, persona) -> transcripts of turns not extracted yet, and
+        # their speakers (display name -> key)
+        self._pending: dict[tuple[str, str], tuple[list[str], dict[str, str]]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._recalls: dict[str, list[int]] = {}  # persona -> [recalls, with hits]
+
+    # -- index (call with self._lock held) ----------------------------------
+    def _vector_path(self, persona: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_-]", "_", persona)[:40]
+        digest = hashlib.sha1(persona.encode()).hexdigest()[:8]
+        return os.path.join(self.path, f"{safe}-{digest}.f32")
+
+    def _index(self, persona: str, dim: int) -> _Index:
+        """The persona's index, reloaded if another process changed it.
+
+        Raises :class:`_StaleVectors` if the stored vectors were made by
+        another embedder (see :meth:`reindex`).
+        """
+        row = self._db.execute(
+            "SELECT embedder, dim, generation FROM memory_meta WHERE persona = ?",
+            (persona,),
+        ).fetchone()
+        if row is None or (row[0], row[1]) != (self.embedder.name, dim):
+            if (
+                row is not None
+                and self._db.execute(
+                    "SELECT 1 FROM memories WHERE persona = ? LIMIT 1", (persona,)
+                ).fetchone()
+            ):
+                raise _StaleVectors(persona)
+            generation = row[2] + 1 if row else 0
+            self._db.execute(
+                "INSERT OR REPLACE INTO memory_meta VALUES (?, ?, ?, ?)",
+                (persona, self.embedder.name, dim, generation),
+            )
+            self._indexes.pop(persona, None)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._vector_path(persona))
+            row = (self.embedder.name, dim, generation)
+        index = self._indexes.get(persona)
+        if index is None or index.generation != row[2]:
+            rows = self._db.execute(
+                "SELECT slot, speaker FROM memories WHERE persona = ?", (persona,)
+            ).fetchall()
+            # a new mapping each time: the file may have been replaced
+            vectors = _Vectors(self._vector_path(persona), dim, self.np)
+            index = self._indexes[persona] = _Index(vectors, self.np)
+            index.reset(rows)
+            index.generation = row[2]
+        return index
+
+    async def _with_index(self, fn: Callable[..., Any], persona: str, *args) -> Any:
+        """Run ``fn(persona, *args)`` in a thread, re-embedding stale vectors."""
+        try:
+            return await asyncio.to_thread(fn, persona, *args)
+        except _StaleVectors:
+            await self.reindex(persona)
+            return await asyncio.to_thread(fn, persona, *args)
+
+    async def reindex(self, persona: str) -> int:
+        """Re-embed a persona's memories with the current embedder."""
+
+        def texts() -> list[tuple[int, str]]:
+            with self._lock:
+                return self._db.execute(
+                    "SELECT slot, text FROM memories WHERE persona = ?", (persona,)
+                ).fetchall()
+
+        rows = await asyncio.to_thread(texts)
+        if not rows:
+            return 0
+        batches = [
+            await self.embedder.aembed([t for _, t in rows[i : i + 256]])
+            for i in range(0, len(rows), 256)
+        ]
+        vectors = self.np.concatenate(batches)
+        await asyncio.to_thread(self._rewrite, persona, [s for s, _ in rows], vectors)
+        return len(rows)
+
+    def _rewrite(self, persona: str, slots: list[int], vectors: "np.ndarray") -> None:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._indexes.pop(persona, None)
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self._vector_path(persona))
+                dim = vectors.shape[1]
+                file = _Vectors(self._vector_path(persona), dim, self.np)
+                file.ensure(max(slots) + 1)
+                file.array[slots] = vectors
+                file.flush()
+                self._db.execute(
+                    "UPDATE memory_meta SET embedder = ?, dim = ?, "
+                    "generation = generation + 1 WHERE persona = ?",
+                    (self.embedder.name, dim, persona),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _bump(self, persona: str, index: _Index) -> None:
+        self._db.execute(
+            "UPDATE memory_meta SET generation = generation + 1 WHERE persona = ?",
+            (persona,),
+        )
+        index.generation += 1
+
+    def _generation(self, persona: str) -> int:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT generation FROM memory_meta WHERE persona = ?", (persona,)
+            ).fetchone()
+        return row[0] if row else -1
+
+    # -- recall -------------------------------------------------------------
+    async def recall(
+        self, persona: str, speakers: Sequence[str], query: str
+    ) -> list[Memory]:
+        """Memories for a turn by ``speakers`` saying ``query``, best first."""
+        started = time.perf_counter()
+        # the stored generation, not the local index's: another worker
+        # process may have written since
+        generation = await asyncio.to_thread(self._generation, persona)
+        key = (persona, generation, tuple(speakers), normalize_text(query))
+        memories = self._recent.get(key)
+        if memories is None:
+            q = (await self.embedder.aembed([query]))[0]
+            memories = await self._with_index(self._recall, persona, speakers, q)
+            self._recent[key] = memories
+            while len(self._recent) > 128:
+                self._recent.popitem(last=False)
+            counts = self._recalls.setdefault(persona, [0, 0])
+            counts[0] += 1
+            counts[1] += bool(memories)
+            RECALLED.inc(len(memories), persona=persona)
+        RECALL_SECONDS.observe(time.perf_counter() - started)
+        return memories
+
+    def _recall(
+        self, persona: str, speakers: Sequence[str], q: "np.ndarray"
+    ) -> list[Memory]:
+        with self._lock:
+            index = self._index(persona, len(q))
+            found = index.search(q, speakers, self.top_k)
+            scores = {s: v for s, v in found if v >= self.min_score}
+            top = list(scores)
+            if not top:
+                return []
+            marks = ",".join("?" * len(top))
+            rows = self._db.execute(
+                "SELECT slot, id, speaker, text FROM memories "
+                f"WHERE persona = ? AND slot IN ({marks})",
+                (persona, *top),
+            ).fetchall()
+            self._db.execute(
+                "UPDATE memories SET used_at = ? "
+                f"WHERE persona = ? AND slot IN ({marks})",
+                (self._clock(), persona, *top),
+            )
+        by_slot = {r[0]: r[1:] for r in rows}
+        memories: list[Memory] = []
+        used = 0
+        for slot in top:
+            if slot not in by_slot:
+                continue
+            mid, speaker, text = by_slot[slot]
+            memory = Memory(mid, speaker, text, round(scores[slot], 3))
+            used += len(memory.line())
+            if memories and used > self.max_chars:
+                break
+            memories.append(memory)
+        return memories
+
+    # -- store --------------------------------------------------------------
+    async def add(self, persona: str, facts: Sequence[tuple[str, str]]) -> int:
+        """Store ``(speaker, fact)`` pairs; returns how many were new."""
+        facts = [(s, " ".join(t.split())) for s, t in facts if t.strip()]
+        if not facts:
+            return 0
+        vectors = await self.embedder.aembed([t for _, t in facts])
+        added, replaced, evicted = await self._with_index(
+            self._add, persona, facts, vectors
+        )
+        EXTRACTED.inc(added, persona=persona, outcome="added")
+        EXTRACTED.inc(replaced, persona=persona, outcome="replaced")
+        EVICTED.inc(evicted, persona=persona)
+        return added
+
+    def _add(
+        self,
+        persona: str,
+        facts: Sequence[tuple[str, str]],
+        vectors: "np.ndarray",
+    ) -> tuple[int, int, int]:
+        added = replaced = 0
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                index = self._index(persona, vectors.shape[1])
+                now = self._clock()
+                for (speaker, text), v in zip(facts, vectors):
+                    digest = hashlib.sha1(
+                        f"{speaker}\n{normalize_text(text)}".encode()
+                    ).hexdigest()
+                    known = self._db.execute(
+                        "UPDATE memories SET used_at = ? "
+                        "WHERE persona = ? AND digest = ?",
+                        (now, persona, digest),
+                    ).rowcount
+                    if known:
+                        continue
+                    best = self._closest(index, speaker, v)
+                    if best is not None:
+                        self._db.execute(
+                            "UPDATE memories SET text = ?, digest = ?, "
+                            "created_at = ?, used_at = ? "
+                            "WHERE persona = ? AND slot = ?",
+                            (text, digest, now, now, persona, best),
+                        )
+                        index.vectors.array[best] = v
+                        replaced += 1
+                        continue
+                    slot = index.take_slot()
+                    index.vectors.ensure(slot + 1)
+                    index.vectors.array[slot] = v
+                    self._db.execute(
+                        "INSERT INTO memories "
+                        "(persona, slot, speaker, text, digest, created_at, used_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (persona, slot, speaker, text, digest, now, now),
+                    )
+                    index.mark(slot, speaker)
+                    added += 1
+                evicted = self._evict(persona, index)
+                index.vectors.flush()
+                self._bump(persona, index)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                index_ = self._indexes.get(persona)
+                if index_ is not None:
+                    index_.generation = -1  # masks may be ahead of the db
+                raise
+        return added, replaced, evicted
+
+    def _closest(self, index: _Index, speaker: str, v: "np.ndarray") -> int | None:
+        """Slot of a memory about the same ``speaker`` that ``v`` restates."""
+        np = self.np
+        code = index.codes.get(speaker)
+        if code is None:
+            return None
+        n = index.size
+        slots = np.flatnonzero(index.alive[:n] & (index.speaker[:n] == code))
+        if not len(slots):
+            return None
+        sims = index.vectors.array[slots] @ v
+        i = int(np.argmax(sims))
+        return int(slots[i]) if sims[i] >= self.replace_score else None
+
+    def _evict(self, persona: str, index: _Index) -> int:
+        over = index.count - self.max_items
+        if over <= 0:
+            return 0
+        slots = [
+            r[0]
+            for r in self._db.execute(
+                "SELECT slot FROM memories WHERE persona = ? "
+                "ORDER BY used_at LIMIT ?",
+                (persona, over),
+            )
+        ]
+        self._db.executemany(
+            "DELETE FROM memories WHERE persona = ? AND slot = ?",
+            [(persona, s) for s in slots],
+        )
+        index.drop(slots)
+        return len(slots)
+
+    def forget(self, persona: str, speaker: str | None = None) -> int:
+        """Drop a persona's memories (only those about ``speaker`` if given)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                where, args = "persona = ?", [persona]
+                if speaker is not None:
+                    where, args = where + " AND speaker = ?", args + [speaker]
+                forgotten = self._db.execute(
+                    f"DELETE FROM memories WHERE {where}", args
+                ).rowcount
+                self._db.execute(
+                    "UPDATE memory_meta SET generation = generation + 1 "
+                    "WHERE persona = ?",
+                    (persona,),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._indexes.pop(persona, None)  # reloaded on next use
+            self._recent.clear()
+        return forgotten
+
+    def about(self, persona: str, speaker: str, limit: int = 10) -> list[Memory]:
+        """The most recently used memories about ``speaker``."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, speaker, text FROM memories "
+                "WHERE persona = ? AND speaker = ? ORDER BY used_at DESC LIMIT ?",
+                (persona, speaker, limit),
+            ).fetchall()
+        return [Memory(*r) for r in rows]
+
+    # -- extraction ---------------------------------------------------------
+    def observe(
+        self,
+        thread_id: str,
+        persona: str,
+        persona_name: str,
+        transcript: str,
+        llm: Any,
+        speakers: Mapping[str, str] | None = None,
+    ) -> None:
+        """Queue a finished turn; every ``extract_every`` turns of a thread
+        ``llm`` extracts facts from them in the background.
+
+        ``speakers`` (see :func:`turn_speakers`) keys the facts about the
+        turn's speakers by id rather than by display name.
+        """
+        turns, names = self._pending.setdefault((thread_id, persona), ([], {}))
+        turns.append(transcript)
+        names.update(speakers or {})
+        if len(turns) < self.extract_every:
+            return
+        del self._pending[(thread_id, persona)]
+        prompt = extraction_prompt(persona_name, turns)
+        # a fresh context: not part of the turn's telemetry or its token stream
+        task = asyncio.get_running_loop().create_task(
+            self._extract(persona, prompt, llm, names), context=contextvars.Context()
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _extract(
+        self, persona: str, prompt: str, llm: Any, speakers: Mapping[str, str]
+    ) -> None:
+        from langchain_core.messages import HumanMessage
+
+        try:
+            raw = await llm.ainvoke([HumanMessage(content=prompt)])
+            await self.add(persona, key_facts(parse_facts(raw.text()), speakers))
+        except Exception as e:  # noqa: BLE001 — background; the turn is done
+            print(f"⚠️ memory extraction failed for {persona}: {e!r}")
+
+    async def drain(self) -> None:
+        """Wait for extractions in flight (shutdown)."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    # -- stats --------------------------------------------------------------
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Per persona: stored items, recalls and how many found something."""
+        with self._lock:
+            counts = dict(
+                self._db.execute(
+                    "SELECT persona, COUNT(*) FROM memories GROUP BY persona"
+                ).fetchall()
+            )
+        out = {}
+        for persona in sorted(set(counts) | set(self._recalls)):
+            recalls, hits = self._recalls.get(persona, [0, 0])
+            out[persona] = {
+                "items": counts.get(persona, 0),
+                "recalls": recalls,
+                "hit_rate": round(hits / recalls, 3) if recalls else 0.0,
+            }
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            for index in self._indexes.values():
+                index.vectors.flush()
+            self._db.close()
+
+
+def make_memory(root_dir: str) -> LongTermMemory | None:
+    """Build the memory selected by ``MEMORY`` (off unless ``1``)."""
+    if os.getenv("MEMORY", "0") != "1":
+        return None
+    return LongTermMemory(
+        os.getenv("MEMORY_PATH") or os.path.join(root_dir, "memory"),
+        top_k=int(os.getenv("MEMORY_TOP_K", "5")),
+        min_score=float(v) if (v := os.getenv("MEMORY_MIN_SCORE")) else None,
+        max_chars=int(os.getenv("MEMORY_MAX_CHARS", "800")),
+        max_items=int(os.getenv("MEMORY_MAX_ITEMS", "20000")),
+        extract_every=int(os.getenv("MEMORY_EXTRACT_EVERY", "4")),
+    )
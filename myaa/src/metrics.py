@@ -0,0 +1,162 @@
+"""Tiny in-process metrics registry (counters, gauges, histograms).
+
+Metrics are keyed by name plus optional labels::
+
+    REGISTRY.counter("remo_retries_total").inc(path="/appliances")
+    REGISTRY.histogram("remo_queue_wait_seconds").observe(0.12)
+
+:meth:`MetricsRegistry.render` produces the Prometheus text format.
+"""
+
+import bisect
+import threading
+from collections.abc import Iterator
+
+LabelKey = tuple[tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _key(labels: dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self._values: dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: object) -> float:
+        return self._values.get(_key(labels), 0)
+
+    def samples(self) -> Iterator[tuple[LabelKey, float]]:
+        yield from list(self._values.items())
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: object) -> None:
+        with self._lock:
+            self._values[_key(labels)] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._values: dict[LabelKey, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = _key(labels)
+        with self._lock:
+            row = self._values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            row[bisect.bisect_left(self.buckets, value)] += 1
+            row[-1] += value
+
+    def count(self, **labels: object) -> int:
+        row = self._values.get(_key(labels))
+        return int(sum(row[:-1])) if row else 0
+
+    def total(self, **labels: object) -> float:
+        row = self._values.get(_key(labels))
+        return row[-1] if row else 0.0
+
+    def quantile(self, q: float, **labels: object) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        row = self._values.get(_key(labels))
+        if not row:
+            return 0.0
+        target = q * sum(row[:-1])
+        seen = 0.0
+        for bound, n in zip(self.buckets + (float("inf"),), row[:-1]):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def samples(self) -> Iterator[tuple[LabelKey, list[float]]]:
+        yield from [(k, list(v)) for k, v in self._values.items()]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, **kwargs)
+            elif not isinstance(metric, cls) or type(metric) is not cls:
+                raise TypeError(f"metric {name!r} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def histogram(
+        self, name: str, help: str = "", buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def all(self) -> list[Counter | Histogram]:
+        return list(self._metrics.values())
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        out: list[str] = []
+        for metric in sorted(self.all(), key=lambda m: m.name):
+            if metric.help:
+                out.append(f"# HELP {metric.name} {metric.help}")
+            out.append(f"# TYPE {metric.name} {metric.kind}")
+            if isinstance(metric, Histogram):
+                for key, row in metric.samples():
+                    seen = 0.0
+                    bounds = [_fmt(b) for b in metric.buckets] + ["+Inf"]
+                    for bound, n in zip(bounds, row[:-1]):
+                        seen += n
+                        le = _labels(key + (("le", bound),))
+                        out.append(f"{metric.name}_bucket{le} {_fmt(seen)}")
+                    out.append(f"{metric.name}_sum{_labels(key)} {_fmt(row[-1])}")
+                    out.append(f"{metric.name}_count{_labels(key)} {_fmt(seen)}")
+            else:
+                for key, value in metric.samples():
+                    out.append(f"{metric.name}{_labels(key)} {_fmt(value)}")
+        return "\n".join(out) + "\n"
+
+
+def _fmt(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+    return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,383 @@
+"""Failover and hedging across several chat models.
+
+:class:`ModelRouter` is itself a chat model, so the graph binds tools to it
+and streams from it like from a single model::
+
+    router = ModelRouter(routes=[("gemini-flash", flash), ("gemini-pro", pro)])
+    llm = router.bind_tools(tools)  # binds every route, shares the stats
+
+* routes are tried in order; an attempt fails on an error or when it makes
+  no progress for ``timeout`` seconds (first chunk, then between chunks)
+* each route has a circuit breaker: after ``failures`` consecutive failures
+  it is skipped for ``cooldown`` seconds, then one trial request decides
+  whether it closes again
+* with ``hedge=True`` a second request goes to the next route when the
+  first has not produced a chunk after the route's recent p95 time to first
+  chunk (at least ``hedge_min``); whichever streams first is used and the
+  other is cancelled
+* once text has been streamed to the caller there is no failover; the
+  error is raised as before
+
+Per-route counts, time-to-first-chunk percentiles and breaker states are in
+:meth:`ModelRouter.stats` and the ``llm_*`` metrics.
+"""
+
+import asyncio
+import contextlib
+import os
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+from langchain_core.language_models.chat_models import (
+    BaseChatModel,
+    agenerate_from_stream,
+)
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableConfig
+from pydantic import Field
+
+from .metrics import REGISTRY
+
+REQUESTS = REGISTRY.counter(
+    "llm_requests_total", "Model requests by route (labels: route, outcome)"
+)
+FIRST_CHUNK = REGISTRY.histogram(
+    "llm_first_chunk_seconds", "Time to the first streamed chunk (label: route)"
+)
+CIRCUIT_OPEN = REGISTRY.gauge(
+    "llm_circuit_open", "1 while a route's circuit breaker is open (label: route)"
+)
+HEDGES = REGISTRY.counter(
+    "llm_hedged_requests_total", "Backup requests sent by hedging (label: won)"
+)
+
+
+class AllRoutesFailed(RuntimeError):
+    """すべてのモデルが失敗したときの例外（最後のエラーを ``__cause__`` に持つ）。"""
+
+
+@dataclass
+class CircuitBreaker:
+    failures: int = 3
+    cooldown: float = 30.0
+    clock: Callable[[], float] = time.monotonic
+    consecutive: int = 0
+    opened_at: float | None = None
+    trial: bool = False  # a half-open trial request is in flight
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial:
+            self.trial = True
+            return True
+        return False
+
+    def success(self) -> None:
+        self.consecutive = 0
+        self.opened_at = None
+        self.trial = False
+
+    def release(self) -> None:
+        """Give back a half-open trial whose request got no answer either way."""
+        self.trial = False
+
+    def failure(self) -> None:
+        self.consecutive += 1
+        self.trial = False
+        if self.opened_at is not None or self.consecutive >= self.failures:
+            self.opened_at = self.clock()
+
+
+@dataclass
+class RouteStats:
+    breaker: CircuitBreaker
+    first_chunk: deque[float] = field(default_factory=lambda: deque(maxlen=200))
+    outcomes: dict[str, int] = field(default_factory=dict)
+
+    def count(self, outcome: str) -> None:
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def quantile(self, q: float) -> float | None:
+        if len(self.first_chunk) < 5:
+            return None
+        ordered = sorted(self.first_chunk)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class RouterStats:
+    """Breakers and latency samples per route name; shared by bound copies."""
+
+    def __init__(
+        self,
+        failures: int = 3,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.clock = clock
+        self.routes: dict[str, RouteStats] = {}
+
+    @classmethod
+    def from_env(cls) -> "RouterStats":
+        return cls(
+            failures=int(os.getenv("LLM_BREAKER_FAILURES", "3")),
+            cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", "30")),
+        )
+
+    def __getitem__(self, name: str) -> RouteStats:
+        stats = self.routes.get(name)
+        if stats is None:
+            breaker = CircuitBreaker(self.failures, self.cooldown, self.clock)
+            stats = self.routes[name] = RouteStats(breaker)
+        return stats
+
+    def record(self, name: str, outcome: str, first_chunk: float | None = None):
+        stats = self[name]
+        stats.count(outcome)
+        REQUESTS.inc(route=name, outcome=outcome)
+        if outcome == "ok":
+            stats.breaker.success()
+            if first_chunk is not None:
+                stats.first_chunk.append(first_chunk)
+                FIRST_CHUNK.observe(first_chunk, route=name)
+        elif outcome in ("error", "timeout"):
+            stats.breaker.failure()
+        elif outcome in ("hedge_lost", "cancelled"):
+            stats.breaker.release()
+        CIRCUIT_OPEN.set(int(stats.breaker.state == "open"), route=name)
+
+
+class _Attempt:
+    """One streaming request; ``task`` resolves with its first chunk."""
+
+    def __init__(self, name: str, model: Any, messages, kwargs, timeout: float):
+        self.name = name
+        self.started = time.perf_counter()
+        # no callbacks: only the router's own chunks reach the graph's stream
+        config: RunnableConfig = {"callbacks": []}
+        self.stream = aiter(model.astream(messages, config, **kwargs))
+        self.timeout = timeout
+        self.task = asyncio.ensure_future(self._first())
+
+    async def _first(self) -> AIMessageChunk:
+        return await asyncio.wait_for(anext(self.stream), self.timeout)
+
+    async def next(self) -> AIMessageChunk:
+        return await asyncio.wait_for(anext(self.stream), self.timeout)
+
+    async def cancel(self) -> None:
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        await self.close()
+
+    async def close(self) -> None:
+        with contextlib.suppress(Exception):  # 後片付けのみ
+            await self.stream.aclose()  # type: ignore[attr-defined]
+
+
+class ModelRouter(BaseChatModel):
+    """Chat model that fails over between ``routes``; see the module docstring."""
+
+    routes: list[tuple[str, Any]]
+    timeout: float = 30.0
+    hedge: bool = False
+    hedge_min: float = 1.0
+    hedge_quantile: float = 0.95
+    router_stats: RouterStats = Field(default_factory=RouterStats)
+
+    @classmethod
+    def from_env(
+        cls, names: Sequence[str] | None = None, stats: RouterStats | None = None
+    ) -> "ModelRouter":
+        """Routes from ``names`` or ``LLM_MODELS`` (comma separated), else
+        ``GEMINI_MODEL``; ``LLM_TIMEOUT``, ``LLM_HEDGE``, ``LLM_HEDGE_MIN``,
+        ``LLM_BREAKER_FAILURES``, ``LLM_BREAKER_COOLDOWN``."""
+        from langchain.chat_models import init_chat_model
+
+        if not names:
+            raw = os.getenv("LLM_MODELS") or os.getenv("GEMINI_MODEL") or ""
+            names = [n.strip() for n in raw.split(",") if n.strip()]
+        if not names:
+            raise RuntimeError("GEMINI_MODEL が設定されていません。")
+        return cls(
+            routes=[(n, init_chat_model(n)) for n in names],
+            timeout=float(os.getenv("LLM_TIMEOUT", "30")),
+            hedge=os.getenv("LLM_HEDGE") == "1",
+            hedge_min=float(os.getenv("LLM_HEDGE_MIN", "1.0")),
+            router_stats=stats or RouterStats.from_env(),
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "router"
+
+    def bind_tools(self, tools, **kwargs: Any):  # type: ignore[override]
+        routes = [(name, m.bind_tools(tools, **kwargs)) for name, m in self.routes]
+        return self.model_copy(update={"routes": routes})
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        out = {}
+        for name, _ in self.routes:
+            s = self.router_stats[name]
+            p50, p95 = s.quantile(0.5), s.quantile(0.95)
+            out[name] = {
+                "state": s.breaker.state,
+                **s.outcomes,
+                "first_chunk_p50_s": round(p50, 3) if p50 is not None else None,
+                "first_chunk_p95_s": round(p95, 3) if p95 is not None else None,
+            }
+        return out
+
+    def _hedge_delay(self, name: str) -> float:
+        p = self.router_stats[name].quantile(self.hedge_quantile)
+        return max(self.hedge_min, p) if p is not None else max(self.hedge_min, 2.0)
+
+    def _claim(
+        self, queue: list[tuple[str, Any]], skipped: list[tuple[str, Any]], force: bool
+    ) -> tuple[str, Any] | None:
+        """Pop the next route whose breaker lets a request through (any
+        route with ``force``); routes passed over go to ``skipped``."""
+        while queue:
+            route = queue.pop(0)
+            if force or self.router_stats[route[0]].breaker.allow():
+                return route
+            self.router_stats.record(route[0], "skipped")
+            skipped.append(route)
+        return None
+
+    async def _race(self, messages, kwargs) -> tuple[_Attempt, AIMessageChunk]:
+        """Start routes in order (one after another, or hedged) until one
+        produces a first chunk."""
+        queue = list(self.routes)
+        skipped: list[tuple[str, Any]] = []
+        force = False
+        first_route: str | None = None
+        running: list[_Attempt] = []
+        errors: list[BaseException] = []
+        hedged = False
+        try:
+            while True:
+                if not running:
+                    route = self._claim(queue, skipped, force)
+                    if route is None and not errors and skipped:
+                        # every breaker open: still try them in order rather
+                        # than fail outright
+                        queue, skipped, force = skipped, [], True
+                        route = self._claim(queue, skipped, force)
+                    if route is None:
+                        break
+                    running.append(_Attempt(*route, messages, kwargs, self.timeout))
+                    first_route = first_route or route[0]
+                wait: float | None = None
+                if self.hedge and queue and len(running) == 1:
+                    elapsed = time.perf_counter() - running[0].started
+                    wait = max(0.0, self._hedge_delay(running[0].name) - elapsed)
+                done, _ = await asyncio.wait(
+                    [a.task for a in running],
+                    timeout=wait,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:  # the primary is slow: ask the next route as well
+                    route = self._claim(queue, skipped, force)
+                    if route is not None:
+                        running.append(_Attempt(*route, messages, kwargs, self.timeout))
+                        hedged = True
+                    continue
+                for attempt in [a for a in running if a.task in done]:
+                    running.remove(attempt)
+                    exc = attempt.task.exception()
+                    if exc is not None and not isinstance(exc, StopAsyncIteration):
+                        outcome = (
+                            "timeout" if isinstance(exc, TimeoutError) else "error"
+                        )
+                        self.router_stats.record(attempt.name, outcome)
+                        errors.append(exc)
+                        await attempt.close()
+                        continue
+                    for other in running:
+                        await other.cancel()
+                        self.router_stats.record(other.name, "hedge_lost")
+                    running.clear()
+                    if hedged:
+                        HEDGES.inc(
+                            won="backup" if attempt.name != first_route else "primary"
+                        )
+                    elapsed = time.perf_counter() - attempt.started
+                    self.router_stats.record(attempt.name, "ok", elapsed)
+                    # an empty stream is an answer too
+                    chunk = AIMessageChunk(content="") if exc else attempt.task.result()
+                    return attempt, chunk
+        finally:
+            # cancelled turn: stop the requests still out, free their trials
+            for attempt in running:
+                await attempt.cancel()
+                self.router_stats.record(attempt.name, "cancelled")
+        if not errors:  # no route configured
+            raise AllRoutesFailed("no model route to try")
+        raise AllRoutesFailed(
+            f"all {len(self.routes)} model routes failed: {errors[-1]!r}"
+        ) from errors[-1]
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop=None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        if stop is not None:
+            kwargs["stop"] = stop
+        attempt, chunk = await self._race(messages, kwargs)
+        try:
+            while True:
+                gen = ChatGenerationChunk(message=chunk)
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text(), chunk=gen)
+                yield gen
+                try:
+                    chunk = await attempt.next()
+                except StopAsyncIteration:
+                    return
+        finally:
+            await attempt.close()
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop=None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await agenerate_from_stream(
+            self._astream(messages, stop, run_manager, **kwargs)
+        )
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop=None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        # sync callers (invoke, batch): the same failover path on a loop of its
+        # own thread, so this also works from a thread that runs a loop
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(
+                asyncio.run, self._agenerate(messages, stop, None, **kwargs)
+            ).result()
@@ -0,0 +1,191 @@
+"""Typed, hot-reloadable view of ``personas.yaml``."""
+
+import os
+import threading
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any
+
+import yaml
+from langchain_core.messages import SystemMessage
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+
+class PersonaConfigError(ValueError):
+    """personas.yaml の内容が不正なときの例外。"""
+
+
+@dataclass(frozen=True)
+class Persona:
+    id: str
+    name: str
+    description: str
+    owners: tuple[str, ...] = ()
+    history: Mapping[str, Any] = field(default_factory=lambda: _EMPTY, compare=False)
+    tools: tuple[str, ...] | None = None  # None: every configured tool
+    models: tuple[str, ...] | None = None  # None: LLM_MODELS / GEMINI_MODEL
+    system_message: SystemMessage = field(init=False, compare=False, repr=False)
+
+    def __post_init__(self):
+        lines = [f"You are {self.name}.", self.description.rstrip()]
+        if self.owners:
+            lines.append(f"Your owner: {', '.join(self.owners)}.")
+        lines += [
+            "Human messages are read in the format 'name: content'.",
+            "Please do not include the name in the reply, only output the message content.",
+        ]
+        prompt = "\n".join(lines) + "\n"
+        # built once per persona; the text never changes between calls, so it
+        # forms a stable prefix that providers can cache across turns
+        object.__setattr__(self, "system_message", SystemMessage(content=prompt))
+
+    @classmethod
+    def fallback(cls, pid: str) -> "Persona":
+        """Persona for an id that is not defined in personas.yaml."""
+        return cls(id=pid, name=pid, description=pid)
+
+    @classmethod
+    def from_config(cls, pid: str, cfg: Any) -> "Persona":
+        if not isinstance(cfg, Mapping):
+            raise PersonaConfigError(f"persona '{pid}' must be a mapping")
+        name = cfg.get("name", pid)
+        desc = cfg.get("description", pid)
+        owners = cfg.get("owners")
+        if owners is None:
+            owners = [] if cfg.get("owner") is None else [cfg["owner"]]
+        history = cfg.get("history") or {}
+        tools = cfg.get("tools")
+        models = cfg.get("models")
+        if not isinstance(name, str) or not isinstance(desc, str):
+            raise PersonaConfigError(f"persona '{pid}': name/description must be text")
+        if not isinstance(owners, list) or not all(isinstance(o, str) for o in owners):
+            raise PersonaConfigError(f"persona '{pid}': owners must be a list of names")
+        if not isinstance(history, Mapping):
+            raise PersonaConfigError(f"persona '{pid}': history must be a mapping")
+        if tools is not None and (
+            not isinstance(tools, list) or not all(isinstance(t, str) for t in tools)
+        ):
+            raise PersonaConfigError(f"persona '{pid}': tools must be a list of names")
+        if models is not None and (
+            not isinstance(models, list)
+            or not models
+            or not all(isinstance(m, str) for m in models)
+        ):
+            raise PersonaConfigError(
+                f"persona '{pid}': models must be a non-empty list of model names"
+            )
+        return cls(
+            id=pid,
+            name=name,
+            description=desc,
+            owners=tuple(owners),
+            history=MappingProxyType(dict(history)),
+            tools=tuple(tools) if tools is not None else None,
+            models=tuple(models) if models is not None else None,
+        )
+
+
+@dataclass(frozen=True)
+class PersonaSet:
+    personas: Mapping[str, Persona]
+    default_id: str
+
+    @classmethod
+    def parse(cls, raw: Any) -> "PersonaSet":
+        raw = raw or {}
+        if not isinstance(raw, Mapping):
+            raise PersonaConfigError("personas.yaml must be a mapping")
+        default_id = raw.get("default_persona", "example")
+        personas = {
+            pid: Persona.from_config(pid, cfg)
+            for pid, cfg in raw.items()
+            if pid != "default_persona"
+        }
+        return cls(MappingProxyType(personas), default_id)
+
+
+class PersonaRegistry:
+    """Validated personas, reloaded when personas.yaml changes on disk.
+
+    The file's mtime is checked at most every ``check_interval`` seconds. A
+    new version is parsed completely before it replaces the current set in a
+    single assignment, so readers never see a half-loaded file; a file that
+    fails validation is reported and the previous personas stay active.
+    Persona objects are immutable, so a turn that already holds one keeps
+    using it even if the file changes meanwhile.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        *,
+        data: Any = None,
+        check_interval: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.path = path
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._mtime: float | None = None
+        self._checked_at = clock()
+        self._fallbacks: dict[str, Persona] = {}
+        self._set = PersonaSet.parse(data) if path is None else self._read()
+
+    def _read(self) -> PersonaSet:
+        assert self.path is not None
+        if not os.path.exists(self.path):
+            self._mtime = None
+            return PersonaSet.parse({})
+        self._mtime = os.stat(self.path).st_mtime
+        with open(self.path, encoding="utf-8") as f:
+            return PersonaSet.parse(yaml.safe_load(f))
+
+    def maybe_reload(self, force: bool = False) -> bool:
+        """Re-read the file if its mtime changed. Returns True on a swap."""
+        if self.path is None:
+            return False
+        now = self._clock()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except FileNotFoundError:
+                mtime = None
+            if not force and mtime == self._mtime:
+                return False
+            try:
+                new_set = self._read()
+            except (PersonaConfigError, yaml.YAMLError) as e:
+                self._mtime = mtime  # don't retry the same broken file
+                print(f"⚠️ personas.yaml を読み込めませんでした（前の設定を継続）: {e}")
+                return False
+            self._set = new_set
+            return True
+
+    @property
+    def default_id(self) -> str:
+        self.maybe_reload()
+        return self._set.default_id
+
+    def ids(self) -> list[str]:
+        self.maybe_reload()
+        return list(self._set.personas)
+
+    def __contains__(self, pid: str) -> bool:
+        self.maybe_reload()
+        return pid in self._set.personas
+
+    def get(self, pid: str) -> Persona:
+        self.maybe_reload()
+        persona = self._set.personas.get(pid)
+        if persona is None:
+            persona = self._fallbacks.get(pid)
+            if persona is None:
+                persona = self._fallbacks[pid] = Persona.fallback(pid)
+        return persona
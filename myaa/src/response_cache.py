@@ -0,0 +1,300 @@
+"""Cache of ``chatbot`` replies for repeated prompts (``RESPONSE_CACHE=1``).
+
+Greetings and fixed instructions (``!jihou``, ``!schedule``) arrive in many
+channels with the same wording, and each one costs a full model call. The
+cache sits in front of the first model call of a turn:
+
+* the key is the persona (its prompt, models and bound tools, plus the
+  summary / memory system messages of this call), the turn's speakers, the
+  last ``context`` messages before the turn and the turn's text, ignoring
+  case, whitespace and punctuation
+* an exact lookup first; then, with an embedder, the most similar cached
+  text under the same persona / speakers / context, if its cosine is at
+  least ``min_score``
+* entries expire after ``ttl`` seconds; at most ``max_entries`` are kept,
+  least recently used first out
+* only plain answers are stored. A prompt the model answered by calling a
+  side-effecting tool (``@invalidates``, e.g. ``set_light``) is remembered
+  as "bypass": later lookups for it, or for texts similar to it, go to the
+  model, so a cached reply never stands in for the tool call. Calls after
+  tool results and forced final answers (turn budget) are never cached.
+
+Hits, misses and bypasses per persona, and the model latency the hits
+saved (the persona's mean latency of cached answers, per hit), are in
+:meth:`ResponseCache.stats` and the ``response_cache_*`` metrics. Each
+process (worker) has its own cache.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.tools import BaseTool
+
+from .embeddings import Embedder, make_embedder, normalize_text, require_numpy
+from .memory import turn_query
+from .metrics import REGISTRY
+from .tool_cache import invalidated_tags
+
+LOOKUPS = REGISTRY.counter(
+    "response_cache_lookups_total",
+    "Response cache lookups (labels: persona, outcome=exact|similar|miss|bypass)",
+)
+SAVED = REGISTRY.counter(
+    "response_cache_saved_seconds_total",
+    "Estimated model latency avoided by hits (label: persona)",
+)
+
+_PUNCT = re.compile(r"[\W_]+")
+
+
+def normalize_prompt(text: str) -> str:
+    """``"おはよう！"`` and ``"  おはよう"`` are the same prompt."""
+    return " ".join(_PUNCT.sub(" ", normalize_text(text)).split())
+
+
+def _context_line(message: BaseMessage) -> str:
+    calls = getattr(message, "tool_calls", None) or []
+    names = ",".join(c["name"] for c in calls)
+    return f"{message.type}[{names}]: {normalize_prompt(message.text())}"
+
+
+@dataclass
+class CacheKey:
+    persona: str
+    #: digest of everything but the turn's text; similarity stays inside it
+    partition: str
+    query: str
+    vector: Any = None
+    bypass: bool = False
+
+    @property
+    def exact(self) -> str:
+        return f"{self.partition} {self.query}"
+
+
+@dataclass
+class _Entry:
+    key: CacheKey
+    reply: str | None  # None: answered with a side-effecting tool call
+    expires_at: float
+
+
+class _PersonaStats:
+    __slots__ = ("bypassed", "hits", "misses", "similar", "stored", "stored_seconds")
+
+    def __init__(self):
+        self.hits = 0
+        self.similar = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stored = 0
+        self.stored_seconds = 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.stored_seconds / self.stored if self.stored else 0.0
+
+
+class ResponseCache:
+    """LRU of replies with expiry and an optional similarity tier."""
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = 900.0,
+        *,
+        context: int = 2,
+        embedder: Embedder | None = None,
+        min_score: float = 0.9,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.context = context
+        self.embedder = embedder
+        self.min_score = min_score
+        self._clock = clock
+        self._np = require_numpy() if embedder is not None else None
+        self._lru: OrderedDict[str, _Entry] = OrderedDict()
+        # partition -> exact keys in it (insertion-ordered set)
+        self._partitions: dict[str, dict[str, None]] = {}
+        self._stats: dict[str, _PersonaStats] = {}
+
+    def _stat(self, persona: str) -> _PersonaStats:
+        stat = self._stats.get(persona)
+        if stat is None:
+            stat = self._stats[persona] = _PersonaStats()
+        return stat
+
+    def key(
+        self,
+        persona_id: str,
+        prefix: Sequence[BaseMessage],
+        history: Sequence[BaseMessage],
+        tools: Sequence[str] = (),
+        models: Sequence[str] | None = None,
+    ) -> CacheKey | None:
+        """Key of a model call on ``prefix + history``; ``None`` unless it is
+        the first call of a turn (the newest message is the human's)."""
+        if not history or not isinstance(history[-1], HumanMessage):
+            return None
+        speakers, text = turn_query(history[-1])
+        query = normalize_prompt(text)
+        if not query:  # emoji / stickers only: nothing to compare
+            return None
+        context = history[-1 - self.context : -1] if self.context else []
+        parts = {
+            "persona": persona_id,
+            "prefix": [str(m.content) for m in prefix],
+            "models": list(models or ()),
+            "tools": list(tools),
+            "speakers": sorted(speakers),
+            "context": [_context_line(m) for m in context],
+        }
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True).encode()
+        return CacheKey(persona_id, hashlib.sha256(raw).hexdigest()[:32], query)
+
+    # -- lookup / store -----------------------------------------------------
+    async def get(self, key: CacheKey) -> str | None:
+        """The cached reply for ``key``, or ``None`` (miss or bypass)."""
+        now = self._clock()
+        entry = self._fresh(key.exact, now)
+        outcome = "exact"
+        if entry is None and self.embedder is not None:
+            key.vector = (await self.embedder.aembed([key.query]))[0]
+            entry = self._similar(key, now)
+            outcome = "similar"
+        stat = self._stat(key.persona)
+        if entry is None:
+            outcome = "miss"
+            stat.misses += 1
+        elif entry.reply is None:
+            outcome = "bypass"
+            key.bypass = True
+            stat.bypassed += 1
+        else:
+            if outcome == "exact":
+                stat.hits += 1
+            else:
+                stat.similar += 1
+            SAVED.inc(stat.mean_latency, persona=key.persona)
+        LOOKUPS.inc(persona=key.persona, outcome=outcome)
+        return entry.reply if entry is not None else None
+
+    def put(
+        self,
+        key: CacheKey,
+        reply: AIMessage,
+        elapsed: float,
+        tools: Sequence[BaseTool] = (),
+    ) -> None:
+        """Store the model's answer to a missed ``key`` (``elapsed``: its
+        latency), or remember to bypass the prompt if it called a
+        side-effecting tool."""
+        if key.bypass:
+            return
+        text: str | None = None
+        if reply.tool_calls:
+            by_name = {t.name: t for t in tools}
+            if not any(
+                name not in by_name or invalidated_tags(by_name[name])
+                for name in (c["name"] for c in reply.tool_calls)
+            ):
+                return  # read-only tools: the answer depends on their results
+        else:
+            text = reply.text()
+            if not text:
+                return
+            stat = self._stat(key.persona)
+            stat.stored += 1
+            stat.stored_seconds += elapsed
+        self._drop(key.exact)
+        self._lru[key.exact] = _Entry(key, text, self._clock() + self.ttl)
+        self._partitions.setdefault(key.partition, {})[key.exact] = None
+        while len(self._lru) > self.max_entries:
+            self._drop(next(iter(self._lru)))
+
+    def _fresh(self, exact: str, now: float) -> _Entry | None:
+        entry = self._lru.get(exact)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._drop(exact)
+            return None
+        self._lru.move_to_end(exact)
+        return entry
+
+    def _similar(self, key: CacheKey, now: float) -> _Entry | None:
+        np = self._np
+        live = []
+        for exact in list(self._partitions.get(key.partition, ())):
+            entry = self._fresh(exact, now)
+            if entry is not None and entry.key.vector is not None:
+                live.append(entry)
+        if not live or np is None:
+            return None
+        scores = np.stack([e.key.vector for e in live]) @ key.vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.min_score:
+            return None
+        self._lru.move_to_end(live[best].key.exact)
+        return live[best]
+
+    def _drop(self, exact: str) -> None:
+        entry = self._lru.pop(exact, None)
+        if entry is None:
+            return
+        keys = self._partitions.get(entry.key.partition)
+        if keys is not None:
+            keys.pop(exact, None)
+            if not keys:
+                del self._partitions[entry.key.partition]
+
+    def clear(self) -> None:
+        self._lru.clear()
+        self._partitions.clear()
+
+    # -- stats --------------------------------------------------------------
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Per persona: hits, similar_hits, misses, bypassed, hit_rate,
+        saved_s (estimated)."""
+        out = {}
+        for persona, s in sorted(self._stats.items()):
+            served = s.hits + s.similar
+            lookups = served + s.misses + s.bypassed
+            out[persona] = {
+                "hits": s.hits,
+                "similar_hits": s.similar,
+                "misses": s.misses,
+                "bypassed": s.bypassed,
+                "hit_rate": round(served / lookups, 3) if lookups else 0.0,
+                "saved_s": round(served * s.mean_latency, 3),
+            }
+        return out
+
+
+def make_response_cache() -> ResponseCache | None:
+    """Build the cache selected by ``RESPONSE_CACHE=1`` (off by default).
+
+    ``RESPONSE_CACHE_SIMILARITY`` is the cosine for the similarity tier,
+    using the ``MEMORY_EMBEDDINGS`` embedder (``0`` keeps exact matches only
+    and does not need NumPy).
+    """
+    if os.getenv("RESPONSE_CACHE", "0") != "1":
+        return None
+    similarity = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.9"))
+    return ResponseCache(
+        int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+        float(os.getenv("RESPONSE_CACHE_TTL", "900")),
+        context=int(os.getenv("RESPONSE_CACHE_CONTEXT", "2")),
+        embedder=make_embedder() if similarity > 0 else None,
+        min_score=similarity,
+    )
@@ -0,0 +1,366 @@
+"""Persistent cron-style job scheduler.
+
+Jobs are stored in SQLite and kept in a heap ordered by their next run
+time; the loop sleeps until the earliest one is due instead of polling.
+Before a job fires, its next run time is advanced and committed, so each
+scheduled slot fires at most once — a restart never replays a slot that
+already fired, and of several processes sharing the file only the first
+to advance a slot fires it. A slot missed while the bot was down fires once on start
+if it is less than ``misfire_grace`` seconds late; older ones are skipped.
+Due jobs are handed to the handler concurrently, at most
+``max_concurrent`` at a time.
+
+Time comes from the injectable ``clock`` (epoch seconds) and ``sleep``, so
+tests can drive the scheduler without waiting.
+"""
+
+import asyncio
+import heapq
+import itertools
+import sqlite3
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, tzinfo
+from zoneinfo import ZoneInfo
+
+from .metrics import REGISTRY
+
+JST = ZoneInfo("Asia/Tokyo")
+
+FIRED = REGISTRY.counter("scheduler_fired_total", "Scheduled jobs fired")
+MISSED = REGISTRY.counter(
+    "scheduler_missed_total", "Slots skipped because they were too late"
+)
+FIRE_LAG = REGISTRY.histogram(
+    "scheduler_fire_lag_seconds", "Delay between a slot and its job starting"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    channel_id INTEGER NOT NULL,
+    cron TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'prompt',
+    next_run REAL NOT NULL,
+    guild_id INTEGER NOT NULL DEFAULT 0
+);
+"""
+_COLUMNS = "id, channel_id, cron, prompt, kind, next_run, guild_id"
+
+
+class CronError(ValueError):
+    """cron 式が不正なときの例外。"""
+
+
+_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12))
+
+
+def _parse_field(text: str, lo: int, hi: int) -> frozenset[int]:
+    values: set[int] = set()
+    for part in text.split(","):
+        body, _, step_txt = part.partition("/")
+        step = int(step_txt) if step_txt else 1
+        if body == "*":
+            start, end = lo, hi
+        elif "-" in body:
+            a, b = body.split("-", 1)
+            start, end = int(a), int(b)
+        else:
+            start = int(body)
+            end = hi if step_txt else start
+        if not (lo <= start <= end <= hi) or step < 1:
+            raise CronError(f"out of range: {part!r} (allowed {lo}-{hi})")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronSpec:
+    """Five-field cron expression: ``minute hour day month weekday``.
+
+    Supports ``*``, lists, ranges and steps. Weekday is 0-6 with 0 = Sunday
+    (7 is accepted as Sunday too). As in cron, when both day and weekday are
+    restricted a slot matches if either does; a field starting with ``*``
+    (``*/2`` too) counts as unrestricted, so ``0 0 */2 * 1`` means "every
+    other day, if it is a Monday".
+    """
+
+    text: str
+    minutes: frozenset[int]
+    hours: frozenset[int]
+    days: frozenset[int]
+    months: frozenset[int]
+    weekdays: frozenset[int]
+    any_day: bool
+    any_weekday: bool
+
+    @classmethod
+    def parse(cls, text: str) -> "CronSpec":
+        parts = text.split()
+        if len(parts) != 5:
+            raise CronError(f"expected 5 fields, got {len(parts)}: {text!r}")
+        try:
+            minutes, hours, days, months = (
+                _parse_field(p, lo, hi) for p, (_, lo, hi) in zip(parts, _FIELDS)
+            )
+            weekdays = {d % 7 for d in _parse_field(parts[4], 0, 7)}
+        except ValueError as e:
+            raise CronError(f"{text!r}: {e}") from None
+        return cls(
+            " ".join(parts),
+            minutes,
+            hours,
+            days,
+            months,
+            frozenset(weekdays),
+            any_day=parts[2].startswith("*"),
+            any_weekday=parts[4].startswith("*"),
+        )
+
+    def _day_matches(self, dt: datetime) -> bool:
+        dom = dt.day in self.days
+        dow = (dt.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return dom and dow
+        return dom or dow
+
+    def next_after(self, when: datetime) -> datetime:
+        """First matching minute strictly after ``when`` (same tz)."""
+        dt = when.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(5000):  # ~ enough to cross years of sparse matches
+            if dt.month not in self.months:
+                year, month = divmod(dt.month, 12)
+                dt = dt.replace(year=dt.year + year, month=month + 1, day=1)
+                dt = dt.replace(hour=0, minute=0)
+            elif not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+            elif dt.hour not in self.hours:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise CronError(f"{self.text!r} never matches")
+
+
+@dataclass(frozen=True)
+class Job:
+    id: str
+    channel_id: int
+    cron: str
+    prompt: str
+    kind: str = "prompt"
+    next_run: float = 0.0
+    guild_id: int = 0  # 0: a DM, or a job saved before guild ids were kept
+
+
+class Scheduler:
+    """Fires :class:`Job` objects through ``handler`` at their cron slots.
+
+    With ``owns`` (guild id → bool), only the jobs of guilds it accepts are
+    loaded, so a sharded process fires just its own guilds' jobs. Jobs with
+    guild id 0 are loaded by every process; the claim decides who fires.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Job], Awaitable[None]],
+        path: str = ":memory:",
+        *,
+        tz: tzinfo = JST,
+        max_concurrent: int = 4,
+        misfire_grace: float = 300.0,
+        owns: Callable[[int], bool] | None = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.handler = handler
+        self.tz = tz
+        self.misfire_grace = misfire_grace
+        self._clock = clock
+        self._sleep = sleep
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._db = sqlite3.connect(path)
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "guild_id" not in columns:  # schedule.sqlite from an older version
+            self._db.execute(
+                "ALTER TABLE jobs ADD COLUMN guild_id INTEGER NOT NULL DEFAULT 0"
+            )
+            self._db.commit()
+        self._jobs: dict[str, Job] = {}
+        self._by_channel: dict[int, dict[str, Job]] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+        for row in self._db.execute(f"SELECT {_COLUMNS} FROM jobs"):
+            job = Job(*row)
+            if owns is not None and job.guild_id and not owns(job.guild_id):
+                continue  # another shard's job
+            self._set(job)
+            self._push(job)
+
+    # -- jobs ---------------------------------------------------------------
+    def _next_run(self, cron: str, after: float) -> float:
+        now = datetime.fromtimestamp(after, self.tz)
+        return CronSpec.parse(cron).next_after(now).timestamp()
+
+    def _set(self, job: Job) -> None:
+        self._jobs[job.id] = job
+        self._by_channel.setdefault(job.channel_id, {})[job.id] = job
+
+    def _drop(self, job_id: str) -> Job | None:
+        job = self._jobs.pop(job_id, None)
+        if job is not None:
+            channel = self._by_channel[job.channel_id]
+            del channel[job_id]
+            if not channel:
+                del self._by_channel[job.channel_id]
+        return job
+
+    def _push(self, job: Job) -> None:
+        heapq.heappush(self._heap, (job.next_run, next(self._seq), job.id))
+        self._wake.set()
+
+    def add(
+        self,
+        channel_id: int,
+        cron: str,
+        prompt: str,
+        kind: str = "prompt",
+        guild_id: int = 0,
+    ) -> Job:
+        """Register a job; raises :class:`CronError` for a bad expression."""
+        job = Job(
+            id=uuid.uuid4().hex[:8],
+            channel_id=channel_id,
+            cron=CronSpec.parse(cron).text,
+            prompt=prompt,
+            kind=kind,
+            next_run=self._next_run(cron, self._clock()),
+            guild_id=guild_id,
+        )
+        self._set(job)
+        self._db.execute(
+            f"INSERT INTO jobs ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                job.id,
+                job.channel_id,
+                job.cron,
+                job.prompt,
+                job.kind,
+                job.next_run,
+                job.guild_id,
+            ),
+        )
+        self._db.commit()
+        self._push(job)
+        return job
+
+    def remove(self, job_id: str) -> bool:
+        # the heap entry goes stale and is skipped when it comes up
+        if self._drop(job_id) is None:
+            return False
+        self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        self._db.commit()
+        return True
+
+    def jobs(self, channel_id: int | None = None) -> list[Job]:
+        if channel_id is None:
+            found = self._jobs.values()
+        else:
+            found = self._by_channel.get(channel_id, {}).values()
+        return sorted(found, key=lambda j: j.next_run)
+
+    def has_job(self, channel_id: int, kind: str) -> bool:
+        """Whether the channel has a job of ``kind`` (cheap; every message)."""
+        jobs = self._by_channel.get(channel_id, {})
+        return any(j.kind == kind for j in jobs.values())
+
+    # -- loop ---------------------------------------------------------------
+    def _claim(self, job: Job, now: float) -> Job | None:
+        """Advance ``job`` past ``now`` and commit before it fires.
+
+        Only updates the stored row, and only if it still holds this slot:
+        None means the job was removed (``!schedule rm``) or the slot was
+        claimed by another process, and it must not fire.
+        """
+        claimed = replace(job, next_run=self._next_run(job.cron, now))
+        cur = self._db.execute(
+            "UPDATE jobs SET next_run = ? WHERE id = ? AND next_run = ?",
+            (claimed.next_run, job.id, job.next_run),
+        )
+        self._db.commit()
+        if cur.rowcount == 0:
+            row = self._db.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job.id,)
+            ).fetchone()
+            if row is None:
+                self._drop(job.id)
+            else:  # follow the other process's schedule
+                self._set(Job(*row))
+                self._push(self._jobs[job.id])
+            return None
+        self._set(claimed)
+        self._push(claimed)
+        return claimed
+
+    async def run_due(self) -> int:
+        """Fire every job whose slot has come; returns how many fired."""
+        now = self._clock()
+        fired = 0
+        while self._heap and self._heap[0][0] <= now:
+            slot, _, job_id = heapq.heappop(self._heap)
+            job = self._jobs.get(job_id)
+            if job is None or job.next_run != slot:
+                continue  # removed or rescheduled
+            if self._claim(job, now) is None:
+                continue
+            if now - slot > self.misfire_grace:
+                MISSED.inc()
+                continue
+            FIRE_LAG.observe(now - slot)
+            task = asyncio.create_task(self._fire(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            fired += 1
+        return fired
+
+    async def _fire(self, job: Job) -> None:
+        async with self._slots:
+            FIRED.inc(kind=job.kind)
+            try:
+                await self.handler(job)
+            except Exception as e:  # noqa: BLE001 — one job must not stop the rest
+                print(f"⚠️ scheduled job {job.id} failed: {e!r}")
+
+    async def _loop(self) -> None:
+        while True:
+            await self.run_due()
+            self._wake.clear()
+            delay = self._heap[0][0] - self._clock() if self._heap else 3600.0
+            sleeper = asyncio.ensure_future(self._sleep(max(0.0, min(delay, 3600.0))))
+            waker = asyncio.ensure_future(self._wake.wait())
+            await asyncio.wait({sleeper, waker}, return_when=asyncio.FIRST_COMPLETED)
+            for f in (sleeper, waker):
+                f.cancel()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def drain(self) -> None:
+        """Wait for jobs that are currently firing."""
+        await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self.drain()
+        self._db.close()
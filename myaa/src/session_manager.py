@@ -1,21 +1,41 @@
-"""Resolve <session_key> → <thread_id> and keep mapping in‑memory."""
+"""Resolve <session_key> → <thread_id> through a :class:`SessionStore`."""
 
-from typing import Dict
+import uuid
+
+from .session_store import MemoryStore, SessionStore, ShardFilter, shard_of
 
 
 class SessionManager:
-    """Simple in‑memory resolver (swap with Redis if needed)."""
+    """Maps session keys to thread ids (in memory unless a store is given).
+
+    Thread ids are random UUIDs, so they never collide across restarts or
+    between bot processes sharing a store.
+    """
 
-    def __init__(self):
-        self._map: Dict[str, str] = {}
-        self._counter = 0
+    def __init__(self, store: SessionStore | None = None):
+        self.store = store or MemoryStore()
 
     def resolve(self, session_key: str) -> str:
         """Return existing thread_id or allocate a new one."""
-        if session_key not in self._map:
-            self._counter += 1
-            self._map[session_key] = str(self._counter)
-        return self._map[session_key]
+        thread_id = self.store.get("thread", session_key)
+        if thread_id is None:
+            thread_id = self.store.setdefault(
+                "thread", session_key, uuid.uuid4().hex, shard=shard_of(session_key)
+            )
+        return thread_id
+
+    async def aresolve(self, session_key: str) -> str:
+        """:meth:`resolve` that allocates new threads off the event loop."""
+        thread_id = self.store.get("thread", session_key)
+        if thread_id is None:
+            thread_id = await self.store.asetdefault(
+                "thread", session_key, uuid.uuid4().hex, shard=shard_of(session_key)
+            )
+        return thread_id
+
+    def list_thread_ids(self, shards: ShardFilter | None = None) -> list[str]:
+        return list(self.store.items("thread", shards).values())
 
-    def list_thread_ids(self) -> list[str]:
-        return list(self._map.values())
+    def sessions(self, shards: ShardFilter | None = None) -> dict[str, str]:
+        """``session_key -> thread_id`` for every known session."""
+        return self.store.items("thread", shards)
@@ -0,0 +1,187 @@
+"""Key/value storage for session and channel state.
+
+State is grouped in namespaces (``thread``, ``persona``, ``debug``,
+``joined`` …). Every row also carries a shard key — the Discord guild id —
+so that bot shards, which split guilds between them, can share one store
+and each only look at its own rows.
+
+``SESSION_BACKEND=sqlite`` (default) keeps the state in ``SESSION_PATH``
+across restarts; ``memory`` is for tests and benchmarks. Code running on
+the event loop writes through the ``a*`` methods, which keep SQLite's
+commits off the loop.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    shard INTEGER NOT NULL DEFAULT 0,
+    value TEXT NOT NULL,
+    PRIMARY KEY (ns, key)
+);
+CREATE INDEX IF NOT EXISTS kv_shard ON kv (ns, shard);
+"""
+
+ShardFilter = Callable[[int], bool]
+
+
+def shard_of(session_key: str) -> int:
+    """Shard key of ``"<guild_id>:<channel_id>"`` (0 for anything else)."""
+    head = session_key.split(":", 1)[0]
+    return int(head) if head.isdigit() else 0
+
+
+class SessionStore(ABC):
+    @abstractmethod
+    def get(self, ns: str, key: str) -> str | None: ...
+
+    @abstractmethod
+    def put(self, ns: str, key: str, value: str, shard: int = 0) -> None: ...
+
+    @abstractmethod
+    def delete(self, ns: str, key: str) -> None: ...
+
+    @abstractmethod
+    def setdefault(self, ns: str, key: str, value: str, shard: int = 0) -> str:
+        """Store ``value`` unless ``key`` exists; return the stored value."""
+
+    @abstractmethod
+    def items(self, ns: str, shards: ShardFilter | None = None) -> dict[str, str]:
+        """All rows of ``ns`` whose shard passes ``shards`` (all if None)."""
+
+    async def aput(self, ns: str, key: str, value: str, shard: int = 0) -> None:
+        self.put(ns, key, value, shard)
+
+    async def adelete(self, ns: str, key: str) -> None:
+        self.delete(ns, key)
+
+    async def asetdefault(self, ns: str, key: str, value: str, shard: int = 0) -> str:
+        return self.setdefault(ns, key, value, shard)
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryStore(SessionStore):
+    def __init__(self):
+        self._rows: dict[tuple[str, str], tuple[int, str]] = {}
+
+    def get(self, ns: str, key: str) -> str | None:
+        row = self._rows.get((ns, key))
+        return row[1] if row else None
+
+    def put(self, ns: str, key: str, value: str, shard: int = 0) -> None:
+        self._rows[(ns, key)] = (shard, value)
+
+    def delete(self, ns: str, key: str) -> None:
+        self._rows.pop((ns, key), None)
+
+    def setdefault(self, ns: str, key: str, value: str, shard: int = 0) -> str:
+        return self._rows.setdefault((ns, key), (shard, value))[1]
+
+    def items(self, ns: str, shards: ShardFilter | None = None) -> dict[str, str]:
+        return {
+            k: v
+            for (n, k), (shard, v) in self._rows.items()
+            if n == ns and (shards is None or shards(shard))
+        }
+
+
+_MISSING = object()
+
+
+class SqliteStore(SessionStore):
+    """Durable store in one SQLite file (WAL), shared by all shards on a host.
+
+    Reads are served from a per-process cache that is filled on first read
+    and updated on every write. A key is only ever written by the shard that
+    owns its guild, so the cache stays correct without cross-process
+    invalidation.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._cache: dict[tuple[str, str], str | object] = {}
+
+    def get(self, ns: str, key: str) -> str | None:
+        cached = self._cache.get((ns, key), _MISSING)
+        if cached is _MISSING:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT value FROM kv WHERE ns = ? AND key = ?", (ns, key)
+                ).fetchone()
+            cached = self._cache[(ns, key)] = row[0] if row else None
+        return cached if isinstance(cached, str) else None
+
+    def put(self, ns: str, key: str, value: str, shard: int = 0) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO kv VALUES (?, ?, ?, ?)", (ns, key, shard, value)
+            )
+            self._db.commit()
+        self._cache[(ns, key)] = value
+
+    def delete(self, ns: str, key: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM kv WHERE ns = ? AND key = ?", (ns, key))
+            self._db.commit()
+        self._cache[(ns, key)] = None
+
+    def setdefault(self, ns: str, key: str, value: str, shard: int = 0) -> str:
+        if (current := self.get(ns, key)) is not None:
+            return current
+        with self._lock:
+            # INSERT OR IGNORE keeps whichever process got there first
+            self._db.execute(
+                "INSERT OR IGNORE INTO kv VALUES (?, ?, ?, ?)", (ns, key, shard, value)
+            )
+            self._db.commit()
+            stored = self._db.execute(
+                "SELECT value FROM kv WHERE ns = ? AND key = ?", (ns, key)
+            ).fetchone()[0]
+        self._cache[(ns, key)] = stored
+        return stored
+
+    def items(self, ns: str, shards: ShardFilter | None = None) -> dict[str, str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, shard, value FROM kv WHERE ns = ?", (ns,)
+            ).fetchall()
+        return {k: v for k, shard, v in rows if shards is None or shards(shard)}
+
+    async def aput(self, ns: str, key: str, value: str, shard: int = 0) -> None:
+        await asyncio.to_thread(self.put, ns, key, value, shard)
+
+    async def adelete(self, ns: str, key: str) -> None:
+        await asyncio.to_thread(self.delete, ns, key)
+
+    async def asetdefault(self, ns: str, key: str, value: str, shard: int = 0) -> str:
+        if (current := self.get(ns, key)) is not None:
+            return current
+        return await asyncio.to_thread(self.setdefault, ns, key, value, shard)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def make_session_store(root_dir: str) -> SessionStore:
+    """Build the store selected by ``SESSION_BACKEND``."""
+    backend = os.getenv("SESSION_BACKEND", "sqlite")
+    if backend == "memory":
+        return MemoryStore()
+    if backend == "sqlite":
+        path = os.getenv("SESSION_PATH") or os.path.join(root_dir, "sessions.sqlite")
+        return SqliteStore(path)
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend!r}")
@@ -0,0 +1,183 @@
+"""Always-on per-turn performance telemetry.
+
+A turn (one reply to a channel) is opened with :func:`turn`; code that runs
+inside it — the ``chatbot`` node, the tools node, the Discord send path —
+records spans with :func:`span` / :func:`record`. Every span feeds the
+``span_duration_seconds`` histogram (label ``span``); the turn also keeps
+its spans, token usage, LLM iterations and checkpoint size, and when a
+trace sink is set (``TRACE_FILE``) writes them as one JSONL record::
+
+    {"event": "turn_trace", "session": "1:2", "thread_id": "…",
+     "duration_ms": 812.4, "llm_calls": 2, "tokens": {…},
+     "spans": [{"name": "turn.wait", "at_ms": 0.0, "duration_ms": 0.1}, …]}
+
+The current turn lives in a ``ContextVar``, so tasks that LangGraph starts
+for its nodes see it too. Outside a turn, spans only update histograms.
+``METRICS_PORT`` serves the registry in the Prometheus text format on
+``/metrics`` (see :func:`serve_metrics`).
+"""
+
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from .metrics import REGISTRY
+from .tracing import JsonlSink, TraceSink, usage
+
+if TYPE_CHECKING:
+    from aiohttp import web
+    from langchain_core.messages import AIMessage
+
+SPAN_SECONDS = REGISTRY.histogram(
+    "span_duration_seconds", "Duration of instrumented spans (label: span)"
+)
+TURN_SECONDS = REGISTRY.histogram("turn_duration_seconds", "Wall time of whole turns")
+TURN_LLM_CALLS = REGISTRY.histogram(
+    "turn_llm_calls",
+    "chatbot steps per turn (tool-loop iterations + 1)",
+    buckets=(1, 2, 3, 4, 6, 8, 12),
+)
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "LLM tokens (label: kind)")
+CHECKPOINT_BYTES = REGISTRY.histogram(
+    "checkpoint_size_bytes",
+    "Serialized size of saved checkpoints",
+    buckets=(1e3, 4e3, 16e3, 64e3, 256e3, 1e6, 4e6),
+)
+
+
+@dataclass
+class Turn:
+    session: str
+    started: float = field(default_factory=time.perf_counter)
+    thread_id: str | None = None
+    llm_calls: int = 0
+    tokens: dict[str, int] = field(
+        default_factory=lambda: {"input": 0, "output": 0, "cached": 0}
+    )
+    checkpoint_bytes: int = 0
+    spans: list[dict[str, Any]] = field(default_factory=list)
+
+    def add(self, name: str, seconds: float, **attrs: Any) -> None:
+        """Attach a finished span to this turn (no histogram update)."""
+        end = time.perf_counter()
+        self.spans.append(
+            {
+                "name": name,
+                "at_ms": round((end - seconds - self.started) * 1000, 1),
+                "duration_ms": round(seconds * 1000, 1),
+                **attrs,
+            }
+        )
+
+
+_current: ContextVar[Turn | None] = ContextVar("myaa_turn", default=None)
+_sink: TraceSink | None = None
+
+
+def set_sink(sink: TraceSink | None) -> None:
+    """Where finished turns are written (``None``: metrics only).
+
+    The previous sink is closed if it has a ``close`` method.
+    """
+    global _sink
+    old, _sink = _sink, sink
+    if old is not None and hasattr(old, "close"):
+        old.close()
+
+
+def configure_from_env() -> None:
+    """``TRACE_FILE=path`` appends one JSONL record per turn to ``path``."""
+    if path := os.getenv("TRACE_FILE"):
+        set_sink(JsonlSink(path))
+
+
+def current() -> Turn | None:
+    return _current.get()
+
+
+@contextmanager
+def turn(session: str) -> Iterator[Turn]:
+    """Open a turn; nested calls reuse the turn that is already open."""
+    if (existing := _current.get()) is not None:
+        yield existing
+        return
+    t = Turn(session)
+    token = _current.set(t)
+    try:
+        yield t
+    finally:
+        _current.reset(token)
+        duration = time.perf_counter() - t.started
+        TURN_SECONDS.observe(duration)
+        if t.llm_calls:
+            TURN_LLM_CALLS.observe(t.llm_calls)
+        if _sink is not None:
+            _sink.emit(
+                {
+                    "event": "turn_trace",
+                    "session": t.session,
+                    "thread_id": t.thread_id,
+                    "duration_ms": round(duration * 1000, 1),
+                    "llm_calls": t.llm_calls,
+                    "tokens": t.tokens,
+                    "checkpoint_bytes": t.checkpoint_bytes,
+                    "spans": t.spans,
+                }
+            )
+
+
+def record(name: str, seconds: float, **attrs: Any) -> None:
+    """Record a span that has already been timed."""
+    SPAN_SECONDS.observe(seconds, span=name)
+    if (t := _current.get()) is not None:
+        t.add(name, seconds, **attrs)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+    """Time the block; the yielded dict can take attributes for the trace."""
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        record(name, time.perf_counter() - start, **attrs)
+
+
+def llm_response(msg: "AIMessage") -> dict[str, int]:
+    """Count one LLM step and its token usage; returns the usage."""
+    tokens = usage(msg)
+    for kind, n in tokens.items():
+        if n:
+            LLM_TOKENS.inc(n, kind=kind)
+    if (t := _current.get()) is not None:
+        t.llm_calls += 1
+        for kind, n in tokens.items():
+            t.tokens[kind] += n
+    return tokens
+
+
+def checkpoint_saved(size: int) -> None:
+    CHECKPOINT_BYTES.observe(size)
+    if (t := _current.get()) is not None:
+        t.checkpoint_bytes = size
+
+
+async def serve_metrics(port: int, host: str = "127.0.0.1") -> "web.AppRunner":
+    """Serve ``REGISTRY`` on ``http://host:port/metrics``."""
+    from aiohttp import web
+
+    async def metrics(_request: web.Request) -> web.Response:
+        return web.Response(
+            text=REGISTRY.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,313 @@
+"""Result cache for read-only tools, declared on the tools themselves.
+
+::
+
+    @cacheable(ttl=30, tags=("ac",))
+    @tool
+    async def get_ac_status() -> str: ...
+
+    @invalidates("ac")
+    @tool
+    async def set_ac(...) -> str: ...
+
+Results live in a size-bounded LRU keyed by tool name plus normalized
+arguments. Tools declared with ``persist=True`` (web search) are also kept
+in a small SQLite file so they survive restarts. A successful call to a
+tool declared with ``invalidates`` drops every entry carrying one of its
+tags.
+
+Tools that read a local snapshot (the Remo status tools) can declare
+``age`` (how old the data a fresh call reads is) and ``note`` (text for an
+age). Only the raw result is cached; the note is added each time a result
+is served, for the data's age at that moment.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from langchain_core.tools import BaseTool
+
+from .metrics import REGISTRY
+
+ToolT = TypeVar("ToolT", bound=BaseTool)
+
+HITS = REGISTRY.counter("tool_cache_hits_total", "Tool results served from cache")
+MISSES = REGISTRY.counter("tool_cache_misses_total", "Cacheable tool calls executed")
+SAVED = REGISTRY.counter(
+    "tool_cache_saved_seconds_total",
+    "Estimated tool latency avoided by cache hits (mean miss latency per hit)",
+)
+INVALIDATED = REGISTRY.counter(
+    "tool_cache_invalidated_total", "Entries dropped by side-effecting tools"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tool_cache (
+    key TEXT PRIMARY KEY,
+    tool TEXT NOT NULL,
+    content TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    ttl: float
+    tags: tuple[str, ...] = ()
+    persist: bool = False
+    age: Callable[[], float | None] | None = None
+    note: Callable[[float], str] | None = None
+
+
+def cacheable(
+    ttl: float,
+    *,
+    tags: tuple[str, ...] = (),
+    persist: bool = False,
+    age: Callable[[], float | None] | None = None,
+    note: Callable[[float], str] | None = None,
+) -> Callable[[ToolT], ToolT]:
+    """Declare a tool's results reusable for ``ttl`` seconds."""
+
+    def mark(tool: ToolT) -> ToolT:
+        tool.metadata = {
+            **(tool.metadata or {}),
+            "cache": CachePolicy(ttl, tuple(tags), persist, age, note),
+        }
+        return tool
+
+    return mark
+
+
+def invalidates(*tags: str) -> Callable[[ToolT], ToolT]:
+    """Declare that a successful call makes entries tagged ``tags`` stale."""
+
+    def mark(tool: ToolT) -> ToolT:
+        tool.metadata = {**(tool.metadata or {}), "invalidates": tuple(tags)}
+        return tool
+
+    return mark
+
+
+def cache_policy(tool: BaseTool) -> CachePolicy | None:
+    return (tool.metadata or {}).get("cache")
+
+
+def invalidated_tags(tool: BaseTool) -> tuple[str, ...]:
+    return (tool.metadata or {}).get("invalidates", ())
+
+
+def data_age(tool: BaseTool) -> float | None:
+    """Seconds since the data a fresh call of ``tool`` reads was fetched."""
+    policy = cache_policy(tool)
+    return policy.age() if policy and policy.age else None
+
+
+def annotate(tool: BaseTool, content: str, age: float | None) -> str:
+    """``content`` plus the tool's note for data ``age`` seconds old."""
+    policy = cache_policy(tool)
+    if policy is None or policy.note is None or age is None:
+        return content
+    return content + policy.note(age)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, Mapping):
+        return {k: _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def cache_key(tool_name: str, args: Mapping[str, Any]) -> str:
+    """``"search {"query": "tokyo weather"}"`` — whitespace/case-insensitive."""
+    normalized = json.dumps(_normalize(args), sort_keys=True, ensure_ascii=False)
+    return f"{tool_name} {normalized}"
+
+
+_Entry = tuple[str, str, float, tuple[str, ...], float | None]
+
+
+class _ToolStats:
+    __slots__ = ("hits", "miss_seconds", "misses")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.miss_seconds / self.misses if self.misses else 0.0
+
+
+class ToolCache:
+    """LRU of tool results with per-entry expiry and tag invalidation."""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        path: str | None = None,
+        *,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.path = path
+        self._clock = clock
+        # key -> (tool, content, expires_at, tags, fetched_at)
+        self._lru: OrderedDict[str, _Entry] = OrderedDict()
+        self._stats: dict[str, _ToolStats] = {}
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.executescript(_SCHEMA)
+            self._db.execute(
+                "DELETE FROM tool_cache WHERE expires_at < ?", (self._clock(),)
+            )
+            self._db.commit()
+
+    def _stat(self, tool: str) -> _ToolStats:
+        stat = self._stats.get(tool)
+        if stat is None:
+            stat = self._stats[tool] = _ToolStats()
+        return stat
+
+    # -- lookup / store -----------------------------------------------------
+    async def get(self, tool: BaseTool, args: Mapping[str, Any]) -> str | None:
+        """The cached result as served: with the tool's note, if it has one."""
+        policy = cache_policy(tool)
+        if policy is None:
+            return None
+        key = cache_key(tool.name, args)
+        entry = self._get_memory(key)
+        if entry is None and policy.persist and self._db is not None:
+            entry = await asyncio.to_thread(self._get_disk, key, policy)
+        stat = self._stat(tool.name)
+        if entry is None:
+            stat.misses += 1
+            MISSES.inc(tool=tool.name)
+            return None
+        stat.hits += 1
+        HITS.inc(tool=tool.name)
+        SAVED.inc(stat.mean_latency, tool=tool.name)
+        fetched_at = entry[4]
+        age = None if fetched_at is None else self._clock() - fetched_at
+        return annotate(tool, entry[1], age)
+
+    async def put(
+        self,
+        tool: BaseTool,
+        args: Mapping[str, Any],
+        content: str,
+        elapsed: float,
+        age: float | None = None,
+    ) -> None:
+        """Store the raw ``content``; ``age`` is how old its data already is."""
+        policy = cache_policy(tool)
+        if policy is None:
+            return
+        self._stat(tool.name).miss_seconds += elapsed
+        key = cache_key(tool.name, args)
+        now = self._clock()
+        expires_at = now + policy.ttl
+        fetched_at = None if age is None else now - age
+        self._put_memory(key, (tool.name, content, expires_at, policy.tags, fetched_at))
+        if policy.persist and self._db is not None:
+            await asyncio.to_thread(self._put_disk, key, tool.name, content, expires_at)
+
+    def _get_memory(self, key: str) -> _Entry | None:
+        entry = self._lru.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= self._clock():
+            del self._lru[key]
+            return None
+        self._lru.move_to_end(key)
+        return entry
+
+    def _put_memory(self, key: str, entry: _Entry):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _get_disk(self, key: str, policy: CachePolicy) -> _Entry | None:
+        assert self._db is not None
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT tool, content, expires_at FROM tool_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None or row[2] <= self._clock():
+            return None
+        entry = (row[0], row[1], row[2], policy.tags, None)
+        self._put_memory(key, entry)
+        return entry
+
+    def _put_disk(self, key: str, tool: str, content: str, expires_at: float) -> None:
+        assert self._db is not None
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tool_cache VALUES (?, ?, ?, ?)",
+                (key, tool, content, expires_at),
+            )
+            self._db.commit()
+
+    # -- invalidation -------------------------------------------------------
+    def invalidate(self, tags: tuple[str, ...]) -> int:
+        """Drop in-memory entries carrying any of ``tags``.
+
+        Persisted entries are never tagged (search results don't depend on
+        the room), so only the memory tier is touched.
+        """
+        if not tags:
+            return 0
+        stale = [k for k, e in self._lru.items() if set(e[3]) & set(tags)]
+        for k in stale:
+            del self._lru[k]
+        if stale:
+            INVALIDATED.inc(len(stale), tags=",".join(tags))
+        return len(stale)
+
+    def clear(self) -> None:
+        self._lru.clear()
+
+    # -- stats --------------------------------------------------------------
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Per tool: hits, misses, hit_rate, saved_s (estimated)."""
+        out = {}
+        for name, s in sorted(self._stats.items()):
+            total = s.hits + s.misses
+            out[name] = {
+                "hits": s.hits,
+                "misses": s.misses,
+                "hit_rate": round(s.hits / total, 3) if total else 0.0,
+                "saved_s": round(s.hits * s.mean_latency, 3),
+            }
+        return out
+
+    def close(self) -> None:
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+
+def make_tool_cache(root_dir: str) -> ToolCache | None:
+    """Build the cache selected by ``TOOL_CACHE`` (``0`` disables it)."""
+    if os.getenv("TOOL_CACHE", "1") == "0":
+        return None
+    path = os.getenv("TOOL_CACHE_PATH") or os.path.join(root_dir, "tool_cache.sqlite")
+    return ToolCache(int(os.getenv("TOOL_CACHE_SIZE", "512")), path)
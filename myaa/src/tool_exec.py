@@ -0,0 +1,281 @@
+"""Tools node that runs a step's tool calls concurrently under deadlines.
+
+With a :class:`~.turn_budget.TurnBudget` it also enforces the turn's tool
+call budget and answers repeated read-only calls from earlier results.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any
+
+from langchain_core.messages import AIMessage, ToolCall, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from langgraph.errors import GraphBubbleUp
+
+from . import telemetry
+from .metrics import REGISTRY
+from .tool_cache import (
+    ToolCache,
+    annotate,
+    cache_policy,
+    data_age,
+    invalidated_tags,
+)
+from .tool_select import select_tools
+from .turn_budget import (
+    DUPLICATES,
+    EXHAUSTED,
+    TurnBudget,
+    call_key,
+    earlier_results,
+    tool_calls_made,
+    turn_messages,
+)
+
+TOOL_LATENCY = REGISTRY.histogram(
+    "tool_latency_seconds", "Wall time of one tool call (labels: tool, outcome)"
+)
+
+
+def _parse_timeouts(raw: str) -> dict[str, float]:
+    """``"tavily_search=15,set_ac=5"`` → ``{"tavily_search": 15.0, "set_ac": 5.0}``"""
+    out: dict[str, float] = {}
+    for item in raw.split(","):
+        if item.strip():
+            name, _, value = item.partition("=")
+            out[name.strip()] = float(value)
+    return out
+
+
+@dataclass(frozen=True)
+class ToolLimits:
+    """Deadlines for the tools node.
+
+    ``timeout`` applies to each call unless ``per_tool`` names the tool;
+    ``step_timeout`` bounds the whole step, and calls still running then
+    are reported as timed out. At most ``max_parallel`` calls run at once.
+    """
+
+    timeout: float = 10.0
+    step_timeout: float = 20.0
+    max_parallel: int = 4
+    per_tool: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({}))
+
+    @classmethod
+    def from_env(cls) -> "ToolLimits":
+        base = cls()
+        return cls(
+            timeout=float(os.getenv("TOOL_TIMEOUT") or base.timeout),
+            step_timeout=float(os.getenv("TOOL_STEP_TIMEOUT") or base.step_timeout),
+            max_parallel=int(os.getenv("TOOL_MAX_PARALLEL") or base.max_parallel),
+            per_tool=MappingProxyType(_parse_timeouts(os.getenv("TOOL_TIMEOUTS", ""))),
+        )
+
+    def timeout_for(self, name: str) -> float:
+        return self.per_tool.get(name, self.timeout)
+
+
+def _error(call: ToolCall, kind: str, detail: str, **extra: Any) -> ToolMessage:
+    body = {"error": kind, "tool": call["name"], "detail": detail, **extra}
+    return ToolMessage(
+        content=json.dumps(body, ensure_ascii=False),
+        name=call["name"],
+        tool_call_id=call["id"],
+        status="error",
+    )
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _trace(name: str, elapsed: float, outcome: str) -> None:
+    # already in tool_latency_seconds; only attach to the turn's trace
+    if (turn := telemetry.current()) is not None:
+        turn.add("tool", elapsed, tool=name, outcome=outcome)
+
+
+class ParallelToolNode:
+    """Drop-in for ``ToolNode``: same input/output, concurrent execution.
+
+    Every tool call of the last AI message is started at once (bounded by
+    ``max_parallel``). A call that exceeds its deadline, or is still running
+    when the step deadline hits, is cancelled and answered with a JSON
+    ``{"error": "timeout", ...}`` tool message, so the model gets the results
+    that did arrive instead of the turn stalling. Synchronous tools run in
+    the default executor; their thread cannot be interrupted and finishes in
+    the background, but its result is discarded.
+
+    Only the tools the chatbot bound for this turn may run: the names in
+    ``config["configurable"]["tools"]`` (None: every configured tool). A
+    call to any other tool is answered with ``{"error": "unknown_tool"}``.
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[BaseTool],
+        limits: ToolLimits | None = None,
+        cache: ToolCache | None = None,
+        budget: TurnBudget | None = None,
+    ):
+        self.tools = {t.name: t for t in tools}
+        self.limits = limits or ToolLimits()
+        self.cache = cache
+        self.budget = budget
+
+    async def run(
+        self, state: Mapping[str, Any], config: RunnableConfig | None = None
+    ) -> dict[str, list[ToolMessage]]:
+        messages = state["messages"]
+        last = messages[-1]
+        calls = last.tool_calls if isinstance(last, AIMessage) else []
+        configurable = (config or {}).get("configurable") or {}
+        started = configurable.get("turn_started")
+        # same selection as the chatbot node binds to the model
+        tools = {
+            t.name: t
+            for t in select_tools(list(self.tools.values()), configurable.get("tools"))
+        }
+        step_timeout = self.limits.step_timeout
+        allowed = len(calls)
+        earlier: dict[str, str] = {}
+        dedupe = self.budget is not None and self.budget.dedupe
+        if self.budget:
+            if self.budget.dedupe:
+                earlier = earlier_results(messages)
+            if self.budget.max_tool_calls:
+                made = tool_calls_made(turn_messages(messages))
+                allowed = max(0, self.budget.max_tool_calls - made)
+            if (left := self.budget.remaining_seconds(started)) is not None:
+                step_timeout = min(step_timeout, left)
+        if allowed < len(calls):
+            EXHAUSTED.inc(limit="tool_calls")
+        slots = asyncio.Semaphore(self.limits.max_parallel)
+        # per call: a ready message, or the index of the task that answers it
+        plan: list[ToolMessage | int] = []
+        tasks: list[asyncio.Task] = []
+        started_keys: dict[str, int] = {}
+        with telemetry.span("tools", calls=len(calls)) as attrs:
+            for i, call in enumerate(calls):
+                name = call["name"]
+                if i >= allowed:
+                    plan.append(
+                        _error(call, "budget_exhausted", "tool call budget exhausted")
+                    )
+                    continue
+                key = call_key(name, call["args"])
+                tool = tools.get(name)
+                # only tools marked read-only with @cacheable; side effects
+                # (set_light bright-up twice) and interrupts always run
+                reusable = (
+                    dedupe and tool is not None and cache_policy(tool) is not None
+                )
+                if reusable and key in earlier:
+                    DUPLICATES.inc(tool=name)
+                    TOOL_LATENCY.observe(0, tool=name, outcome="duplicate")
+                    _trace(name, 0.0, "duplicate")
+                    plan.append(
+                        ToolMessage(
+                            content=earlier[key], name=name, tool_call_id=call["id"]
+                        )
+                    )
+                    continue
+                if reusable and key in started_keys:
+                    DUPLICATES.inc(tool=name)
+                    plan.append(started_keys[key])
+                    continue
+                started_keys[key] = len(tasks)
+                plan.append(len(tasks))
+                tasks.append(asyncio.create_task(self._call(call, tool, slots)))
+            attrs["executed"] = len(tasks)
+            done: set[asyncio.Task] = set()
+            pending: set[asyncio.Task] = set()
+            if tasks:
+                done, pending = await asyncio.wait(tasks, timeout=step_timeout)
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        results: list[ToolMessage] = []
+        for call, step in zip(calls, plan):
+            if isinstance(step, ToolMessage):
+                results.append(step)
+                continue
+            t = tasks[step]
+            if t in done:
+                msg = t.result()  # re-raises interrupts
+                if msg.tool_call_id != call["id"]:  # same call twice in one step
+                    msg = msg.model_copy(update={"tool_call_id": call["id"]})
+                results.append(msg)
+                continue
+            results.append(
+                _error(
+                    call,
+                    "timeout",
+                    "tool step deadline exceeded",
+                    timeout_s=round(step_timeout, 1),
+                )
+            )
+        return {"messages": results}
+
+    async def _call(
+        self, call: ToolCall, tool: BaseTool | None, slots: asyncio.Semaphore
+    ) -> ToolMessage:
+        name = call["name"]
+        if tool is None:
+            return _error(call, "unknown_tool", f"no tool named {name!r}")
+        if self.cache and (hit := await self.cache.get(tool, call["args"])):
+            TOOL_LATENCY.observe(0, tool=name, outcome="cached")
+            _trace(name, 0.0, "cached")
+            return ToolMessage(content=hit, name=name, tool_call_id=call["id"])
+        limit = self.limits.timeout_for(name)
+        async with slots:
+            start = time.perf_counter()
+            outcome = "ok"
+            try:
+                # the whole ToolCall, so injected args (InjectedToolCallId …)
+                # are filled in and the tool builds its own ToolMessage
+                result = await asyncio.wait_for(
+                    tool.ainvoke({**call, "type": "tool_call"}), limit
+                )
+            except GraphBubbleUp:  # interrupt() in human_assistance
+                outcome = "interrupt"
+                raise
+            except asyncio.CancelledError:  # step deadline
+                outcome = "step_timeout"
+                raise
+            except TimeoutError:
+                outcome = "timeout"
+                return _error(
+                    call, "timeout", "tool deadline exceeded", timeout_s=limit
+                )
+            except Exception as e:  # noqa: BLE001 — 結果としてモデルに返す
+                outcome = "error"
+                return _error(call, type(e).__name__, str(e))
+            finally:
+                elapsed = time.perf_counter() - start
+                TOOL_LATENCY.observe(elapsed, tool=name, outcome=outcome)
+                _trace(name, elapsed, outcome)
+        if isinstance(result, ToolMessage):
+            msg = result  # keeps artifact / status set by the tool
+        else:  # e.g. a tool that returned something other than a message
+            msg = ToolMessage(content=_text(result), name=name, tool_call_id=call["id"])
+        content = _text(msg.content)
+        # tools report failures as "❌ ..." text; never cache or act on those
+        if msg.status == "error" or content.startswith("❌"):
+            return msg
+        age = data_age(tool)
+        if self.cache:
+            await self.cache.put(tool, call["args"], content, elapsed, age)
+            self.cache.invalidate(invalidated_tags(tool))
+        # the cache keeps the raw result; the staleness note is per serving
+        if (served := annotate(tool, content, age)) != content:
+            msg = msg.model_copy(update={"content": served})
+        return msg
@@ -0,0 +1,62 @@
+"""Which tools are bound to the model on a given turn.
+
+Every tool schema bound to the model is sent with every ``chatbot`` call,
+so a turn only binds the tools it can use:
+
+* tools declare the settings they need with :func:`requires`; a tool whose
+  environment variables are unset is never bound (a Remo tool without
+  ``REMO_AC_ID`` could only answer with an error)::
+
+      @requires("NATURE_REMO_TOKEN", "REMO_AC_ID")
+      @tool
+      async def get_ac_status() -> str: ...
+
+* a persona may list its tools in ``personas.yaml`` (``tools: [...]``) and a
+  channel may override that with ``!tools set``; by default all tools are
+  bound.
+
+:class:`~.graph_setup.GraphRuntime` keeps one bound model per resulting
+tool set (:meth:`~.graph_setup.GraphRuntime.bound_llm`), so switching sets
+never re-binds per call.
+"""
+
+import os
+from collections.abc import Callable, Collection, Sequence
+from typing import TypeVar
+
+from langchain_core.tools import BaseTool
+
+ToolT = TypeVar("ToolT", bound=BaseTool)
+
+
+def requires(*env: str) -> Callable[[ToolT], ToolT]:
+    """Declare the environment variables a tool needs to work."""
+
+    def mark(tool: ToolT) -> ToolT:
+        tool.metadata = {**(tool.metadata or {}), "requires": tuple(env)}
+        return tool
+
+    return mark
+
+
+def missing_settings(tool: BaseTool) -> list[str]:
+    return [v for v in (tool.metadata or {}).get("requires", ()) if not os.getenv(v)]
+
+
+def is_configured(tool: BaseTool) -> bool:
+    return not missing_settings(tool)
+
+
+def select_tools(
+    tools: Sequence[BaseTool], names: Collection[str] | None = None
+) -> list[BaseTool]:
+    """Configured ``tools`` named in ``names`` (all configured if None).
+
+    The result keeps the order of ``tools``, so equal sets give equal
+    signatures. Unknown names are ignored.
+    """
+    return [t for t in tools if (names is None or t.name in names) and is_configured(t)]
+
+
+def signature(tools: Sequence[BaseTool]) -> tuple[str, ...]:
+    return tuple(t.name for t in tools)
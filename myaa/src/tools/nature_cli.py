@@ -1,35 +1,216 @@
 # ---------------------------------------------------------------------------
 # Nature Remo
 # ---------------------------------------------------------------------------
+import asyncio
+import functools
 import os
-import requests
+import time
+from collections.abc import Callable
+from typing import Any
+
+import aiohttp
 from langchain_core.tools import tool
 from dotenv import load_dotenv
 
+from ..tool_cache import cacheable, invalidates
+from ..tool_select import requires
+from .remo_scheduler import (
+    STALE_READS,
+    RemoAPIError,
+    RemoCommandOverridden,
+    RemoScheduler,
+)
+
 load_dotenv()
 
-BASE = "https://api.nature.global/1"
-HEADERS = {"Authorization": f"Bearer {os.getenv('NATURE_REMO_TOKEN')}"}
+BASE = os.getenv("NATURE_REMO_BASE_URL", "https://api.nature.global/1")
 
 DEVICE_ID = os.getenv("REMO_DEVICE_ID")  # Remo mini (温度センサー)
 AC_ID = os.getenv("REMO_AC_ID")  # エアコン
 LIGHT_ID = os.getenv("REMO_LIGHT_ID")  # 照明
+# 状態がこの秒数より古ければ、ツールの返り値に「N秒前の値」と添える
+STALE_NOTE_AFTER = float(os.getenv("REMO_STALE_NOTE_AFTER", "120"))
 
 
-def _post(path: str, data: dict) -> None:
-    """内部ユーティリティ: POST リクエストを投げて 4xx/5xx なら例外を投げる。"""
-    r = requests.post(f"{BASE}{path}", headers=HEADERS, data=data, timeout=10)
-    r.raise_for_status()
-
-
-def _get(path: str) -> dict:
-    r = requests.get(f"{BASE}{path}", headers=HEADERS, timeout=10)
-    r.raise_for_status()
-    return r.json()
+class NatureRemoClient:
+    """Nature Remo Cloud API クライアント。
 
+    * HTTP セッション（コネクションプール）をプロセス内で使い回す
+    * ``/appliances`` と ``/devices`` は ``ttl`` 秒だけキャッシュし、id で引けるようにする
+    * 同じ一覧の取得が同時に走った場合は 1 回のリクエストにまとめる（single-flight）
+    * 操作（POST）が成功したら、レスポンスでキャッシュをその場で更新する
+    * リクエストはすべて :class:`RemoScheduler` を通す。API の残量が
+      ``read_reserve`` 以下のときは、期限切れでもキャッシュがあればそれを返す
+    * 操作が成功すると ``write_listeners`` に家電 id を通知する
+      （:class:`~.remo_mirror.RemoMirror` がポーリングを速めるのに使う）
+    """
 
+    def __init__(
+        self,
+        token: str | None,
+        base_url: str = BASE,
+        ttl: float = 5.0,
+        timeout: float = 10.0,
+        pool_size: int = 4,
+        read_reserve: int = 3,
+        scheduler_options: dict[str, Any] | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.pool_size = pool_size
+        self.read_reserve = read_reserve
+        self._scheduler_options = scheduler_options or {}
+        self.scheduler: RemoScheduler | None = None
+        self._headers = {"Authorization": f"Bearer {token}"}
+        self._http: aiohttp.ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # path -> (fetched_at, {id: entry})
+        self._cache: dict[str, tuple[float, dict[str, dict]]] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.write_listeners: list[Callable[[str], None]] = []
+
+    @classmethod
+    def from_env(cls) -> "NatureRemoClient":
+        return cls(os.getenv("NATURE_REMO_TOKEN"))
+
+    # -- HTTP ---------------------------------------------------------------
+    def _session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http.closed or self._loop is not loop:
+            # セッションはイベントループに紐づくので、ループが変わったら作り直す
+            self._http = aiohttp.ClientSession(
+                headers=self._headers,
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+            )
+            self._loop = loop
+            self._inflight.clear()
+            self.scheduler = RemoScheduler(self._send, **self._scheduler_options)
+        return self._http
+
+    def _scheduler(self) -> RemoScheduler:
+        self._session()
+        assert self.scheduler is not None
+        return self.scheduler
+
+    async def _send(
+        self, method: str, path: str, data: dict | None = None
+    ) -> tuple[Any, Any]:
+        async with self._session().request(
+            method, f"{self.base_url}{path}", data=data
+        ) as r:
+            text = await r.text()
+            if r.status >= 400:
+                raise RemoAPIError(r.status, text, r.headers)
+            body = await r.json(content_type=None) if text else None
+            return body, r.headers
+
+    async def get(self, path: str) -> Any:
+        return await self._scheduler().submit("GET", path)
+
+    async def post(self, path: str, data: dict) -> Any:
+        return await self._scheduler().submit("POST", path, data)
+
+    async def close(self) -> None:
+        if self.scheduler:
+            await self.scheduler.close()
+        if self._http and not self._http.closed:
+            await self._http.close()
+
+    # -- cached lists -------------------------------------------------------
+    async def _indexed(self, path: str) -> dict[str, dict]:
+        cached = self._cache.get(path)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+        if cached and self._scheduler().remaining <= self.read_reserve:
+            STALE_READS.inc(path=path)
+            return cached[1]
+        return await self.refresh(path)
+
+    async def refresh(self, path: str) -> dict[str, dict]:
+        """Fetch ``path`` now, ignoring the TTL (joins an in-flight fetch).
+
+        On failure the previous cache entry is kept.
+        """
+        self._session()  # ループが変わっていれば inflight を捨てる
+        fut = self._inflight.get(path)
+        if fut is None:
+            fut = asyncio.ensure_future(self._fetch_indexed(path))
+            self._inflight[path] = fut
+            fut.add_done_callback(lambda _: self._inflight.pop(path, None))
+        return await asyncio.shield(fut)
+
+    async def _fetch_indexed(self, path: str) -> dict[str, dict]:
+        items = await self.get(path)
+        index = {item["id"]: item for item in items}
+        self._cache[path] = (time.monotonic(), index)
+        return index
+
+    def age(self, path: str) -> float | None:
+        """Seconds since ``path`` was fetched (None if never)."""
+        cached = self._cache.get(path)
+        return time.monotonic() - cached[0] if cached else None
+
+    async def appliances(self) -> dict[str, dict]:
+        return await self._indexed("/appliances")
+
+    async def devices(self) -> dict[str, dict]:
+        return await self._indexed("/devices")
+
+    def invalidate(self, path: str | None = None) -> None:
+        if path is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(path, None)
+
+    def _patch_appliance(self, appliance_id: str, key: str, value: Any) -> None:
+        cached = self._cache.get("/appliances")
+        if cached and appliance_id in cached[1]:
+            entry = cached[1][appliance_id]
+            if key == "light":
+                entry.setdefault("light", {})["state"] = value
+            else:
+                entry[key] = value
+
+    def _notify_write(self, appliance_id: str) -> None:
+        for listener in self.write_listeners:
+            listener(appliance_id)
+
+    # -- commands -----------------------------------------------------------
+    async def send_aircon(self, appliance_id: str, data: dict) -> dict:
+        settings = await self.post(f"/appliances/{appliance_id}/aircon_settings", data)
+        if isinstance(settings, dict):
+            self._patch_appliance(appliance_id, "settings", settings)
+        else:
+            self.invalidate("/appliances")
+        self._notify_write(appliance_id)
+        return settings
+
+    async def send_light(self, appliance_id: str, button: str) -> dict:
+        state = await self.post(f"/appliances/{appliance_id}/light", {"button": button})
+        if isinstance(state, dict):
+            self._patch_appliance(appliance_id, "light", state)
+        else:
+            self.invalidate("/appliances")
+        self._notify_write(appliance_id)
+        return state
+
+
+remo = NatureRemoClient.from_env()
+
+
+def _stale_note(age: float) -> str:
+    # ツールのキャッシュから返すときも、その時点での古さで付け直す
+    return f"（{age:.0f}秒前の値）" if age >= STALE_NOTE_AFTER else ""
+
+
+@requires("NATURE_REMO_TOKEN", "REMO_DEVICE_ID")
+@cacheable(
+    60, tags=("room",), age=functools.partial(remo.age, "/devices"), note=_stale_note
+)
 @tool
-def get_room_temp() -> str:
+async def get_room_temp() -> str:
     """
     現在の室温 (摂氏) を取得して返します。
     例: "28.5"
@@ -37,9 +218,10 @@ def get_room_temp() -> str:
     if not DEVICE_ID:
         return "❌ DEVICE_ID が設定されていません"
 
-    r = requests.get(f"{BASE}/devices", headers=HEADERS, timeout=10)
-    devices = r.json()
-    device = next((d for d in devices if d["id"] == DEVICE_ID), None)
+    try:
+        device = (await remo.devices()).get(DEVICE_ID)
+    except RemoAPIError as e:
+        return f"❌ API エラー: {e.text}"
     if not device:
         return "❌ 対応するデバイスが見つかりません"
 
@@ -47,8 +229,10 @@ def get_room_temp() -> str:
     return f"{temp:.1f}"
 
 
+@requires("NATURE_REMO_TOKEN", "REMO_AC_ID")
+@invalidates("ac")
 @tool
-def set_ac(mode: str, temp: int | None = None, vol: str = "auto") -> str:
+async def set_ac(mode: str, temp: int | None = None, vol: str = "auto") -> str:
     """
     エアコンを操作します。
     - mode: "cool" / "warm" / "off"
@@ -60,7 +244,7 @@ def set_ac(mode: str, temp: int | None = None, vol: str = "auto") -> str:
 
     try:
         if mode == "off":
-            _post(f"/appliances/{AC_ID}/aircon_settings", {"button": "power-off"})
+            await remo.send_aircon(AC_ID, {"button": "power-off"})
             return "✅ エアコンを停止しました"
 
         if temp is None:
@@ -71,15 +255,21 @@ def set_ac(mode: str, temp: int | None = None, vol: str = "auto") -> str:
             "temperature": str(temp),
             "air_volume": vol,
         }
-        _post(f"/appliances/{AC_ID}/aircon_settings", data)
+        await remo.send_aircon(AC_ID, data)
         return f"✅ {mode} {temp}℃・風量{vol} で運転しました"
 
-    except requests.HTTPError as e:
-        return f"❌ API エラー: {e.response.text}"
+    except RemoCommandOverridden as e:
+        return (
+            f"⚠️ 送信前に別の操作 {e.replaced_by} で上書きされたため、送信していません"
+        )
+    except RemoAPIError as e:
+        return f"❌ API エラー: {e.text}"
 
 
+@requires("NATURE_REMO_TOKEN", "REMO_LIGHT_ID")
+@invalidates("light")
 @tool
-def set_light(action: str) -> str:
+async def set_light(action: str) -> str:
     """
     照明を操作します。
     - action: "on" / "off" / "night" / "bright-up" / "bright-down"
@@ -90,15 +280,23 @@ def set_light(action: str) -> str:
         return "❌ LIGHT_ID が設定されていません"
 
     try:
-        _post(f"/appliances/{LIGHT_ID}/light", {"button": action})
+        await remo.send_light(LIGHT_ID, action)
         state = {"on": "点灯", "off": "消灯"}.get(action, f"'{action}' を送信")
         return f"✅ 照明を{state}しました"
-    except requests.HTTPError as e:
-        return f"❌ API エラー: {e.response.text}"
-
-
+    except RemoCommandOverridden as e:
+        return (
+            f"⚠️ 送信前に別の操作 {e.replaced_by} で上書きされたため、送信していません"
+        )
+    except RemoAPIError as e:
+        return f"❌ API エラー: {e.text}"
+
+
+@requires("NATURE_REMO_TOKEN", "REMO_AC_ID")
+@cacheable(
+    30, tags=("ac",), age=functools.partial(remo.age, "/appliances"), note=_stale_note
+)
 @tool
-def get_ac_status() -> str:
+async def get_ac_status() -> str:
     """
     エアコンの現在設定（ON/OFF, モード, 設定温度, 風量）を取得します。
     例: "ON / cool 26℃ / 風量auto"
@@ -107,7 +305,7 @@ def get_ac_status() -> str:
         return "❌ AC_ID が設定されていません"
 
     try:
-        ac = next((a for a in _get("/appliances") if a["id"] == AC_ID), None)
+        ac = (await remo.appliances()).get(AC_ID)
         if not ac or not ac.get("settings"):
             return "❌ エアコン設定が取得できません"
 
@@ -120,12 +318,19 @@ def get_ac_status() -> str:
 
         return f"{power} / {mode} {temp_txt} / 風量{vol}"
 
-    except requests.HTTPError as e:
-        return f"❌ API エラー: {e.response.text}"
+    except RemoAPIError as e:
+        return f"❌ API エラー: {e.text}"
 
 
+@requires("NATURE_REMO_TOKEN", "REMO_LIGHT_ID")
+@cacheable(
+    30,
+    tags=("light",),
+    age=functools.partial(remo.age, "/appliances"),
+    note=_stale_note,
+)
 @tool
-def get_light_status() -> str:
+async def get_light_status() -> str:
     """
     照明の現在状態（ON/OFF）を取得します。
     例: "ON"
@@ -134,17 +339,15 @@ def get_light_status() -> str:
         return "❌ LIGHT_ID が設定されていません"
 
     try:
-        lamp = next((a for a in _get("/appliances") if a["id"] == LIGHT_ID), None)
+        lamp = (await remo.appliances()).get(LIGHT_ID)
         state = lamp.get("light", {}).get("state") if lamp else None
         if not state:
             return "❌ 照明状態が取得できません"
 
         power = state.get("power", "unknown").upper()  # on / off
-        bright = state.get("brightness") or state.get("last_button") or "?"
-        bright_txt = f"{bright}%" if bright.isdigit() else bright
 
-        # return f"{power} / {bright_txt}" bright_txt is always 100%
-        return f"{power}"
+        # brightness is always reported as 100%, so only the power state is shown
+        return power
 
-    except requests.HTTPError as e:
-        return f"❌ API エラー: {e.response.text}"
+    except RemoAPIError as e:
+        return f"❌ API エラー: {e.text}"
@@ -0,0 +1,239 @@
+# ---------------------------------------------------------------------------
+# Nature Remo: background state mirror
+# ---------------------------------------------------------------------------
+import asyncio
+import time
+from collections.abc import Callable, Coroutine, Iterable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+import aiohttp
+
+from ..metrics import REGISTRY
+from .remo_scheduler import RemoAPIError
+
+if TYPE_CHECKING:
+    from .nature_cli import NatureRemoClient
+
+POLLS = REGISTRY.counter(
+    "remo_mirror_polls_total", "Background Nature Remo polls (label: path, outcome)"
+)
+EVENTS = REGISTRY.counter(
+    "remo_mirror_events_total", "Nature Remo state changes seen by the mirror"
+)
+
+DEVICES = "/devices"
+APPLIANCES = "/appliances"
+
+
+@dataclass(frozen=True)
+class RemoEvent:
+    """ミラーが検出した状態の変化。
+
+    * ``temperature``: 室温が変わった（``key`` はデバイス id）
+    * ``threshold``: 室温が ``threshold`` をまたいだ（``direction`` は "up" / "down"）
+    * ``ac``: エアコン設定が変わった / ``light``: 照明の電源が変わった
+    """
+
+    kind: str
+    key: str
+    old: Any
+    new: Any
+    at: float = field(default_factory=time.time)
+    threshold: float | None = None
+    direction: str | None = None
+
+
+Handler = Callable[[RemoEvent], Coroutine[Any, Any, None]]
+
+
+class RemoMirror:
+    """``/devices`` と ``/appliances`` をバックグラウンドで取得し続けるミラー。
+
+    * 取得結果はクライアントのキャッシュ（id で引ける dict）にそのまま入るので、
+      ツールは ``remo.devices()`` / ``remo.appliances()`` を API を叩かずに読める。
+      動いている間はクライアントの ``ttl`` を ``max_age`` まで延ばし、
+      ミラーが止まったり遅れたりしたときだけツール側で取り直す
+    * 通常は ``idle`` 秒ごと。操作（set_ac / set_light）の後 ``active_for`` 秒間は
+      ``/appliances`` を ``active`` 秒ごとに取る
+    * API の残量が ``reserve`` 以下のときはポーリングを見送り、操作用に残す
+    * 前回との差分を :class:`RemoEvent` として ``subscribe`` したハンドラに配る
+    * しきい値には ``hysteresis`` の幅を持たせる: 上にまたいだら ``t - hysteresis``
+      を下回るまで次の "up" を、下にまたいだら ``t + hysteresis`` 以上になるまで
+      次の "down" を出さない（28.0 付近で揺れる室温で連発しない）
+    """
+
+    def __init__(
+        self,
+        client: "NatureRemoClient",
+        *,
+        idle: float = 60.0,
+        active: float = 15.0,
+        active_for: float = 60.0,
+        reserve: int = 10,
+        max_age: float | None = None,
+        hysteresis: float = 0.5,
+    ):
+        self.client = client
+        self.idle = idle
+        self.active = active
+        self.active_for = active_for
+        self.reserve = reserve
+        self.max_age = max_age if max_age is not None else 3 * idle
+        self.hysteresis = hysteresis
+        self.thresholds: set[float] = set()
+        # (device id, threshold, "up" / "down") -> may that crossing fire now
+        self._armed: dict[tuple[str, float, str], bool] = {}
+        self._handlers: list[Handler] = []
+        self._last: dict[tuple[str, str], Any] = {}
+        self._due = {DEVICES: 0.0, APPLIANCES: 0.0}
+        self._active_until = 0.0
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._dispatching: set[asyncio.Task] = set()
+        self._saved_ttl: float | None = None
+
+    # -- lifecycle ----------------------------------------------------------
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._saved_ttl = self.client.ttl
+        self.client.ttl = max(self.client.ttl, self.max_age)
+        self.client.write_listeners.append(self.poke)
+        self._task = asyncio.create_task(self._run(), name="remo-mirror")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, *self._dispatching, return_exceptions=True)
+        self._task = None
+        if self.poke in self.client.write_listeners:
+            self.client.write_listeners.remove(self.poke)
+        if self._saved_ttl is not None:
+            self.client.ttl = self._saved_ttl
+
+    # -- schedule -----------------------------------------------------------
+    def poke(self, _appliance_id: str = "") -> None:
+        """操作の直後に呼ぶ: しばらく ``/appliances`` を速めに取る。"""
+        now = time.monotonic()
+        self._active_until = now + self.active_for
+        self._due[APPLIANCES] = min(self._due[APPLIANCES], now + self.active)
+        self._wake.set()
+
+    def interval(self, path: str) -> float:
+        if path == APPLIANCES and time.monotonic() < self._active_until:
+            return self.active
+        return self.idle
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            for path, due in list(self._due.items()):
+                if due <= now:
+                    await self.poll(path)
+                    self._due[path] = time.monotonic() + self.interval(path)
+            delay = max(0.0, min(self._due.values()) - time.monotonic())
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except TimeoutError:
+                pass
+
+    async def poll(self, path: str) -> bool:
+        """Refresh ``path`` once and dispatch the changes; False if skipped."""
+        scheduler = self.client.scheduler
+        if scheduler is not None and scheduler.remaining <= self.reserve:
+            POLLS.inc(path=path, outcome="skipped")
+            return False
+        try:
+            index = await self.client.refresh(path)
+        except (RemoAPIError, aiohttp.ClientError, TimeoutError) as e:
+            POLLS.inc(path=path, outcome="error")
+            print(f"⚠️ remo mirror: {path} failed: {e}")
+            return False
+        POLLS.inc(path=path, outcome="ok")
+        self._diff(path, index)
+        return True
+
+    # -- snapshot -----------------------------------------------------------
+    def age(self, path: str) -> float | None:
+        return self.client.age(path)
+
+    def temperature(self, device_id: str) -> float | None:
+        return self._last.get(("temperature", device_id))
+
+    # -- events -------------------------------------------------------------
+    def subscribe(self, handler: Handler) -> Callable[[], None]:
+        """Call ``handler`` for every event; returns an unsubscribe function."""
+        self._handlers.append(handler)
+        return lambda: self._handlers.remove(handler)
+
+    def set_thresholds(self, values: Iterable[float]) -> None:
+        self.thresholds = set(values)
+        self._armed = {k: v for k, v in self._armed.items() if k[1] in self.thresholds}
+
+    def _diff(self, path: str, index: dict[str, dict]) -> None:
+        for key, entry in index.items():
+            for kind, value in _observed(path, entry):
+                old = self._last.get((kind, key))
+                self._last[(kind, key)] = value
+                if old is None or old == value:
+                    continue  # the first poll only records a baseline
+                self._emit(RemoEvent(kind, key, old, value))
+                if kind == "temperature":
+                    self._cross(key, old, value)
+
+    def _cross(self, key: str, old: float, value: float) -> None:
+        band = self.hysteresis
+        for t in sorted(self.thresholds):
+            up = self._armed.setdefault((key, t, "up"), old < t)
+            down = self._armed.setdefault((key, t, "down"), old >= t)
+            direction = None
+            if up and value >= t:
+                direction, up = "up", False
+            elif down and value < t:
+                direction, down = "down", False
+            # re-arm only once the temperature has left the band
+            self._armed[(key, t, "up")] = up or value < t - band
+            self._armed[(key, t, "down")] = down or value >= t + band
+            if direction:
+                self._emit(
+                    RemoEvent(
+                        "threshold", key, old, value, threshold=t, direction=direction
+                    )
+                )
+
+    def _emit(self, event: RemoEvent) -> None:
+        EVENTS.inc(kind=event.kind)
+        for handler in list(self._handlers):
+            task = asyncio.create_task(handler(event))
+            self._dispatching.add(task)
+            task.add_done_callback(self._dispatched)
+
+    def _dispatched(self, task: asyncio.Task) -> None:
+        self._dispatching.discard(task)
+        if not task.cancelled() and (e := task.exception()) is not None:
+            print(f"⚠️ remo mirror handler failed: {e!r}")
+
+
+def _observed(path: str, entry: dict) -> Iterable[tuple[str, Any]]:
+    """The values the mirror diffs for one ``/devices`` or ``/appliances`` entry."""
+    if path == DEVICES:
+        te = entry.get("newest_events", {}).get("te")
+        if te and isinstance(te.get("val"), (int, float)):
+            yield "temperature", float(te["val"])
+        return
+    if settings := entry.get("settings"):
+        yield "ac", (
+            settings.get("button", ""),
+            settings.get("mode", ""),
+            settings.get("temp", ""),
+            settings.get("vol", ""),
+        )
+    if power := entry.get("light", {}).get("state", {}).get("power"):
+        yield "light", power
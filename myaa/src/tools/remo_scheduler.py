@@ -0,0 +1,317 @@
+# ---------------------------------------------------------------------------
+# Nature Remo: rate-limit aware request scheduler
+# ---------------------------------------------------------------------------
+import asyncio
+import contextlib
+import heapq
+import itertools
+import random
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+import aiohttp
+
+from ..metrics import REGISTRY
+
+WRITE = 0  # 操作系は先に送る
+READ = 1
+
+# 照明の「状態を指定する」ボタン。連続して積まれたら最後のものだけ送れば十分
+_ABSOLUTE_LIGHT_BUTTONS = {"on", "off", "night"}
+
+QUEUE_DEPTH = REGISTRY.gauge("remo_queue_depth", "Nature Remo requests waiting")
+QUEUE_WAIT = REGISTRY.histogram(
+    "remo_queue_wait_seconds", "Time a Nature Remo request waited in the queue"
+)
+REQUESTS = REGISTRY.counter("remo_requests_total", "Nature Remo HTTP requests sent")
+RETRIES = REGISTRY.counter("remo_retries_total", "Nature Remo requests retried")
+COALESCED = REGISTRY.counter(
+    "remo_coalesced_total", "Nature Remo commands merged into a queued one"
+)
+STALE_READS = REGISTRY.counter(
+    "remo_stale_reads_total", "Status reads served from an expired cache"
+)
+RATE_REMAINING = REGISTRY.gauge(
+    "remo_rate_limit_remaining", "Last X-Rate-Limit-Remaining seen"
+)
+
+
+class RemoAPIError(Exception):
+    """Nature Remo API が 4xx/5xx を返したときの例外。"""
+
+    def __init__(
+        self, status: int, text: str, headers: Mapping[str, str] | None = None
+    ):
+        super().__init__(f"{status}: {text}")
+        self.status = status
+        self.text = text
+        self.headers: Mapping[str, str] = headers or {}
+
+
+class RemoCommandOverridden(Exception):
+    """送信前の操作が、同じ家電へのあとの操作で置き換えられたときの例外（未送信）。"""
+
+    def __init__(self, path: str, data: dict | None, replaced_by: dict | None):
+        super().__init__(f"{path}: {data} was replaced by {replaced_by}")
+        self.path = path
+        self.data = data
+        self.replaced_by = replaced_by
+
+
+class _Retry(Exception):
+    """再試行すべき失敗（``delay`` 秒後にキューへ戻す）。"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+
+Send = Callable[[str, str, dict | None], Awaitable[tuple[Any, Mapping[str, str]]]]
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    method: str = field(compare=False)
+    path: str = field(compare=False)
+    data: dict | None = field(compare=False)
+    enqueued: float = field(compare=False)
+    attempt: int = field(compare=False, default=0)
+    waiters: list[asyncio.Future] = field(compare=False, default_factory=list)
+
+
+class RemoScheduler:
+    """Nature Remo へのリクエストを 1 本のキューで送り出すスケジューラ。
+
+    * トークンバケットでレート制限を守る。``X-Rate-Limit-*`` ヘッダを見て残量を補正する
+    * 優先度付きキュー: 操作 (POST) は状態取得 (GET) より先に送る
+    * 429 / 5xx / 通信エラーはジッター付き指数バックオフで再試行する。
+      再試行を待つジョブは時刻付きでキューへ戻すので、その間もほかの要求は送られる
+    * 操作 (POST) は、届いたか分からない失敗（タイムアウト・切断・5xx）では
+      再送しない（bright-up などが二重に効くため）。429 と接続失敗のみ再試行する
+    * まだ送っていない同じ家電への操作は 1 回にまとめる
+      （同じボタンの連打、エアコン設定や on/off の上書き）。上書きされた操作の
+      呼び出し元には :class:`RemoCommandOverridden` を返す
+    """
+
+    def __init__(
+        self,
+        send: Send,
+        *,
+        limit: int = 30,
+        window: float = 300.0,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ):
+        self._send = send
+        self.limit = limit
+        self.window = window
+        self._rate = limit / window
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._tokens = float(limit)
+        self._refilled_at = clock()
+        self._reset_at: float | None = None
+        self._heap: list[_Job] = []
+        # (not_before, seq, job): retries waiting for their backoff
+        self._delayed: list[tuple[float, int, _Job]] = []
+        self._pending_writes: dict[str, _Job] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._worker: asyncio.Task | None = None
+
+    # -- public -------------------------------------------------------------
+    @property
+    def remaining(self) -> float:
+        self._refill()
+        return self._tokens
+
+    @property
+    def depth(self) -> int:
+        return len(self._heap) + len(self._delayed)
+
+    async def submit(self, method: str, path: str, data: dict | None = None) -> Any:
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        if method == "POST" and self._coalesce(path, data, fut):
+            COALESCED.inc()
+            return await fut
+        job = _Job(
+            WRITE if method == "POST" else READ,
+            next(self._seq),
+            method,
+            path,
+            data,
+            self._clock(),
+            waiters=[fut],
+        )
+        heapq.heappush(self._heap, job)
+        if method == "POST":
+            self._pending_writes[path] = job
+        QUEUE_DEPTH.set(self.depth)
+        self._ensure_worker()
+        self._wakeup.set()
+        return await fut
+
+    async def close(self) -> None:
+        if self._worker:
+            self._worker.cancel()
+            self._worker = None
+
+    # -- queueing -----------------------------------------------------------
+    def _coalesce(self, path: str, data: dict | None, fut: asyncio.Future) -> bool:
+        job = self._pending_writes.get(path)
+        if job is None:
+            return False
+        if job.data != data:
+            if path.endswith("/light"):
+                old = (job.data or {}).get("button")
+                new = (data or {}).get("button")
+                if not (
+                    old in _ABSOLUTE_LIGHT_BUTTONS and new in _ABSOLUTE_LIGHT_BUTTONS
+                ):
+                    return False
+            elif not path.endswith("/aircon_settings"):
+                return False
+            # 後から来た指定で上書き。前の指定は送らないので、その呼び出し元に伝える
+            overridden = RemoCommandOverridden(path, job.data, data)
+            for w in job.waiters:
+                if not w.done():
+                    w.set_exception(overridden)
+            job.waiters.clear()
+            job.data = data
+        job.waiters.append(fut)
+        return True
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    def _release_delayed(self) -> None:
+        now = self._clock()
+        while self._delayed and self._delayed[0][0] <= now:
+            heapq.heappush(self._heap, heapq.heappop(self._delayed)[2])
+
+    async def _run(self) -> None:
+        while True:
+            self._release_delayed()
+            if not self._heap:
+                self._wakeup.clear()
+                timeout = None
+                if self._delayed:
+                    timeout = max(0.0, self._delayed[0][0] - self._clock())
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                continue
+            await self._acquire()
+            job = heapq.heappop(self._heap)
+            if self._pending_writes.get(job.path) is job:
+                del self._pending_writes[job.path]
+            QUEUE_DEPTH.set(self.depth)
+            if job.attempt == 0:
+                QUEUE_WAIT.observe(
+                    self._clock() - job.enqueued,
+                    kind="read" if job.priority else "write",
+                )
+            try:
+                result = await self._dispatch(job)
+            except _Retry as r:
+                # バックオフ中もワーカーは止めず、ほかの要求を先に送る
+                job.attempt += 1
+                RETRIES.inc(method=job.method)
+                heapq.heappush(self._delayed, (self._clock() + r.delay, job.seq, job))
+                QUEUE_DEPTH.set(self.depth)
+            except Exception as e:  # noqa: BLE001 — 呼び出し側に渡す
+                for w in job.waiters:
+                    if not w.done():
+                        w.set_exception(e)
+            else:
+                for w in job.waiters:
+                    if not w.done():
+                        w.set_result(result)
+
+    # -- rate limit ---------------------------------------------------------
+    def _refill(self) -> None:
+        now = self._clock()
+        if self._reset_at is not None and self._wall_clock() >= self._reset_at:
+            self._tokens = float(self.limit)
+            self._reset_at = None
+        else:
+            self._tokens = min(
+                float(self.limit), self._tokens + (now - self._refilled_at) * self._rate
+            )
+        self._refilled_at = now
+
+    async def _acquire(self) -> None:
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            wait = (1 - self._tokens) / self._rate
+            if self._reset_at is not None:
+                wait = min(wait, max(0.0, self._reset_at - self._wall_clock()))
+            await asyncio.sleep(wait)
+
+    def _observe_headers(self, headers: Mapping[str, str]) -> None:
+        try:
+            if "X-Rate-Limit-Limit" in headers:
+                self.limit = int(headers["X-Rate-Limit-Limit"])
+                self._rate = self.limit / self.window
+            if "X-Rate-Limit-Remaining" in headers:
+                self._tokens = min(
+                    self._tokens, float(headers["X-Rate-Limit-Remaining"])
+                )
+                RATE_REMAINING.set(self._tokens)
+            if "X-Rate-Limit-Reset" in headers:
+                self._reset_at = float(headers["X-Rate-Limit-Reset"])
+        except ValueError:
+            pass
+
+    # -- sending ------------------------------------------------------------
+    def _backoff(self, attempt: int) -> float:
+        cap = min(self.max_delay, self.base_delay * 2**attempt)
+        return random.uniform(cap / 2, cap)
+
+    async def _dispatch(self, job: _Job) -> Any:
+        """Send ``job`` once; raises :class:`_Retry` when it should be retried."""
+        try:
+            body, headers = await self._send(job.method, job.path, job.data)
+        except RemoAPIError as e:
+            REQUESTS.inc(method=job.method, status=str(e.status))
+            self._observe_headers(e.headers)
+            # 429 は処理されていない。POST の 5xx は実行済みかもしれない
+            retry = e.status == 429 or (e.status >= 500 and job.method != "POST")
+            if not retry or job.attempt >= self.max_retries:
+                raise
+            delay = self._backoff(job.attempt)
+            if e.status == 429 and self._reset_at is not None:
+                delay = max(delay, self._reset_at - self._wall_clock())
+            raise _Retry(delay) from e
+        except (TimeoutError, aiohttp.ClientError) as e:
+            REQUESTS.inc(method=job.method, status="error")
+            # 接続できなかった要求だけは、POST でも届いていないと分かる
+            sent = not isinstance(e, aiohttp.ClientConnectorError)
+            if (sent and job.method == "POST") or job.attempt >= self.max_retries:
+                raise
+            raise _Retry(self._backoff(job.attempt)) from e
+        REQUESTS.inc(method=job.method, status="ok")
+        self._observe_headers(headers)
+        return body
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "queue_depth": self.depth,
+            "remaining": self.remaining,
+            "write_wait_p95_s": QUEUE_WAIT.quantile(0.95, kind="write"),
+            "read_wait_p95_s": QUEUE_WAIT.quantile(0.95, kind="read"),
+            "coalesced": COALESCED.value(),
+            "retries": RETRIES.value(method="GET") + RETRIES.value(method="POST"),
+        }
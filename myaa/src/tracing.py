@@ -0,0 +1,176 @@
+"""Structured per-turn debug traces built from LangGraph ``debug`` stream events."""
+
+import json
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Protocol
+
+if TYPE_CHECKING:
+    from langchain_core.messages import AIMessage
+
+
+class TraceSink(Protocol):
+    """Destination for trace records (stdout, file, metrics backend …)."""
+
+    def emit(self, record: dict[str, Any]) -> None: ...
+
+
+class PrintSink:
+    """Default sink: one readable line per record on stdout."""
+
+    def emit(self, record: dict[str, Any]) -> None:
+        kind = record.get("event")
+        if kind == "node":
+            print(
+                f"🛠 [{record['thread_id']}] {record['node']} "
+                f"{record['duration_ms']:.0f}ms tokens={record['tokens']}"
+            )
+            for call in record["tool_calls"]:
+                print(f"   ➡️ tool_call {call['name']}({call['args']})")
+            for res in record["tool_results"]:
+                print(f"   ⬅️ tool_result {res['name']}: {res['content']}")
+            if record["error"]:
+                print(f"   ❌ {record['error']}")
+        elif kind == "turn":
+            print(
+                f"🧵 [{record['thread_id']}] turn {record['duration_ms']:.0f}ms "
+                f"nodes={record['nodes']} tool_calls={record['tool_calls']} "
+                f"tokens={record['tokens']}"
+            )
+        else:
+            print(f"🛠 {record}")
+
+
+class ListSink:
+    """Collects records in memory (handy for benchmarks and the REPL)."""
+
+    def __init__(self):
+        self.records: list[dict[str, Any]] = []
+
+    def emit(self, record: dict[str, Any]) -> None:
+        self.records.append(record)
+
+
+class JsonlSink:
+    """Appends each record as one JSON line to ``path``.
+
+    Lines are buffered and written every ``flush_every`` records (and on
+    :meth:`close`), so an always-on trace file costs one ``json.dumps`` per
+    record.
+    """
+
+    def __init__(self, path: str, flush_every: int = 32):
+        self.path = path
+        self.flush_every = flush_every
+        self._lines: list[str] = []
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._lines.append(line + "\n")
+            if len(self._lines) >= self.flush_every:
+                self._flush()
+
+    def _flush(self) -> None:
+        lines, self._lines = self._lines, []
+        if lines:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+
+
+def _ts(event: dict[str, Any]) -> datetime:
+    return datetime.fromisoformat(event["timestamp"])
+
+
+def usage(msg: "AIMessage") -> dict[str, int]:
+    usage = getattr(msg, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    return {
+        "input": int(usage.get("input_tokens", 0)),
+        "output": int(usage.get("output_tokens", 0)),
+        # input tokens served from the provider's prompt prefix cache
+        "cached": int(details.get("cache_read", 0)),
+    }
+
+
+class TurnTracer:
+    """Turns raw ``debug`` events of one graph run into trace records."""
+
+    def __init__(self, sink: TraceSink, thread_id: str):
+        self.sink = sink
+        self.thread_id = thread_id
+        self._started: dict[str, datetime] = {}
+        self._first: datetime | None = None
+        self._last: datetime | None = None
+        self._nodes = 0
+        self._tool_calls = 0
+        self._tokens = {"input": 0, "output": 0, "cached": 0}
+
+    def feed(self, event: dict[str, Any]) -> None:
+        kind = event.get("type")
+        ts = _ts(event)
+        self._first = self._first or ts
+        self._last = ts
+        payload = event.get("payload", {})
+        if kind == "task":
+            self._started[payload["id"]] = ts
+        elif kind == "task_result":
+            started = self._started.pop(payload["id"], ts)
+            self._on_result(payload, (ts - started).total_seconds() * 1000)
+
+    def _on_result(self, payload: dict[str, Any], duration_ms: float) -> None:
+        from langchain_core.messages import AIMessage, ToolMessage
+
+        tool_calls: list[dict[str, Any]] = []
+        tool_results: list[dict[str, Any]] = []
+        tokens = {"input": 0, "output": 0, "cached": 0}
+        for channel, value in payload.get("result", []):
+            if channel != "messages":
+                continue
+            for m in value if isinstance(value, list) else [value]:
+                if isinstance(m, AIMessage):
+                    tool_calls += [
+                        {"name": c["name"], "args": c["args"]} for c in m.tool_calls
+                    ]
+                    for k, v in usage(m).items():
+                        tokens[k] += v
+                elif isinstance(m, ToolMessage):
+                    tool_results.append({"name": m.name, "content": m.content})
+        self._nodes += 1
+        self._tool_calls += len(tool_calls)
+        for k, v in tokens.items():
+            self._tokens[k] += v
+        self.sink.emit(
+            {
+                "event": "node",
+                "thread_id": self.thread_id,
+                "node": payload.get("name"),
+                "duration_ms": duration_ms,
+                "tool_calls": tool_calls,
+                "tool_results": tool_results,
+                "tokens": tokens,
+                "error": payload.get("error"),
+            }
+        )
+
+    def close(self) -> None:
+        duration = (
+            (self._last - self._first).total_seconds() * 1000
+            if self._first and self._last
+            else 0.0
+        )
+        self.sink.emit(
+            {
+                "event": "turn",
+                "thread_id": self.thread_id,
+                "duration_ms": duration,
+                "nodes": self._nodes,
+                "tool_calls": self._tool_calls,
+                "tokens": dict(self._tokens),
+            }
+        )
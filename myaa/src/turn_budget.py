@@ -0,0 +1,123 @@
+"""Per-turn budgets for the ``chatbot`` ⇄ ``tools`` loop.
+
+A turn is everything after the newest ``HumanMessage``; usage is counted
+from those messages, so nothing extra is checkpointed. The wall clock
+starts when :func:`~.graph_setup._run_turn` puts ``turn_started`` into the
+run config (turns started another way have no time limit).
+
+* the ``chatbot`` node checks the budget before every model call; once a
+  limit is reached it makes one last call that must answer without tools
+  (any tool calls in it are dropped)
+* the ``tools`` node answers calls beyond ``max_tool_calls`` with a
+  ``budget_exhausted`` error, and serves a read-only call identical to one
+  made earlier in the same turn from that call's result
+"""
+
+import json
+import os
+import time
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+from .metrics import REGISTRY
+
+EXHAUSTED = REGISTRY.counter(
+    "turn_budget_exhausted_total", "Turns cut short by a budget (label: limit)"
+)
+DUPLICATES = REGISTRY.counter(
+    "tool_duplicate_calls_total", "Tool calls served from an identical earlier call"
+)
+
+FINAL_ANSWER_PROMPT = (
+    "INSTRUCTION: このターンで使えるツールの上限に達しました。"
+    "これ以上ツールは使わず、ここまでに得た情報だけで回答してください。"
+)
+# the forced final answer still asked for tools and said nothing
+BUDGET_FALLBACK_REPLY = "（ツールの使用上限に達したため、ここで回答を打ち切ります）"
+
+
+@dataclass(frozen=True)
+class TurnBudget:
+    """Limits for one turn; 0 disables a limit.
+
+    ``max_llm_calls`` counts every ``chatbot`` call including the final
+    answer, ``max_tool_calls`` the tool calls the model asked for
+    (duplicates served from an earlier result included). ``dedupe``
+    turns the duplicate short-circuit on or off.
+    """
+
+    max_llm_calls: int = 6
+    max_tool_calls: int = 12
+    max_seconds: float = 90.0
+    dedupe: bool = True
+
+    @classmethod
+    def from_env(cls) -> "TurnBudget":
+        base = cls()
+        return cls(
+            max_llm_calls=int(os.getenv("TURN_MAX_LLM_CALLS") or base.max_llm_calls),
+            max_tool_calls=int(os.getenv("TURN_MAX_TOOL_CALLS") or base.max_tool_calls),
+            max_seconds=float(os.getenv("TURN_MAX_SECONDS") or base.max_seconds),
+            dedupe=os.getenv("TOOL_DEDUPE", "1") != "0",
+        )
+
+    def exhausted(
+        self, messages: Sequence[BaseMessage], started: float | None
+    ) -> str | None:
+        """The limit the next ``chatbot`` call would break, if any.
+
+        The LLM limit already triggers for the last allowed call, so that
+        call is the forced final answer.
+        """
+        turn = turn_messages(messages)
+        llm_calls = sum(isinstance(m, AIMessage) for m in turn)
+        tool_calls = tool_calls_made(turn)
+        if self.max_llm_calls and llm_calls + 1 >= self.max_llm_calls:
+            return "llm_calls"
+        if self.max_tool_calls and tool_calls >= self.max_tool_calls:
+            return "tool_calls"
+        if self.remaining_seconds(started) == 0.0:
+            return "seconds"
+        return None
+
+    def remaining_seconds(self, started: float | None) -> float | None:
+        if not self.max_seconds or started is None:
+            return None
+        return max(0.0, self.max_seconds - (time.monotonic() - started))
+
+
+def turn_messages(messages: Sequence[BaseMessage]) -> Sequence[BaseMessage]:
+    """The messages after the newest ``HumanMessage``."""
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[i + 1 :]
+    return messages
+
+
+def call_key(name: str, args: Mapping[str, Any]) -> str:
+    return name + json.dumps(args, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def earlier_results(messages: Sequence[BaseMessage]) -> dict[str, str]:
+    """``call_key`` → content of the successful tool results of this turn."""
+    calls: dict[str, str] = {}
+    for m in turn_messages(messages):
+        if isinstance(m, AIMessage):
+            for c in m.tool_calls:
+                if cid := c.get("id"):
+                    calls[cid] = call_key(c["name"], c["args"])
+    results: dict[str, str] = {}
+    for m in turn_messages(messages):
+        if isinstance(m, ToolMessage) and m.status != "error":
+            key = calls.get(m.tool_call_id)
+            content = m.content if isinstance(m.content, str) else None
+            if key and content is not None and not content.startswith("❌"):
+                results[key] = content
+    return results
+
+
+def tool_calls_made(turn: Sequence[BaseMessage]) -> int:
+    return sum(isinstance(m, ToolMessage) for m in turn)
@@ -0,0 +1,137 @@
+"""Per-session turn queue: serialize turns and batch bursty messages.
+
+Every session key gets a small actor. Messages submitted while a turn is
+running (or within ``debounce`` seconds of each other) are handed to the
+turn handler together, so a burst of five messages becomes one graph run
+and one reply. Each session holds at most ``max_depth`` waiting messages;
+``submit`` refuses anything beyond that.
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Generic, TypeVar
+
+from .metrics import REGISTRY
+
+T = TypeVar("T")
+
+QUEUE_DEPTH = REGISTRY.gauge("turn_queue_depth", "Messages waiting for a turn")
+BATCH_SIZE = REGISTRY.histogram(
+    "turn_batch_size",
+    "Messages answered by one turn",
+    buckets=(1, 2, 3, 5, 8, 13, 21),
+)
+DROPPED = REGISTRY.counter(
+    "turn_queue_dropped_total", "Messages refused because the queue was full"
+)
+TURN_ERRORS = REGISTRY.counter("turn_errors_total", "Turn handlers that raised")
+QUEUE_WAIT = REGISTRY.histogram(
+    "turn_queue_wait_seconds", "Oldest message's wait from arrival to its turn"
+)
+
+
+@dataclass
+class _Session(Generic[T]):
+    pending: list[T] = field(default_factory=list)
+    deadline: float = 0.0  # when the debounce window closes
+    first_at: float = 0.0  # arrival of the oldest pending message
+    arrived: asyncio.Event = field(default_factory=asyncio.Event)
+    worker: asyncio.Task | None = None
+
+
+class TurnQueue(Generic[T]):
+    """Run ``handler(key, batch)`` one batch at a time per session key.
+
+    ``debounce`` is the quiet period that closes a batch; ``max_wait`` caps
+    how long the oldest message can be held back by a steady stream of new
+    ones. Keys are independent: different sessions still run concurrently.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, list[T]], Awaitable[None]],
+        *,
+        debounce: float = 1.5,
+        max_wait: float = 5.0,
+        max_depth: int = 20,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.handler = handler
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.max_depth = max_depth
+        self._clock = clock
+        self._sessions: dict[str, _Session[T]] = {}
+
+    def submit(self, key: str, item: T, *, debounce: float | None = None) -> bool:
+        """Queue ``item`` for ``key``. Returns False if the session is full."""
+        session = self._sessions.get(key)
+        if session is None:
+            session = self._sessions[key] = _Session()
+        if len(session.pending) >= self.max_depth:
+            DROPPED.inc()
+            return False
+        now = self._clock()
+        if not session.pending:
+            session.first_at = now
+        wait = self.debounce if debounce is None else debounce
+        session.deadline = max(session.deadline, now + wait)
+        session.pending.append(item)
+        session.arrived.set()
+        QUEUE_DEPTH.inc()
+        self._ensure_worker(key, session)
+        return True
+
+    def _ensure_worker(self, key: str, session: _Session[T]) -> None:
+        if session.worker is None or session.worker.done():
+            session.worker = asyncio.create_task(self._run(key, session))
+
+    def depth(self, key: str) -> int:
+        session = self._sessions.get(key)
+        return len(session.pending) if session else 0
+
+    async def _collect(self, session: _Session[T]) -> list[T]:
+        while True:
+            now = self._clock()
+            close_at = min(session.deadline, session.first_at + self.max_wait)
+            if now >= close_at:
+                break
+            session.arrived.clear()
+            try:
+                await asyncio.wait_for(session.arrived.wait(), close_at - now)
+            except TimeoutError:
+                break
+        batch, session.pending = session.pending, []
+        QUEUE_DEPTH.inc(-len(batch))
+        return batch
+
+    async def _run(self, key: str, session: _Session[T]) -> None:
+        while session.pending:
+            first_at = session.first_at
+            batch = await self._collect(session)
+            BATCH_SIZE.observe(len(batch))
+            QUEUE_WAIT.observe(self._clock() - first_at)
+            try:
+                await self.handler(key, batch)
+            except Exception as e:  # noqa: BLE001 — one bad turn, not the session
+                TURN_ERRORS.inc()
+                print(f"⚠️ turn failed for {key}: {e!r}")
+        if self._sessions.get(key) is session:
+            del self._sessions[key]
+
+    async def drain(self) -> None:
+        """Wait until every queued message has been handled.
+
+        A session whose worker was cancelled with messages still queued gets
+        a new worker; one left with nothing queued is dropped.
+        """
+        while self._sessions:
+            for key, session in list(self._sessions.items()):
+                if session.pending:
+                    self._ensure_worker(key, session)
+                elif session.worker is None or session.worker.done():
+                    del self._sessions[key]
+            tasks = [s.worker for s in self._sessions.values() if s.worker]
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,333 @@
+"""Run graph turns in a pool of worker processes.
+
+Each worker process builds its own :class:`GraphRuntime` and runs turns on
+its own event loop. A turn is routed by ``crc32(thread_id) % workers``, so
+all turns of a thread go to the same worker (and the same in-memory
+checkpointer) and stay in order; the worker additionally runs one turn per
+thread at a time.
+
+Workers send a heartbeat every ``heartbeat`` seconds. :meth:`WorkerPool.health`
+reports liveness and load; :meth:`WorkerPool.check` restarts dead workers
+(their in-flight turns fail with :class:`WorkerError`). A restarted worker
+only gets its threads back from a durable checkpointer (sqlite); with the
+in-memory one they are lost, and ``check`` says so. :meth:`WorkerPool.close`
+stops accepting turns, lets in-flight ones finish, then shuts the workers down.
+
+:meth:`WorkerPool.call` runs a blocking read (``!dump``, ``!memory``) against
+the runtime of the worker that owns a thread, where its state lives.
+"""
+
+import asyncio
+import itertools
+import multiprocessing as mp
+import os
+import threading
+import time
+import weakref
+import zlib
+from collections.abc import AsyncIterator, Callable, Sequence
+from typing import TYPE_CHECKING, Any
+
+from .metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from .graph_setup import Line
+
+INFLIGHT = REGISTRY.gauge("worker_inflight_turns", "Turns sent to a worker process")
+RESTARTS = REGISTRY.counter("worker_restarts_total", "Worker processes restarted")
+
+_TURN = "turn"
+_CALL = "call"
+_DONE = "done"
+_CHUNK = "chunk"
+_ERROR = "error"
+_BEAT = "heartbeat"
+
+
+class WorkerError(RuntimeError):
+    """ワーカープロセスでターンが失敗したときの例外。"""
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+def _worker_main(
+    wid: int,
+    requests: "mp.Queue[Any]",
+    results: "mp.Queue[Any]",
+    runtime_factory: Callable[[], Any],
+    heartbeat: float,
+) -> None:
+    asyncio.run(_worker_loop(wid, requests, results, runtime_factory, heartbeat))
+
+
+async def _worker_loop(wid, requests, results, runtime_factory, heartbeat) -> None:
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    from .graph_setup import set_runtime, stream_tokens
+    from .tracing import PrintSink
+
+    runtime = runtime_factory()
+    set_runtime(runtime)
+    runtime.warm_up()  # build before reporting ready
+    durable = not isinstance(runtime.checkpointer, InMemorySaver)
+    loop = asyncio.get_running_loop()
+    inbox: asyncio.Queue[Any] = asyncio.Queue()
+    locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+        weakref.WeakValueDictionary()
+    )
+    running: set[asyncio.Task] = set()
+
+    def reader():
+        while True:
+            item = requests.get()
+            loop.call_soon_threadsafe(inbox.put_nowait, item)
+            if item is None:
+                return
+
+    threading.Thread(target=reader, daemon=True).start()
+
+    async def turn(req_id, thread_id, lines, persona_id, debug, tools):
+        lock = locks.get(thread_id)
+        if lock is None:
+            lock = locks[thread_id] = asyncio.Lock()
+        try:
+            async with lock:
+                async for delta in stream_tokens(
+                    thread_id, lines, persona_id, PrintSink() if debug else None, tools
+                ):
+                    results.put((req_id, _CHUNK, delta))
+            results.put((req_id, _DONE, None))
+        except Exception as e:  # noqa: BLE001 — 親プロセスに返す
+            results.put((req_id, _ERROR, f"{type(e).__name__}: {e}"))
+
+    async def call(req_id, attr, fn, args):
+        try:
+            target = getattr(runtime, attr)
+            result = None
+            if target is not None:
+                # SQLite reads and decoding stay off this worker's turn loop
+                result = await asyncio.to_thread(fn, target, *args)
+            results.put((req_id, _DONE, result))
+        except Exception as e:  # noqa: BLE001 — 親プロセスに返す
+            results.put((req_id, _ERROR, f"{type(e).__name__}: {e}"))
+
+    async def beat():
+        while True:
+            results.put((None, _BEAT, (wid, os.getpid(), len(running), durable)))
+            await asyncio.sleep(heartbeat)
+
+    beater = asyncio.create_task(beat())
+    while (item := await inbox.get()) is not None:
+        kind, *args = item
+        task = asyncio.create_task(call(*args) if kind == _CALL else turn(*args))
+        running.add(task)
+        task.add_done_callback(running.discard)
+    # drain: finish what was already accepted
+    await asyncio.gather(*running, return_exceptions=True)
+    await runtime.drain()
+    beater.cancel()
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+def _default_runtime():
+    from .graph_setup import GraphRuntime
+
+    return GraphRuntime()
+
+
+class WorkerPool:
+    """Process pool for graph turns; see the module docstring."""
+
+    def __init__(
+        self,
+        workers: int,
+        runtime_factory: Callable[[], Any] = _default_runtime,
+        *,
+        heartbeat: float = 2.0,
+    ):
+        self.size = workers
+        self.runtime_factory = runtime_factory
+        self.heartbeat = heartbeat
+        self._ctx = mp.get_context("spawn")
+        self._results: mp.Queue[Any] = self._ctx.Queue()
+        self._requests: list[mp.Queue[Any]] = []
+        self._procs: list[Any] = []
+        self._beats: dict[int, tuple[float, int, int]] = {}  # wid -> (t, pid, load)
+        self._durable: dict[int, bool] = {}  # wid -> threads survive a restart
+        self._streams: dict[int, tuple[asyncio.Queue[Any], int]] = {}
+        self._ids = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._closing = False
+        for wid in range(workers):
+            self._requests.append(self._ctx.Queue())
+            self._procs.append(self._spawn(wid))
+        threading.Thread(target=self._read_results, daemon=True).start()
+
+    def _spawn(self, wid: int):
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                wid,
+                self._requests[wid],
+                self._results,
+                self.runtime_factory,
+                self.heartbeat,
+            ),
+            name=f"myaa-worker-{wid}",
+            daemon=True,
+        )
+        proc.start()
+        return proc
+
+    def worker_for(self, thread_id: str) -> int:
+        return zlib.crc32(thread_id.encode()) % self.size
+
+    # -- results ------------------------------------------------------------
+    def _read_results(self) -> None:
+        while True:
+            try:
+                req_id, kind, payload = self._results.get()
+            except (EOFError, OSError):
+                return
+            if kind == _BEAT:
+                wid, pid, load, durable = payload
+                self._beats[wid] = (time.monotonic(), pid, load)
+                self._durable[wid] = durable
+                continue
+            entry = self._streams.get(req_id)
+            if entry and self._loop:
+                self._loop.call_soon_threadsafe(entry[0].put_nowait, (kind, payload))
+
+    # -- turns --------------------------------------------------------------
+    async def stream(
+        self,
+        thread_id: str,
+        lines: "Sequence[Line]",
+        persona_id: str,
+        debug: bool = False,
+        tools: Sequence[str] | None = None,
+    ) -> AsyncIterator[str]:
+        """Run a turn on the thread's worker and yield its text deltas."""
+        wid, req_id, inbox = self._open(thread_id)
+        INFLIGHT.inc(worker=wid)
+        try:
+            self._requests[wid].put(
+                (
+                    _TURN,
+                    req_id,
+                    thread_id,
+                    list(lines),
+                    persona_id,
+                    debug,
+                    list(tools) if tools is not None else None,
+                )
+            )
+            while True:
+                kind, payload = await inbox.get()
+                if kind == _CHUNK:
+                    yield payload
+                elif kind == _DONE:
+                    return
+                else:
+                    raise WorkerError(payload)
+        finally:
+            INFLIGHT.inc(-1, worker=wid)
+            self._streams.pop(req_id, None)
+
+    async def call(
+        self, thread_id: str, attr: str, fn: Callable[..., Any], *args: Any
+    ) -> Any:
+        """``fn(runtime.<attr>, *args)`` in the worker that owns ``thread_id``.
+
+        ``fn`` and its arguments are pickled, so ``fn`` must be importable
+        (a module-level function or a method of a module-level class).
+        Returns None when that worker's ``runtime.<attr>`` is None.
+        """
+        wid, req_id, inbox = self._open(thread_id)
+        try:
+            self._requests[wid].put((_CALL, req_id, attr, fn, args))
+            kind, payload = await inbox.get()
+            if kind == _ERROR:
+                raise WorkerError(payload)
+            return payload
+        finally:
+            self._streams.pop(req_id, None)
+
+    def _open(self, thread_id: str) -> tuple[int, int, asyncio.Queue[Any]]:
+        if self._closing:
+            raise WorkerError("worker pool is draining")
+        self._loop = asyncio.get_running_loop()
+        wid = self.worker_for(thread_id)
+        req_id = next(self._ids)
+        inbox: asyncio.Queue[Any] = asyncio.Queue()
+        self._streams[req_id] = (inbox, wid)
+        return wid, req_id, inbox
+
+    # -- health -------------------------------------------------------------
+    def health(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        out = []
+        for wid, proc in enumerate(self._procs):
+            beat = self._beats.get(wid)
+            age = now - beat[0] if beat else None
+            out.append(
+                {
+                    "worker": wid,
+                    "pid": proc.pid,
+                    "alive": proc.is_alive(),
+                    "ready": beat is not None,
+                    "heartbeat_age_s": round(age, 1) if age is not None else None,
+                    "healthy": proc.is_alive()
+                    and age is not None
+                    and age < 3 * self.heartbeat,
+                    "running": beat[2] if beat else 0,
+                    "inflight": sum(1 for _, w in self._streams.values() if w == wid),
+                }
+            )
+        return out
+
+    def check(self) -> int:
+        """Restart dead workers and fail their in-flight turns."""
+        restarted = 0
+        for wid, proc in enumerate(self._procs):
+            if proc.is_alive() or self._closing:
+                continue
+            for inbox, w in list(self._streams.values()):
+                if w == wid and self._loop:
+                    self._loop.call_soon_threadsafe(
+                        inbox.put_nowait, (_ERROR, f"worker {wid} died")
+                    )
+            self._beats.pop(wid, None)
+            if not self._durable.get(wid, True):
+                print(
+                    f"⚠️ worker {wid} を再起動しました。会話はメモリ上にしかなかったため"
+                    "失われています（CHECKPOINT_BACKEND=sqlite で残せます）"
+                )
+            self._requests[wid] = self._ctx.Queue()
+            self._procs[wid] = self._spawn(wid)
+            RESTARTS.inc()
+            restarted += 1
+        return restarted
+
+    async def wait_ready(self, timeout: float = 60.0) -> None:
+        deadline = time.monotonic() + timeout
+        while len(self._beats) < self.size:
+            if time.monotonic() > deadline:
+                raise WorkerError("workers did not become ready")
+            await asyncio.sleep(0.05)
+
+    async def close(self, timeout: float = 30.0) -> None:
+        """Graceful drain: no new turns, wait for in-flight ones, stop workers."""
+        self._closing = True
+        deadline = time.monotonic() + timeout
+        while self._streams and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for q in self._requests:
+            q.put(None)
+        for proc in self._procs:
+            await asyncio.to_thread(proc.join, max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.terminate()
@@ -0,0 +1,64 @@
+import sqlite3
+from typing import Annotated, TypedDict
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+from langgraph.graph import StateGraph
+from langgraph.graph.message import add_messages
+
+from myaa.src.checkpoint import SqliteSaver
+
+CONFIG = {"configurable": {"thread_id": "t"}}
+
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+
+
+def echo(state: State) -> dict:
+    return {"messages": [AIMessage(f"re: {state['messages'][-1].content}")]}
+
+
+def graph(saver):
+    builder = StateGraph(State)
+    builder.add_node("echo", echo)
+    builder.set_entry_point("echo")
+    return builder.compile(checkpointer=saver)
+
+
+def count(path: str, table: str) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_thread_round_trips_through_the_message_log(tmp_path):
+    path = str(tmp_path / "cp.sqlite")
+    saver = SqliteSaver(path, keep=3)
+    g = graph(saver)
+    for i in range(6):
+        g.invoke({"messages": [HumanMessage(f"q{i}")]}, CONFIG)
+    saver.close()
+
+    assert count(path, "checkpoints") == 3  # keep-K pruning
+    # every kept checkpoint refers to most of the 12 messages; each is stored once
+    assert count(path, "messages") == 12
+
+    reopened = SqliteSaver(path, keep=3)  # cold: read from disk, not the cache
+    state = graph(reopened).get_state(CONFIG)
+    contents = [m.content for m in state.values["messages"]]
+    assert contents == [t for i in range(6) for t in (f"q{i}", f"re: q{i}")]
+    assert [type(m) for m in state.values["messages"][:2]] == [HumanMessage, AIMessage]
+    reopened.close()
+
+
+def test_pruning_drops_messages_no_checkpoint_refers_to(tmp_path):
+    path = str(tmp_path / "cp.sqlite")
+    saver = SqliteSaver(path, keep=2)
+    g = graph(saver)
+    for i in range(3):
+        g.invoke({"messages": [HumanMessage(f"q{i}")]}, CONFIG)
+    old = g.get_state(CONFIG).values["messages"][:2]
+    g.update_state(CONFIG, {"messages": [RemoveMessage(id=m.id) for m in old]})
+    for i in range(3, 5):
+        g.invoke({"messages": [HumanMessage(f"q{i}")]}, CONFIG)
+    saver.close()
+    assert count(path, "messages") == 8  # q0 / re: q0 are gone
@@ -0,0 +1,56 @@
+from typing import Annotated, TypedDict
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import StateGraph
+from langgraph.graph.message import add_messages
+
+from myaa.src import inspection
+from myaa.src.checkpoint import MemorySaver, SqliteSaver
+
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+
+
+def echo(state: State) -> dict:
+    return {"messages": [AIMessage(f"re: {state['messages'][-1].content}")]}
+
+
+def fill(saver, turns: int = 12) -> None:
+    builder = StateGraph(State)
+    builder.add_node("echo", echo)
+    builder.set_entry_point("echo")
+    graph = builder.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "t"}}
+    for i in range(turns):
+        graph.invoke({"messages": [HumanMessage(f"q{i}")]}, config)
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def saver(request, tmp_path):
+    if request.param == "memory":
+        yield MemorySaver()
+        return
+    saver = SqliteSaver(str(tmp_path / "cp.sqlite"))
+    yield saver
+    saver.close()
+
+
+def test_stats_and_pages_agree(saver):
+    fill(saver)
+    stats = inspection.thread_stats(saver, "1:2", "t")
+    assert stats is not None and stats.messages == 24
+    assert stats.checkpoint_bytes
+    view = inspection.message_page(saver, "1:2", "t", page=2, page_size=10)
+    assert view is not None and (view.page, view.pages) == (2, 3)
+    assert view.lines[0] == "[user][user] q2"
+    assert view.lines[-1] == "[ai][ai] re: q6"
+
+
+def test_sqlite_stats_do_not_decode_messages(tmp_path, monkeypatch):
+    saver = SqliteSaver(str(tmp_path / "cp.sqlite"))
+    fill(saver)
+    monkeypatch.setattr(saver, "_decode_message", None)  # any decode fails
+    stats = inspection.thread_stats(saver, "1:2", "t")
+    assert stats is not None and stats.messages == 24 and stats.tokens is None
@@ -0,0 +1,62 @@
+import asyncio
+
+from langchain_core.messages import HumanMessage
+
+from myaa.src.embeddings import HashingEmbedder
+from myaa.src.memory import (
+    LongTermMemory,
+    Memory,
+    key_facts,
+    memory_prompt,
+    turn_query,
+)
+
+
+def human(speakers: str, content: str, ids: dict | None = None) -> HumanMessage:
+    extra: dict = {"name": speakers}
+    if ids:
+        extra["speaker_ids"] = ids
+    return HumanMessage(content=content, additional_kwargs=extra)
+
+
+def test_speakers_are_keyed_by_author_id():
+    msg = human("alice, 時報", "alice: 猫が好き\n時報: 0時です", {"alice": "42"})
+    speakers, query = turn_query(msg)
+    assert speakers == ["42", "時報"]
+    assert query == "猫が好き\n0時です"
+
+
+def test_renamed_impostor_gets_their_own_key():
+    real = turn_query(human("alice", "alice: hi", {"alice": "42"}))[0]
+    impostor = turn_query(human("alice", "alice: hi", {"alice": "666"}))[0]
+    assert real != impostor
+
+
+def test_facts_are_rekeyed_by_speaker_id():
+    facts = [("alice", "likes cats"), ("", "the office is in Kyoto"), ("carol", "x")]
+    assert key_facts(facts, {"alice": "42"}) == [
+        ("42", "likes cats"),
+        ("", "the office is in Kyoto"),
+        ("", "carol: x"),
+    ]
+
+
+def test_prompt_shows_current_display_names():
+    prompt = memory_prompt([Memory(1, "42", "likes cats")], {"42": "alice"})
+    assert prompt.splitlines()[-1] == "- (alice) likes cats"
+
+
+def test_recall_cache_sees_writes_from_another_process(tmp_path):
+    # two stores on one directory stand in for two worker processes
+    reader = LongTermMemory(str(tmp_path), HashingEmbedder(), min_score=0.0)
+    writer = LongTermMemory(str(tmp_path), HashingEmbedder(), min_score=0.0)
+
+    async def main():
+        await writer.add("a", [("42", "猫が好き")])
+        first = await reader.recall("a", ["42"], "猫")
+        assert await reader.recall("a", ["42"], "猫") is first  # cached
+        await writer.add("a", [("42", "犬も飼っている")])
+        return await reader.recall("a", ["42"], "猫")
+
+    texts = sorted(m.text for m in asyncio.run(main()))
+    assert texts == ["犬も飼っている", "猫が好き"]
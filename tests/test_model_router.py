@@ -0,0 +1,150 @@
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Any
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from myaa.src.model_router import AllRoutesFailed, ModelRouter, RouterStats
+
+PROMPT = [HumanMessage("hi")]
+
+
+class StubModel(BaseChatModel):
+    """Streams ``reply`` after ``delay`` seconds, or raises if ``fail``."""
+
+    reply: str = "ok"
+    delay: float = 0.0
+    fail: bool = False
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    async def _astream(
+        self, messages, stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("503")
+        yield ChatGenerationChunk(message=AIMessageChunk(content=self.reply))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(self.reply))])
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_router(*models: StubModel, **kwargs: Any) -> ModelRouter:
+    names = "abcdef"
+    return ModelRouter(routes=[(names[i], m) for i, m in enumerate(models)], **kwargs)
+
+
+def test_fails_over_to_the_next_route():
+    a, b = StubModel(fail=True), StubModel(reply="from b")
+    router = make_router(a, b)
+    reply = asyncio.run(router.ainvoke(PROMPT))
+    assert reply.content == "from b"
+    assert (a.calls, b.calls) == (1, 1)
+    assert router.stats()["a"]["error"] == 1
+
+
+def test_timeout_counts_as_failure():
+    a, b = StubModel(delay=1.0), StubModel(reply="from b")
+    router = make_router(a, b, timeout=0.05)
+    assert asyncio.run(router.ainvoke(PROMPT)).content == "from b"
+    assert router.stats()["a"]["timeout"] == 1
+
+
+def test_all_routes_failed():
+    router = make_router(StubModel(fail=True), StubModel(fail=True))
+    with pytest.raises(AllRoutesFailed):
+        asyncio.run(router.ainvoke(PROMPT))
+
+
+def test_no_routes_fails_cleanly():
+    with pytest.raises(AllRoutesFailed, match="no model route"):
+        asyncio.run(make_router().ainvoke(PROMPT))
+
+
+def test_open_breaker_skips_route_until_cooldown():
+    clock = FakeClock()
+    a, b = StubModel(fail=True), StubModel(reply="from b")
+    stats = RouterStats(failures=2, cooldown=30, clock=clock)
+    router = make_router(a, b, router_stats=stats)
+    for _ in range(3):
+        asyncio.run(router.ainvoke(PROMPT))
+    assert a.calls == 2  # open after two failures
+    assert router.stats()["a"]["state"] == "open"
+    clock.now = 31
+    a.fail = False
+    assert asyncio.run(router.ainvoke(PROMPT)).content == "ok"  # the trial
+    assert router.stats()["a"]["state"] == "closed"
+
+
+def test_unused_route_keeps_its_half_open_trial():
+    clock = FakeClock()
+    a, b = StubModel(reply="from a"), StubModel(reply="from b")
+    stats = RouterStats(failures=1, cooldown=30, clock=clock)
+    router = make_router(a, b, router_stats=stats)
+    stats.record("b", "error")
+    clock.now = 31
+    assert asyncio.run(router.ainvoke(PROMPT)).content == "from a"
+    breaker = stats["b"].breaker
+    assert breaker.state == "half_open" and not breaker.trial
+    # the primary trips: the next turn goes straight to b's trial
+    stats.record("a", "error")
+    a.delay = 10
+    assert asyncio.run(router.ainvoke(PROMPT)).content == "from b"
+    assert a.calls == 1
+    assert stats["b"].breaker.state == "closed"
+
+
+def test_every_breaker_open_still_tries_routes():
+    stats = RouterStats(failures=1, cooldown=30, clock=FakeClock())
+    a, b = StubModel(reply="from a"), StubModel()
+    router = make_router(a, b, router_stats=stats)
+    stats.record("a", "error")
+    stats.record("b", "error")
+    assert asyncio.run(router.ainvoke(PROMPT)).content == "from a"
+
+
+def test_hedge_takes_the_faster_route_and_frees_the_loser():
+    clock = FakeClock()
+    a, b = StubModel(delay=1.0, reply="from a"), StubModel(reply="from b")
+    stats = RouterStats(failures=1, cooldown=30, clock=clock)
+    router = make_router(a, b, hedge=True, hedge_min=0.05, router_stats=stats)
+    for _ in range(5):  # a's usual time to first chunk
+        stats.record("a", "ok", 0.01)
+    assert asyncio.run(router.ainvoke(PROMPT)).content == "from b"
+    assert router.stats()["a"]["hedge_lost"] == 1
+    # a trial that lost a hedge is given back, not held forever
+    stats.record("a", "error")
+    clock.now = 31
+    assert stats["a"].breaker.allow()
+    stats.record("a", "hedge_lost")
+    assert not stats["a"].breaker.trial
+
+
+def test_sync_invoke_uses_the_failover_path():
+    router = make_router(StubModel(fail=True), StubModel(reply="from b"))
+    assert router.invoke(PROMPT).content == "from b"
+
+
+def test_streams_once():
+    router = make_router(StubModel(fail=True), StubModel(reply="from b"))
+
+    async def collect() -> str:
+        return "".join([str(c.content) async for c in router.astream(PROMPT)])
+
+    assert asyncio.run(collect()) == "from b"
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from myaa.src.personas import Persona, PersonaConfigError, PersonaRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def write(path, text: str, mtime: float) -> None:
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+YAML = """\
+default_persona: a
+a:
+  name: {name}
+  description: calm
+"""
+
+
+def test_reloads_when_the_file_changes(tmp_path):
+    path = tmp_path / "personas.yaml"
+    write(path, YAML.format(name="Alpha"), 1)
+    clock = FakeClock()
+    registry = PersonaRegistry(str(path), check_interval=2, clock=clock)
+    held = registry.get("a")
+    assert "You are Alpha." in held.system_message.content
+
+    write(path, YAML.format(name="Beta"), 2)
+    clock.now = 1  # not checked again before check_interval
+    assert registry.get("a").name == "Alpha"
+    clock.now = 3
+    assert registry.get("a").name == "Beta"
+    assert held.name == "Alpha"  # a running turn keeps its persona
+
+
+def test_broken_file_keeps_the_previous_personas(tmp_path, capsys):
+    path = tmp_path / "personas.yaml"
+    write(path, YAML.format(name="Alpha"), 1)
+    clock = FakeClock()
+    registry = PersonaRegistry(str(path), check_interval=2, clock=clock)
+    write(path, "a: [unclosed", 2)
+    clock.now = 3
+    assert not registry.maybe_reload()
+    assert registry.get("a").name == "Alpha"
+    assert "personas.yaml" in capsys.readouterr().out
+
+
+def test_unknown_id_gets_a_fallback_persona():
+    registry = PersonaRegistry(data={"a": {"name": "A", "description": "d"}})
+    assert registry.get("zzz") is registry.get("zzz")
+    assert registry.get("zzz") == Persona.fallback("zzz")
+
+
+def test_invalid_persona_is_rejected():
+    with pytest.raises(PersonaConfigError):
+        PersonaRegistry(data={"a": {"name": "A", "tools": "search"}})
@@ -0,0 +1,34 @@
+import asyncio
+
+from myaa.src.tools.remo_mirror import DEVICES, RemoEvent, RemoMirror
+
+
+def crossings(readings: list[float], hysteresis: float = 0.5) -> list[str]:
+    seen: list[RemoEvent] = []
+
+    async def main():
+        mirror = RemoMirror(None, hysteresis=hysteresis)  # type: ignore[arg-type]
+        mirror.set_thresholds([28.0])
+
+        async def handler(event: RemoEvent):
+            seen.append(event)
+
+        mirror.subscribe(handler)
+        for value in readings:
+            mirror._diff(DEVICES, {"d": {"newest_events": {"te": {"val": value}}}})
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    return [e.direction or "" for e in seen if e.kind == "threshold"]
+
+
+def test_jitter_around_a_threshold_fires_once():
+    assert crossings([27.5, 28.0, 27.9, 28.1, 27.8, 28.2]) == ["up"]
+
+
+def test_leaving_the_band_re_arms_the_watch():
+    assert crossings([27.0, 28.6, 28.0, 27.4, 28.5]) == ["up", "down", "up"]
+
+
+def test_no_hysteresis_fires_on_every_crossing():
+    assert crossings([27.9, 28.0, 27.9], hysteresis=0) == ["up", "down"]
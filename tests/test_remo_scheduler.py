@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import pytest
+
+from myaa.src.tools.remo_scheduler import (
+    RemoAPIError,
+    RemoCommandOverridden,
+    RemoScheduler,
+)
+
+
+class StubSend:
+    """Records requests; ``fail[path]`` lists exceptions to raise first."""
+
+    def __init__(self, fail=None):
+        self.fail = fail or {}
+        self.sent: list[tuple[str, str, dict | None]] = []
+
+    async def __call__(self, method, path, data):
+        self.sent.append((method, path, data))
+        errors = self.fail.get(path)
+        if errors:
+            raise errors.pop(0)
+        return {"path": path, "data": data}, {}
+
+
+def test_429_backoff_does_not_stall_other_requests():
+    reset = str(time.time() + 600)
+    send = StubSend(
+        {"/a": [RemoAPIError(429, "slow down", {"X-Rate-Limit-Reset": reset})]}
+    )
+
+    async def main():
+        scheduler = RemoScheduler(send)
+        a = asyncio.ensure_future(scheduler.submit("GET", "/a"))
+        await asyncio.sleep(0)
+        b = await asyncio.wait_for(scheduler.submit("GET", "/b"), 1)
+        assert b["path"] == "/b"
+        assert not a.done() and scheduler.depth == 1  # waiting for the reset
+        a.cancel()
+        await scheduler.close()
+
+    asyncio.run(main())
+
+
+def test_get_is_retried_after_a_timeout():
+    send = StubSend({"/a": [TimeoutError()]})
+
+    async def main():
+        scheduler = RemoScheduler(send, base_delay=0.01)
+        assert (await scheduler.submit("GET", "/a"))["path"] == "/a"
+        await scheduler.close()
+
+    asyncio.run(main())
+    assert len(send.sent) == 2
+
+
+@pytest.mark.parametrize("error", [TimeoutError(), RemoAPIError(502, "bad gateway")])
+def test_post_is_not_resent_after_an_ambiguous_failure(error):
+    send = StubSend({"/appliances/l/light": [error]})
+
+    async def main():
+        scheduler = RemoScheduler(send, base_delay=0.01)
+        with pytest.raises(type(error)):
+            await scheduler.submit(
+                "POST", "/appliances/l/light", {"button": "bright-up"}
+            )
+        await scheduler.close()
+
+    asyncio.run(main())
+    assert len(send.sent) == 1
+
+
+def test_rate_follows_the_limit_header():
+    scheduler = RemoScheduler(StubSend(), limit=30, window=300)
+    scheduler._observe_headers({"X-Rate-Limit-Limit": "60"})
+    assert scheduler._rate == pytest.approx(60 / 300)
+
+
+def test_overridden_aircon_command_is_reported():
+    send = StubSend()
+    path = "/appliances/ac/aircon_settings"
+
+    async def main():
+        scheduler = RemoScheduler(send)
+        first = asyncio.ensure_future(
+            scheduler.submit("POST", path, {"button": "power-off"})
+        )
+        again = asyncio.ensure_future(
+            scheduler.submit("POST", path, {"button": "power-off"})
+        )
+        last = asyncio.ensure_future(
+            scheduler.submit("POST", path, {"operation_mode": "cool"})
+        )
+        results = await asyncio.gather(first, again, last, return_exceptions=True)
+        await scheduler.close()
+        return results
+
+    first, again, last = asyncio.run(main())
+    assert isinstance(first, RemoCommandOverridden)
+    assert isinstance(again, RemoCommandOverridden)
+    assert last["data"] == {"operation_mode": "cool"}
+    assert len(send.sent) == 1
+
+
+def test_identical_commands_share_one_request():
+    send = StubSend()
+    path = "/appliances/l/light"
+
+    async def main():
+        scheduler = RemoScheduler(send)
+        results = await asyncio.gather(
+            *(scheduler.submit("POST", path, {"button": "off"}) for _ in range(3))
+        )
+        await scheduler.close()
+        return results
+
+    assert all(r["data"] == {"button": "off"} for r in asyncio.run(main()))
+    assert len(send.sent) == 1
@@ -0,0 +1,81 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+
+from myaa.src.embeddings import HashingEmbedder
+from myaa.src.response_cache import ResponseCache
+from myaa.src.tool_cache import invalidates
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@invalidates("light")
+@tool
+def set_light(action: str) -> str:
+    """Switch the light."""
+    return "ok"
+
+
+def human(speaker: str, text: str) -> HumanMessage:
+    return HumanMessage(f"{speaker}: {text}", additional_kwargs={"name": speaker})
+
+
+def ask(cache: ResponseCache, text: str, speaker: str = "alice") -> str | None:
+    """Look ``text`` up; on a miss, store ``"re: <text>"`` as the answer."""
+    key = cache.key("a", [], [human(speaker, text)])
+    assert key is not None
+    reply = asyncio.run(cache.get(key))
+    if reply is None:
+        cache.put(key, AIMessage(f"re: {text}"), 1.0)
+    return reply
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    cache = ResponseCache()
+    assert ask(cache, "おはよう！") is None
+    assert ask(cache, "  おはよう") == "re: おはよう！"
+    assert ask(cache, "おはよう", speaker="bob") is None  # other speakers
+    stats = cache.stats()["a"]
+    assert (stats["hits"], stats["misses"], stats["saved_s"]) == (1, 2, 1.0)
+
+
+def test_similar_prompt_hits_above_min_score():
+    cache = ResponseCache(embedder=HashingEmbedder(), min_score=0.7)
+    ask(cache, "電気をつけて")
+    assert ask(cache, "電気つけて") == "re: 電気をつけて"
+    assert ask(cache, "電気を消して") is None  # not similar enough
+    assert cache.stats()["a"]["similar_hits"] == 1
+
+
+def test_entries_expire_and_lru_keeps_max_entries():
+    clock = FakeClock()
+    cache = ResponseCache(max_entries=2, ttl=60, clock=clock)
+    for text in ("a", "b", "c"):
+        ask(cache, text)
+    assert ask(cache, "a") is None  # evicted, least recently used
+    assert ask(cache, "c") == "re: c"
+    clock.now = 61
+    assert ask(cache, "c") is None
+
+
+def test_side_effecting_tool_call_bypasses_the_prompt():
+    cache = ResponseCache(embedder=HashingEmbedder(), min_score=0.7)
+    key = cache.key("a", [], [human("alice", "電気をつけて")], ["set_light"])
+    assert key is not None and asyncio.run(cache.get(key)) is None
+    call = {"name": "set_light", "args": {"action": "on"}, "id": "c"}
+    cache.put(key, AIMessage("", tool_calls=[call]), 1.0, [set_light])
+
+    # the same prompt, or a similar one, goes to the model again
+    for text in ("電気をつけて", "電気つけて"):
+        again = cache.key("a", [], [human("alice", text)], ["set_light"])
+        assert again is not None and asyncio.run(cache.get(again)) is None
+        assert again.bypass
+        cache.put(again, AIMessage("つけました"), 1.0, [set_light])
+    assert cache.stats()["a"]["bypassed"] == 2
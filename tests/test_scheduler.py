@@ -0,0 +1,119 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from myaa.src.scheduler import JST, CronError, CronSpec, Job, Scheduler
+
+EVERY_MINUTE = "* * * * *"
+
+
+class Recorder:
+    def __init__(self):
+        self.fired: list[Job] = []
+
+    async def __call__(self, job: Job) -> None:
+        self.fired.append(job)
+
+
+def run_due(scheduler: Scheduler) -> int:
+    async def main() -> int:
+        fired = await scheduler.run_due()
+        await scheduler.drain()
+        return fired
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize(
+    "cron, after, expected",
+    [
+        ("0 0 * * *", (2026, 10, 17, 12, 34), (2026, 10, 18, 0, 0)),
+        ("*/15 9-17 * * 1-5", (2026, 10, 16, 17, 50), (2026, 10, 19, 9, 0)),
+        ("30 7 * * *", (2026, 10, 17, 7, 30), (2026, 10, 18, 7, 30)),
+        ("0 0 1 * *", (2026, 12, 15, 0, 0), (2027, 1, 1, 0, 0)),
+        ("0 0 29 2 *", (2026, 3, 1, 0, 0), (2028, 2, 29, 0, 0)),
+        # day and weekday both restricted: either matches (the 23rd is a Friday)
+        ("0 0 13 * 5", (2026, 10, 17, 12, 0), (2026, 10, 23, 0, 0)),
+        # "*/2" is not a restriction: odd days that are also Mondays
+        ("0 0 */2 * 1", (2026, 10, 20, 0, 0), (2026, 11, 9, 0, 0)),
+        ("0 0 * * 7", (2026, 10, 17, 0, 0), (2026, 10, 18, 0, 0)),
+    ],
+)
+def test_next_after(cron, after, expected):
+    got = CronSpec.parse(cron).next_after(datetime(*after, tzinfo=JST))
+    assert got == datetime(*expected, tzinfo=JST)
+
+
+@pytest.mark.parametrize("cron", ["* * * *", "60 * * * *", "0 0 31 2 *", "x * * * *"])
+def test_bad_cron(cron):
+    with pytest.raises(CronError):
+        CronSpec.parse(cron).next_after(datetime(2026, 1, 1, tzinfo=JST))
+
+
+def test_a_slot_does_not_fire_again_after_a_restart(tmp_path):
+    path = str(tmp_path / "schedule.sqlite")
+    now = [0.0]
+    before = Recorder()
+    scheduler = Scheduler(before, path, clock=lambda: now[0])
+    job = scheduler.add(1, EVERY_MINUTE, "hi")
+    now[0] = job.next_run + 1
+    assert run_due(scheduler) == 1
+    after = Recorder()
+    restarted = Scheduler(after, path, clock=lambda: now[0])
+    assert run_due(restarted) == 0
+    assert restarted.jobs()[0].next_run == job.next_run + 60
+    assert len(before.fired) == 1 and after.fired == []
+
+
+@pytest.mark.parametrize("late, fires", [(100, 1), (1000, 0)])
+def test_missed_slot_fires_only_within_the_grace(tmp_path, late, fires):
+    path = str(tmp_path / "schedule.sqlite")
+    now = [0.0]
+    job = Scheduler(Recorder(), path, clock=lambda: now[0]).add(1, "0 0 * * *", "hi")
+    now[0] = job.next_run + late  # the bot was down over the slot
+    restarted = Scheduler(Recorder(), path, misfire_grace=300, clock=lambda: now[0])
+    assert run_due(restarted) == fires
+    assert restarted.jobs()[0].next_run == job.next_run + 86400
+
+
+def test_channel_index_follows_add_and_remove():
+    scheduler = Scheduler(Recorder())
+    jihou = scheduler.add(1, "0 0 * * *", "off", kind="jihou")
+    scheduler.add(2, EVERY_MINUTE, "hi")
+    assert scheduler.has_job(1, "jihou") and not scheduler.has_job(2, "jihou")
+    assert [j.id for j in scheduler.jobs(1)] == [jihou.id]
+    scheduler.remove(jihou.id)
+    assert not scheduler.has_job(1, "jihou") and scheduler.jobs(1) == []
+
+
+def test_job_removed_by_another_process_does_not_come_back(tmp_path):
+    path = str(tmp_path / "schedule.sqlite")
+    now = [0.0]
+    stale = Scheduler(Recorder(), path, clock=lambda: now[0])
+    job = stale.add(1, EVERY_MINUTE, "hi")
+    Scheduler(Recorder(), path).remove(job.id)  # !schedule rm elsewhere
+    now[0] = job.next_run
+    assert run_due(stale) == 0
+    assert stale.jobs() == []
+    assert Scheduler(Recorder(), path).jobs() == []
+
+
+def test_a_slot_fires_in_one_process_only(tmp_path):
+    path = str(tmp_path / "schedule.sqlite")
+    now = [0.0]
+    first = Scheduler(Recorder(), path, clock=lambda: now[0])
+    job = first.add(1, EVERY_MINUTE, "hi")
+    second = Scheduler(Recorder(), path, clock=lambda: now[0])
+    now[0] = job.next_run
+    assert run_due(first) + run_due(second) == 1
+
+
+def test_shard_loads_only_its_guilds(tmp_path):
+    path = str(tmp_path / "schedule.sqlite")
+    scheduler = Scheduler(Recorder(), path)
+    mine = scheduler.add(1, EVERY_MINUTE, "a", guild_id=10)
+    scheduler.add(2, EVERY_MINUTE, "b", guild_id=11)
+    unknown = scheduler.add(3, EVERY_MINUTE, "c")
+    shard = Scheduler(Recorder(), path, owns=lambda guild_id: guild_id == 10)
+    assert {j.id for j in shard.jobs()} == {mine.id, unknown.id}
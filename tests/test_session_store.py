@@ -0,0 +1,21 @@
+import asyncio
+
+from myaa.src.session_manager import SessionManager
+from myaa.src.session_store import SqliteStore
+
+
+def test_async_writes_reach_the_file(tmp_path):
+    path = str(tmp_path / "sessions.sqlite")
+    store = SqliteStore(path)
+
+    async def main() -> str:
+        await store.aput("joined", "1:2", "1", shard=1)
+        await store.aput("debug", "1:2", "1", shard=1)
+        await store.adelete("debug", "1:2")
+        return await SessionManager(store).aresolve("1:2")
+
+    thread_id = asyncio.run(main())
+    again = SqliteStore(path)
+    assert again.get("joined", "1:2") == "1"
+    assert again.get("debug", "1:2") is None
+    assert SessionManager(again).resolve("1:2") == thread_id
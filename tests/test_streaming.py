@@ -0,0 +1,79 @@
+import asyncio
+
+from myaa.adapter.discord.streaming import ProgressiveReply, split_point
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Message:
+    def __init__(self, content: str):
+        self.content = content
+        self.edits = 0
+
+    async def edit(self, *, content: str) -> None:
+        self.content = content
+        self.edits += 1
+
+
+class Channel:
+    def __init__(self):
+        self.messages: list[Message] = []
+
+    async def send(self, content: str) -> Message:
+        self.messages.append(Message(content))
+        return self.messages[-1]
+
+
+def stream(chunks: list[str], limit: int, clock: FakeClock | None = None):
+    channel = Channel()
+    reply = ProgressiveReply(channel, limit=limit, clock=clock or FakeClock())
+
+    async def main() -> None:
+        for chunk in chunks:
+            await reply.feed(chunk)
+        await reply.close()
+
+    asyncio.run(main())
+    return channel.messages
+
+
+def test_split_point_prefers_newline_then_space():
+    assert split_point("short", 10) == 5
+    assert split_point("aaaa bb\ncc dddd", 10) == 8  # after the newline
+    assert split_point("aaaaaa bbbbbbbb", 10) == 7  # after the space
+    assert split_point("a" * 15, 10) == 10  # nothing in the window: hard cut
+    assert split_point("a\n" + "b" * 13, 10) == 10  # newline too early
+
+
+def test_long_reply_continues_in_new_messages():
+    text = "".join(f"line {i}\n" for i in range(20))  # 150 chars
+    messages = stream([text[i : i + 7] for i in range(0, len(text), 7)], limit=40)
+    contents = [m.content for m in messages]
+    assert "".join(contents) == text
+    assert all(len(c) <= 40 for c in contents)
+    assert all(c.endswith("\n") for c in contents)  # cut at line ends
+
+
+def test_edits_wait_for_the_interval():
+    clock = FakeClock()
+    channel = Channel()
+    reply = ProgressiveReply(channel, interval=1.0, clock=clock)
+
+    async def main() -> None:
+        await reply.feed("a")  # sent right away
+        await reply.feed("b")  # folded into a later edit
+        clock.now = 1.0
+        await reply.feed("c")
+        await reply.feed("d")
+        await reply.close()
+
+    asyncio.run(main())
+    (message,) = channel.messages
+    assert message.content == "abcd"
+    assert message.edits == 2  # "abc" after the interval, "abcd" on close
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import MessagesState, StateGraph
+
+from myaa.src import telemetry
+from myaa.src.checkpoint import MemorySaver, SqliteSaver
+from myaa.src.tracing import JsonlSink
+
+
+def test_jsonl_sink_appends_on_flush_and_close(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    sink = JsonlSink(str(path), flush_every=2)
+    assert not path.exists()  # nothing is opened until there is a batch
+    sink.emit({"n": 1})
+    assert not path.exists()
+    sink.emit({"n": 2})
+    sink.emit({"n": 3})
+    assert len(path.read_text().splitlines()) == 2
+    sink.close()
+    lines = path.read_text().splitlines()
+    assert [json.loads(line)["n"] for line in lines] == [1, 2, 3]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def saver(request, tmp_path):
+    if request.param == "memory":
+        yield MemorySaver()
+        return
+    saver = SqliteSaver(str(tmp_path / "cp.sqlite"))
+    yield saver
+    saver.close()
+
+
+def test_turn_records_checkpoint_size(saver):
+    builder = StateGraph(MessagesState)
+    builder.add_node("echo", lambda s: {"messages": [AIMessage("re: hi")]})
+    builder.set_entry_point("echo")
+    graph = builder.compile(checkpointer=saver)
+    with telemetry.turn("1:2") as t:
+        graph.invoke(
+            {"messages": [HumanMessage("hi")]}, {"configurable": {"thread_id": "t"}}
+        )
+    assert t.checkpoint_bytes > 0
+    assert saver.checkpoint_size("t") == t.checkpoint_bytes
+    assert saver.checkpoint_size("missing") is None
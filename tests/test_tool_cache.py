@@ -0,0 +1,93 @@
+import asyncio
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+from myaa.src.tool_cache import ToolCache, cacheable, invalidates
+from myaa.src.tool_exec import ParallelToolNode
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+clock = FakeClock()
+snapshot = {"fetched": clock.now, "power": "ON"}
+runs = {"status": 0}
+
+
+def note(age: float) -> str:
+    return f" ({age:.0f}s old)" if age >= 60 else ""
+
+
+@cacheable(30, tags=("light",), age=lambda: clock.now - snapshot["fetched"], note=note)
+@tool
+def get_light_status() -> str:
+    """Light status."""
+    runs["status"] += 1
+    return snapshot["power"]
+
+
+@invalidates("light")
+@tool
+def set_light(action: str) -> str:
+    """Switch the light."""
+    snapshot.update(fetched=clock.now, power=action.upper())
+    return "ok"
+
+
+def call(node: ParallelToolNode, name: str, **args) -> str:
+    step = AIMessage("", tool_calls=[{"name": name, "args": args, "id": "c"}])
+    out = asyncio.run(node.run({"messages": [step]}, {"configurable": {}}))
+    return out["messages"][0].content
+
+
+def make_node(**kwargs) -> ParallelToolNode:
+    clock.now = 1000.0
+    snapshot.update(fetched=clock.now, power="ON")
+    runs["status"] = 0
+    cache = ToolCache(clock=clock, **kwargs)
+    return ParallelToolNode([get_light_status, set_light], cache=cache)
+
+
+def test_results_expire_after_their_ttl():
+    node = make_node()
+    assert call(node, "get_light_status") == "ON"
+    clock.now += 29
+    assert call(node, "get_light_status") == "ON"
+    assert runs["status"] == 1
+    clock.now += 2
+    call(node, "get_light_status")
+    assert runs["status"] == 2
+
+
+def test_side_effect_invalidates_tagged_results():
+    node = make_node()
+    call(node, "get_light_status")
+    assert call(node, "set_light", action="off") == "ok"
+    assert call(node, "get_light_status") == "OFF"
+    assert runs["status"] == 2
+
+
+def test_staleness_note_is_added_when_served():
+    node = make_node()
+    clock.now += 50  # the snapshot is 50s old: no note yet
+    assert call(node, "get_light_status") == "ON"
+    clock.now += 20  # served from cache, but the data is now 70s old
+    assert call(node, "get_light_status") == "ON (70s old)"
+    assert runs["status"] == 1
+
+
+def test_lru_keeps_max_entries():
+    cache = ToolCache(max_entries=2, clock=clock)
+
+    async def main():
+        for q in ("a", "b", "c"):
+            await cache.put(get_light_status, {"q": q}, q, 0.1)
+        return [await cache.get(get_light_status, {"q": q}) for q in "abc"]
+
+    assert asyncio.run(main()) == [None, "b", "c"]
@@ -0,0 +1,65 @@
+import asyncio
+import json
+from typing import Annotated
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import InjectedToolCallId, tool
+
+from myaa.src.tool_exec import ParallelToolNode
+
+
+@tool
+def get_current_time() -> str:
+    """Current time."""
+    return "12:00"
+
+
+@tool
+def set_light(action: str) -> str:
+    """Switch the light."""
+    return f"light {action}"
+
+
+@tool(response_format="content_and_artifact")
+def snapshot(tool_call_id: Annotated[str, InjectedToolCallId]) -> tuple[str, dict]:
+    """Camera snapshot."""
+    return f"taken by {tool_call_id}", {"jpeg": b"..."}
+
+
+def step(*names: str) -> dict:
+    calls = [
+        {"name": name, "args": {"action": "off"} if name == "set_light" else {}}
+        for name in names
+    ]
+    return {
+        "messages": [
+            AIMessage(
+                content="",
+                tool_calls=[{**c, "id": f"call-{i}"} for i, c in enumerate(calls)],
+            )
+        ]
+    }
+
+
+def test_only_the_turns_tools_run():
+    node = ParallelToolNode([get_current_time, set_light])
+    config = {"configurable": {"tools": ("get_current_time",)}}
+    out = asyncio.run(node.run(step("get_current_time", "set_light"), config))
+    allowed, refused = out["messages"]
+    assert allowed.content == "12:00"
+    assert json.loads(refused.content)["error"] == "unknown_tool"
+
+
+def test_no_tool_list_means_every_tool():
+    node = ParallelToolNode([get_current_time, set_light])
+    out = asyncio.run(node.run(step("set_light"), {"configurable": {"tools": None}}))
+    assert out["messages"][0].content == "light off"
+
+
+def test_tool_call_protocol_is_kept():
+    node = ParallelToolNode([snapshot])
+    out = asyncio.run(node.run(step("snapshot"), {"configurable": {"tools": None}}))
+    msg = out["messages"][0]
+    assert msg.content == "taken by call-0"  # injected tool_call_id
+    assert msg.artifact == {"jpeg": b"..."}
+    assert msg.tool_call_id == "call-0" and msg.name == "snapshot"
@@ -0,0 +1,137 @@
+import asyncio
+from typing import Any
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from myaa.src.graph_setup import GraphRuntime, set_runtime, stream_turn
+from myaa.src.personas import PersonaRegistry
+from myaa.src.tool_cache import cacheable
+from myaa.src.tool_exec import ParallelToolNode
+from myaa.src.turn_budget import (
+    BUDGET_FALLBACK_REPLY,
+    FINAL_ANSWER_PROMPT,
+    TurnBudget,
+)
+
+PERSONAS = {"default_persona": "a", "a": {"name": "A", "description": "test"}}
+runs = {"get_light_status": 0, "set_light": 0}
+
+
+@cacheable(30)
+@tool
+def get_light_status() -> str:
+    """Light status."""
+    runs["get_light_status"] += 1
+    return "ON"
+
+
+@tool
+def set_light(action: str) -> str:
+    """Switch the light."""
+    runs["set_light"] += 1
+    return f"light {action}"
+
+
+class LoopingModel(BaseChatModel):
+    """Asks for ``get_light_status`` every call; answers once told to stop,
+    unless ``stubborn``."""
+
+    stubborn: bool = False
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "looping"
+
+    def bind_tools(self, tools, **kwargs: Any):  # type: ignore[override]
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        self.calls += 1
+        last = messages[-1]
+        told = isinstance(last, HumanMessage) and last.content == FINAL_ANSWER_PROMPT
+        if told and not self.stubborn:
+            msg = AIMessage("点いています")
+        else:
+            call = {"name": "get_light_status", "args": {}, "id": f"c{self.calls}"}
+            msg = AIMessage("", tool_calls=[call])
+        return ChatResult(generations=[ChatGeneration(message=msg)])
+
+
+@pytest.fixture(autouse=True)
+def reset(monkeypatch):
+    monkeypatch.setenv("TOOL_CACHE", "0")  # dedupe only, not the tool cache
+    for name in runs:
+        runs[name] = 0
+    yield
+    set_runtime(None)
+
+
+def run_turn(llm: LoopingModel, budget: TurnBudget) -> str:
+    set_runtime(
+        GraphRuntime(
+            llm=llm,
+            tools=[get_light_status],
+            personas=PersonaRegistry(data=PERSONAS),
+            turn_budget=budget,
+        )
+    )
+
+    async def main() -> str:
+        replies = [r async for r in stream_turn("t", [("alice", "電気は？")], "a")]
+        return replies[-1]
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("stubborn", [False, True])
+def test_exhausted_budget_forces_a_final_answer(stubborn):
+    llm = LoopingModel(stubborn=stubborn)
+    reply = run_turn(llm, TurnBudget(max_llm_calls=3, max_tool_calls=0))
+    assert llm.calls == 3  # the third call is the forced final answer
+    assert reply == (BUDGET_FALLBACK_REPLY if stubborn else "点いています")
+    assert runs["get_light_status"] == 1  # the repeat came from the first result
+
+
+def test_tool_call_budget_refuses_extra_calls():
+    llm = LoopingModel(stubborn=True)
+    reply = run_turn(llm, TurnBudget(max_llm_calls=0, max_tool_calls=2))
+    assert reply == BUDGET_FALLBACK_REPLY
+    assert llm.calls == 3  # two tool steps, then the final answer
+
+
+def history(*calls: tuple[str, dict]) -> list:
+    """A turn that already ran ``calls`` once, then asks for them again."""
+    first = [{"name": n, "args": a, "id": f"a{i}"} for i, (n, a) in enumerate(calls)]
+    again = [{"name": n, "args": a, "id": f"b{i}"} for i, (n, a) in enumerate(calls)]
+    results = [ToolMessage("ON", name=c["name"], tool_call_id=c["id"]) for c in first]
+    return [
+        HumanMessage("電気"),
+        AIMessage("", tool_calls=first),
+        *results,
+        AIMessage("", tool_calls=again),
+    ]
+
+
+def test_only_read_only_repeats_are_deduplicated():
+    node = ParallelToolNode([get_light_status, set_light], budget=TurnBudget())
+    messages = history(("get_light_status", {}), ("set_light", {"action": "up"}))
+    out = asyncio.run(node.run({"messages": messages}, {"configurable": {}}))
+    status, light = out["messages"]
+    assert status.content == "ON" and status.tool_call_id == "b0"
+    assert light.content == "light up"
+    assert runs == {"get_light_status": 0, "set_light": 1}
+
+
+def test_identical_calls_in_one_step_run_once():
+    node = ParallelToolNode([get_light_status], budget=TurnBudget())
+    calls = [{"name": "get_light_status", "args": {}, "id": f"x{i}"} for i in range(3)]
+    messages = [HumanMessage("電気"), AIMessage("", tool_calls=calls)]
+    out = asyncio.run(node.run({"messages": messages}, {"configurable": {}}))
+    assert [m.tool_call_id for m in out["messages"]] == ["x0", "x1", "x2"]
+    assert runs["get_light_status"] == 1
+    assert [m.content for m in out["messages"]] == ["ON", "ON", "ON"]
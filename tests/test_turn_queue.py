@@ -0,0 +1,52 @@
+import asyncio
+
+from myaa.src.turn_queue import TurnQueue
+
+
+def test_burst_is_answered_in_one_batch():
+    batches: list[tuple[str, list[int]]] = []
+
+    async def handler(key, batch):
+        batches.append((key, batch))
+
+    async def main():
+        queue = TurnQueue(handler, debounce=0.01)
+        for i in range(3):
+            queue.submit("a", i)
+        queue.submit("b", 9)
+        await queue.drain()
+
+    asyncio.run(main())
+    assert sorted(batches) == [("a", [0, 1, 2]), ("b", [9])]
+
+
+def test_drain_restarts_a_cancelled_worker():
+    handled: list[int] = []
+
+    async def handler(key, batch):
+        handled.extend(batch)
+
+    async def main():
+        queue = TurnQueue(handler, debounce=0.05)
+        queue.submit("a", 1)
+        queue._sessions["a"].worker.cancel()
+        await asyncio.sleep(0)
+        await asyncio.wait_for(queue.drain(), 1)
+        assert not queue._sessions
+
+    asyncio.run(main())
+    assert handled == [1]
+
+
+def test_full_session_refuses_messages():
+    async def handler(key, batch):
+        pass
+
+    async def main():
+        queue = TurnQueue(handler, debounce=0.01, max_depth=2)
+        assert queue.submit("a", 1) and queue.submit("a", 2)
+        assert not queue.submit("a", 3)
+        assert queue.depth("a") == 2
+        await queue.drain()
+
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+import asyncio
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from myaa.src import inspection
+from myaa.src.memory import LongTermMemory
+from myaa.src.worker_pool import WorkerPool
+
+PERSONAS = {"default_persona": "a", "a": {"name": "A", "description": "test"}}
+
+
+class EchoModel(BaseChatModel):
+    @property
+    def _llm_type(self) -> str:
+        return "echo"
+
+    def bind_tools(self, tools, **kwargs: Any):  # type: ignore[override]
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        reply = AIMessage(f"re: {messages[-1].content}")
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+
+def make_runtime():
+    # runs in the worker process (spawn): imports stay inside
+    from myaa.src.checkpoint import MemorySaver
+    from myaa.src.graph_setup import GraphRuntime
+    from myaa.src.personas import PersonaRegistry
+
+    return GraphRuntime(
+        llm=EchoModel(),
+        tools=[],
+        personas=PersonaRegistry(data=PERSONAS),
+        checkpointer=MemorySaver(),
+    )
+
+
+def test_inspection_runs_in_the_owning_worker(monkeypatch, capsys):
+    monkeypatch.setenv("MEMORY", "0")
+
+    async def main():
+        pool = WorkerPool(2, make_runtime, heartbeat=0.1)
+        try:
+            await pool.wait_ready()
+            reply = "".join([d async for d in pool.stream("t", [("bob", "hi")], "a")])
+            assert reply == "re: bob: hi"
+            read = inspection.thread_stats
+            stats = await pool.call("t", "checkpointer", read, "1:2", "t")
+            assert stats.messages == 2
+            # the other worker never saw the thread
+            wid = pool.worker_for("t")
+            other = next(t for t in "uvwxyz" if pool.worker_for(t) != wid)
+            assert await pool.call(other, "checkpointer", read, "1:2", "t") is None
+            about = LongTermMemory.about
+            assert await pool.call("t", "memory", about, "a", "1") is None
+            # a worker that only kept its threads in memory is reported on restart
+            pool._procs[wid].kill()
+            await asyncio.to_thread(pool._procs[wid].join, 5)
+            assert pool.check() == 1
+        finally:
+            await pool.close(5)
+
+    asyncio.run(main())
+    assert "CHECKPOINT_BACKEND=sqlite" in capsys.readouterr().out